@@ -0,0 +1,167 @@
+import time
+from enum import Enum
+
+import numpy as np
+
+
+class GateState(Enum):
+    Silent = "silent"
+    Active = "active"
+
+
+class ActivityGate:
+    """
+    声音活动检测门限
+    根据能量(dBFS)和谱平坦度判断当前块是否有声音，使用双阈值 + 连续帧计数做迟滞，避免在临界值附近反复切换
+    静音时调用方可以跳过降噪和绘制，只做低成本的噪声谱刷新
+    """
+
+    def __init__(self,
+                 channels: int = 1,
+                 fullScale: float = float(np.iinfo(np.int32).max),
+                 onThresholdDb: float = -50.0,
+                 offThresholdDb: float = -56.0,
+                 flatnessThreshold: float = 0.6,
+                 loudMarginDb: float = 20.0,
+                 attackFrames: int = 2,
+                 releaseFrames: int = 15):
+        """
+        初始化声音活动检测
+        :param channels: 通道数（数据为交错排列）
+        :param fullScale: 满量程值，用于把采样换算为 dBFS
+        :param onThresholdDb: 静音 -> 有声的能量阈值
+        :param offThresholdDb: 有声 -> 静音的能量阈值（低于 onThresholdDb 形成迟滞）
+        :param flatnessThreshold: 谱平坦度阈值，高于该值视为噪声（白噪声接近 1，语音/音乐远小于 1）
+        :param loudMarginDb: 能量超过阈值该值以上时，不再参考谱平坦度
+        :param attackFrames: 连续多少块有声才切换为有声
+        :param releaseFrames: 连续多少块静音才切换为静音
+        """
+        self.channels = channels
+        """通道数"""
+        self.fullScale = fullScale
+        """满量程值"""
+        self.onThresholdDb = onThresholdDb
+        """静音 -> 有声的能量阈值"""
+        self.offThresholdDb = offThresholdDb
+        """有声 -> 静音的能量阈值"""
+        self.flatnessThreshold = flatnessThreshold
+        """谱平坦度阈值"""
+        self.loudMarginDb = loudMarginDb
+        """忽略谱平坦度的能量余量"""
+        self.attackFrames = attackFrames
+        """切换为有声所需的连续帧数"""
+        self.releaseFrames = releaseFrames
+        """切换为静音所需的连续帧数"""
+
+        self.state = GateState.Silent
+        """当前状态"""
+        self.energyDb = -np.inf
+        """最近一块的能量"""
+        self.flatness = 1.0
+        """最近一块的谱平坦度"""
+
+        self.__streak = 0
+        """与当前状态相反的连续判定帧数"""
+        self.__stateSince = time.perf_counter()
+        """进入当前状态的时间点"""
+
+        self.decisions = {state: 0 for state in GateState}
+        """各状态的判定次数"""
+        self.transitions = 0
+        """状态切换次数"""
+        self.stateTime = {state: 0.0 for state in GateState}
+        """各状态累计持续时间（秒），不含当前尚未结束的一段"""
+        self.processingTime = {state: 0.0 for state in GateState}
+        """各状态下调用方累计的处理耗时（秒）"""
+
+    @staticmethod
+    def fullScaleOf(dtype: type) -> float:
+        """
+        采样数据类型的满量程值
+        :param dtype: 采样数据类型
+        :return: 整数类型为最大值，浮点类型为 1.0
+        """
+        return float(np.iinfo(dtype).max) if np.issubdtype(dtype, np.integer) else 1.0
+
+    @property
+    def isActive(self) -> bool:
+        """
+        当前是否有声
+        :return: True or False
+        """
+        return self.state is GateState.Active
+
+    def measure(self, audio_data: np.ndarray) -> tuple[float, float]:
+        """
+        计算一块数据的能量和谱平坦度
+        :param audio_data: 交错排列的采样数据
+        :return: (能量 dBFS, 谱平坦度)
+        """
+        mono = audio_data.astype(np.float32)
+        if self.channels > 1:
+            mono = mono[:mono.size - mono.size % self.channels].reshape(-1, self.channels).mean(axis=1)
+        mono /= self.fullScale
+        rms = float(np.sqrt(np.mean(mono * mono))) if mono.size else 0.0
+        energyDb = 20 * np.log10(rms) if rms > 0 else -np.inf
+
+        power = np.abs(np.fft.rfft(mono)) ** 2 + 1e-20
+        flatness = float(np.exp(np.mean(np.log(power))) / np.mean(power))
+        return energyDb, flatness
+
+    def update(self, audio_data: np.ndarray) -> bool:
+        """
+        输入一块数据，更新状态
+        :param audio_data: 交错排列的采样数据
+        :return: 当前是否有声
+        """
+        self.energyDb, self.flatness = self.measure(audio_data)
+        threshold = self.offThresholdDb if self.isActive else self.onThresholdDb
+        voiced = self.energyDb >= threshold and (self.flatness < self.flatnessThreshold or self.energyDb >= threshold + self.loudMarginDb)
+
+        if voiced == self.isActive:
+            self.__streak = 0
+        else:
+            self.__streak += 1
+            if self.__streak >= (self.releaseFrames if self.isActive else self.attackFrames):
+                self.__switch(GateState.Silent if self.isActive else GateState.Active)
+
+        self.decisions[self.state] += 1
+        return self.isActive
+
+    def __switch(self, state: GateState) -> None:
+        now = time.perf_counter()
+        self.stateTime[self.state] += now - self.__stateSince
+        self.__stateSince = now
+        self.state = state
+        self.__streak = 0
+        self.transitions += 1
+
+    def account(self, seconds: float) -> None:
+        """
+        记录调用方在当前状态下的处理耗时
+        :param seconds: 耗时（秒）
+        :return: None
+        """
+        self.processingTime[self.state] += seconds
+
+    def metrics(self) -> dict:
+        """
+        导出统计数据
+        :return: 判定次数、切换次数、各状态持续时间和处理耗时
+        """
+        stateTime = dict(self.stateTime)
+        stateTime[self.state] += time.perf_counter() - self.__stateSince
+        return {"state": self.state.value,
+                "energyDb": self.energyDb,
+                "flatness": self.flatness,
+                "transitions": self.transitions,
+                "decisions": {k.value: v for k, v in self.decisions.items()},
+                "stateTime": {k.value: v for k, v in stateTime.items()},
+                "processingTime": {k.value: v for k, v in self.processingTime.items()}}
+
+    def reset(self) -> None:
+        """
+        重置状态和统计数据
+        :return: None
+        """
+        self.__init__(self.channels, self.fullScale, self.onThresholdDb, self.offThresholdDb, self.flatnessThreshold, self.loudMarginDb, self.attackFrames, self.releaseFrames)
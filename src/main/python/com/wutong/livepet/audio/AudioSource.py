@@ -0,0 +1,113 @@
+import time
+
+import numpy as np
+
+
+class AudioSource:
+    """
+    音频源基类
+    所有音频源按块(chunk)输出交错排列的采样数据，默认格式为 int32，与 SystemRecorder 原先的 pyaudio.paInt32 保持一致
+    继承这个类，实现 open/read/close 函数
+    """
+
+    def __init__(self,
+                 channels: int,
+                 rate: int,
+                 chunk: int = 4096,
+                 realtime: bool = True,
+                 dtype: type = np.int32,
+                 sourceName: str = __name__):
+        """
+        初始化音频源
+        :param channels: 通道数
+        :param rate: 采样率
+        :param chunk: 每块的帧数
+        :param realtime: 是否按实时速度输出（False 则尽可能快地输出，用于基准测试）
+        :param dtype: 输出采样的数据类型
+        :param sourceName: 音频源名称
+        """
+        self.sourceName = sourceName.split('.')[-1]
+        """音频源名称"""
+        self.channels = channels
+        """通道数"""
+        self.rate = rate
+        """采样率"""
+        self.chunk = chunk
+        """每块的帧数"""
+        self.realtime = realtime
+        """是否按实时速度输出"""
+        self.dtype = dtype
+        """输出采样的数据类型"""
+
+        self.isOpened = False
+        """是否已打开"""
+
+        self.__deadline: float | None = None
+        """下一块数据的输出时间点"""
+
+    @property
+    def sampleWidth(self) -> int:
+        """
+        单个采样的字节数
+        :return: 字节数
+        """
+        return np.dtype(self.dtype).itemsize
+
+    @property
+    def chunkDuration(self) -> float:
+        """
+        每块数据对应的时长
+        :return: 秒
+        """
+        return self.chunk / self.rate
+
+    def open(self) -> None:
+        """
+        打开音频源
+        :return: None
+        """
+        self.isOpened = True
+        self.__deadline = None
+
+    def read(self) -> np.ndarray | None:
+        """
+        读取一块音频数据
+        :return: 交错排列的一维采样数组，长度为 chunk * channels；音频源结束时返回 None
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        关闭音频源
+        :return: None
+        """
+        self.isOpened = False
+
+    def pace(self) -> None:
+        """
+        非设备音频源的节拍控制
+        realtime 为 True 时，休眠到下一块数据应当到达的时间点；落后超过一块时重新对齐，避免追赶造成的突发输出
+        :return: None
+        """
+        if not self.realtime:
+            return
+        now = time.perf_counter()
+        if self.__deadline is None or now - self.__deadline > self.chunkDuration:
+            self.__deadline = now
+        self.__deadline += self.chunkDuration
+        if (delay := self.__deadline - now) > 0:
+            time.sleep(delay)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def __iter__(self):
+        while (data := self.read()) is not None:
+            yield data
+
+    def __repr__(self):
+        return f"{self.sourceName}(channels={self.channels}, rate={self.rate}, chunk={self.chunk}, realtime={self.realtime})"
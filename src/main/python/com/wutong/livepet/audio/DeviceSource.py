@@ -0,0 +1,143 @@
+import numpy as np
+import pyaudio
+import sounddevice
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.audio.AudioSource import AudioSource
+
+PYAUDIO_DTYPES = {
+    pyaudio.paInt16: np.int16,
+    pyaudio.paInt32: np.int32,
+    pyaudio.paFloat32: np.float32,
+}
+"""pyaudio 格式到 numpy 数据类型的映射"""
+
+
+def getAllDrives() -> list[dict]:
+    """
+    获取所有音频设备
+    :return: 音频设备信息列表
+    """
+    return [i for i in sounddevice.query_devices()]
+
+
+def findInputDrives(inputDrivesName: str) -> list[dict]:
+    """
+    查找名称中包含 inputDrivesName 的输入设备
+    :param inputDrivesName: 输入设备名称
+    :return: 音频设备信息列表
+    :raises ValueError: 找不到输入设备
+    """
+    drives = [i for i in getAllDrives() if inputDrivesName in i["name"] and i["max_input_channels"] > 0]
+    if not drives:
+        logger.error(f"Cannot find input device {inputDrivesName}")
+        raise ValueError(f"Cannot find input device {inputDrivesName}")
+    return drives
+
+
+class PyAudioSource(AudioSource):
+    """
+    基于 PyAudio 的实时设备音频源
+    设备的阻塞读取本身就是节拍，因此不需要额外的 pace
+    """
+
+    def __init__(self,
+                 inputDrivesName: str = "立体声混音",
+                 channels: int = None,
+                 formats: int = pyaudio.paInt32,
+                 rate: int = None,
+                 chunk: int = 4096):
+        """
+        初始化 PyAudio 音频源
+        :param inputDrivesName: 输入设备名称
+        :param channels: 通道数 Default: None （使用设备最大输入通道数）
+        :param formats: pyaudio 采样格式
+        :param rate: 采样率 Default: None （使用设备默认采样率）
+        :param chunk: 缓冲区大小
+        :raises ValueError: 找不到输入设备
+        """
+        self.drive = findInputDrives(inputDrivesName)[0]
+        """输入设备信息"""
+        super().__init__(channels=channels or self.drive['max_input_channels'],
+                         rate=rate or int(self.drive['default_samplerate']),
+                         chunk=chunk,
+                         realtime=True,
+                         dtype=PYAUDIO_DTYPES.get(formats, np.int32),
+                         sourceName=__name__)
+        self.inputDrivesName = inputDrivesName
+        """输入设备名称"""
+        self.formats = formats
+        """pyaudio 采样格式"""
+
+        self.p: pyaudio.PyAudio | None = None
+        self.stream = None
+
+    def open(self) -> None:
+        self.p = pyaudio.PyAudio()
+        self.stream = self.p.open(format=self.formats, channels=self.channels, rate=self.rate, input=True, frames_per_buffer=self.chunk, input_device_index=self.drive['index'])
+        super().open()
+
+    def read(self) -> np.ndarray | None:
+        if not self.isOpened:
+            return None
+        return np.frombuffer(self.stream.read(self.chunk, exception_on_overflow=False), dtype=self.dtype)
+
+    def close(self) -> None:
+        if self.isOpened:
+            super().close()
+            self.stream.stop_stream()
+            self.stream.close()
+            self.p.terminate()
+
+
+class SoundDeviceSource(AudioSource):
+    """
+    基于 sounddevice 的实时设备音频源
+    """
+
+    def __init__(self,
+                 inputDrivesName: str = None,
+                 channels: int = None,
+                 rate: int = None,
+                 chunk: int = 4096,
+                 dtype: type = np.int32):
+        """
+        初始化 sounddevice 音频源
+        :param inputDrivesName: 输入设备名称 Default: None （使用系统默认输入设备）
+        :param channels: 通道数 Default: None （使用设备最大输入通道数）
+        :param rate: 采样率 Default: None （使用设备默认采样率）
+        :param chunk: 缓冲区大小
+        :param dtype: 采样数据类型
+        :raises ValueError: 找不到输入设备
+        """
+        self.drive = findInputDrives(inputDrivesName)[0] if inputDrivesName else sounddevice.query_devices(kind="input")
+        """输入设备信息"""
+        super().__init__(channels=channels or self.drive['max_input_channels'],
+                         rate=rate or int(self.drive['default_samplerate']),
+                         chunk=chunk,
+                         realtime=True,
+                         dtype=dtype,
+                         sourceName=__name__)
+        self.inputDrivesName = inputDrivesName
+        """输入设备名称"""
+
+        self.stream: sounddevice.InputStream | None = None
+
+    def open(self) -> None:
+        self.stream = sounddevice.InputStream(device=self.drive['index'], channels=self.channels, samplerate=self.rate, blocksize=self.chunk, dtype=np.dtype(self.dtype).name)
+        self.stream.start()
+        super().open()
+
+    def read(self) -> np.ndarray | None:
+        if not self.isOpened:
+            return None
+        data, overflowed = self.stream.read(self.chunk)
+        if overflowed:
+            logger.warning(f"{self.sourceName} input overflowed")
+        return data.reshape(-1)
+
+    def close(self) -> None:
+        if self.isOpened:
+            super().close()
+            self.stream.stop()
+            self.stream.close()
@@ -0,0 +1,110 @@
+import os
+import wave
+
+import numpy as np
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.audio.AudioSource import AudioSource
+
+try:
+    import soundfile
+except ImportError:  # soundfile 随 librosa 一起安装，缺失时仅支持 WAV
+    soundfile = None
+
+
+class FileSource(AudioSource):
+    """
+    音频文件回放源
+    支持 WAV/FLAC（FLAC 需要 soundfile），可以按实时速度回放，也可以尽可能快地回放用于基准测试
+    """
+
+    def __init__(self,
+                 filePath: str,
+                 chunk: int = 4096,
+                 realtime: bool = True,
+                 loop: bool = False):
+        """
+        初始化文件音频源
+        :param filePath: 音频文件路径
+        :param chunk: 每块的帧数
+        :param realtime: 是否按实时速度回放
+        :param loop: 播放到结尾后是否从头循环
+        :raises FileNotFoundError: 音频文件不存在
+        :raises ValueError: 不支持的音频格式
+        """
+        if not os.path.exists(filePath):
+            raise FileNotFoundError(f"Audio file {filePath} not found")
+        self.filePath = filePath
+        """音频文件路径"""
+        self.loop = loop
+        """是否循环播放"""
+        self.__file = None
+        """打开的音频文件"""
+
+        if soundfile is not None:
+            info = soundfile.info(filePath)
+            channels, rate = info.channels, info.samplerate
+        elif filePath.lower().endswith(".wav"):
+            with wave.open(filePath, "rb") as waveFile:
+                channels, rate = waveFile.getnchannels(), waveFile.getframerate()
+        else:
+            raise ValueError(f"Unsupported audio file {filePath}, install soundfile to read it")
+
+        super().__init__(channels=channels, rate=rate, chunk=chunk, realtime=realtime, sourceName=__name__)
+
+    def open(self) -> None:
+        if soundfile is not None:
+            self.__file = soundfile.SoundFile(self.filePath, "r")
+        else:
+            self.__file = wave.open(self.filePath, "rb")
+        super().open()
+        logger.info(f"{self.sourceName} opened {self.filePath}")
+
+    def __readFrames(self) -> np.ndarray:
+        """
+        从文件中读取最多 chunk 帧，统一转换为 int32
+        :return: 交错排列的一维采样数组
+        """
+        if soundfile is not None:
+            return self.__file.read(self.chunk, dtype="int32", always_2d=True).reshape(-1)
+        raw = self.__file.readframes(self.chunk)
+        sampleWidth = self.__file.getsampwidth()
+        if sampleWidth == 1:  # 8 位 PCM 为无符号
+            return (np.frombuffer(raw, dtype=np.uint8).astype(np.int32) - 128) << 24
+        if sampleWidth == 3:  # 24 位 PCM 补齐到 32 位
+            data = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+            return (data[:, 0].astype(np.int32) << 8) | (data[:, 1].astype(np.int32) << 16) | (data[:, 2].astype(np.int8).astype(np.int32) << 24)
+        data = np.frombuffer(raw, dtype=np.int16 if sampleWidth == 2 else np.int32).astype(np.int32)
+        return data << 16 if sampleWidth == 2 else data
+
+    def __rewind(self) -> None:
+        if soundfile is not None:
+            self.__file.seek(0)
+        else:
+            self.__file.rewind()
+
+    def read(self) -> np.ndarray | None:
+        if not self.isOpened:
+            return None
+        data = self.__readFrames()
+        size = self.chunk * self.channels
+        if data.size < size and self.loop:
+            parts = [data]
+            while sum(part.size for part in parts) < size:
+                self.__rewind()
+                parts.append(self.__readFrames())
+                if parts[-1].size == 0:  # 空文件
+                    break
+            data = np.concatenate(parts)[:size]
+        if data.size == 0:
+            return None
+        if data.size < size:  # 最后一块补零，保持块大小不变
+            data = np.pad(data, (0, size - data.size))
+        self.pace()
+        return data
+
+    def close(self) -> None:
+        if self.isOpened:
+            super().close()
+            self.__file.close()
+            self.__file = None
@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from src.main.python.com.wutong.livepet.audio.SpeechToText import SpeechToText
+
+
+class ScriptedSpeechToText(SpeechToText):
+    """
+    按脚本输出的语音识别，不依赖模型
+    每段话依次输出 texts 中的下一句，中间结果按已录音时长输出这句话的前缀；可以模拟识别耗时，
+    用于无头环境下测试语音输入链路和测量延迟
+    """
+
+    def __init__(self,
+                 texts: list[str] = None,
+                 charactersPerSecond: float = 4.0,
+                 realtimeFactor: float = 0.0,
+                 rate: int = 16000):
+        """
+        初始化脚本语音识别
+        :param texts: 依次输出的句子 Default: None （固定的问候语）
+        :param charactersPerSecond: 语速（字/秒），决定中间结果的长度
+        :param realtimeFactor: 模拟的识别耗时与音频时长之比
+        :param rate: 输入音频的采样率
+        """
+        super().__init__(rate=rate, engineName=__name__)
+        self.texts = texts or ["你好，今天过得怎么样？"]
+        """依次输出的句子"""
+        self.charactersPerSecond = charactersPerSecond
+        """语速"""
+        self.realtimeFactor = realtimeFactor
+        """模拟的识别耗时与音频时长之比"""
+
+        self.__index = 0
+        """当前句子的序号"""
+
+    def transcribe(self, audio: np.ndarray, final: bool) -> str:
+        duration = len(audio) / self.rate
+        if self.realtimeFactor > 0:
+            time.sleep(duration * self.realtimeFactor)
+        text = self.texts[self.__index % len(self.texts)]
+        if final:
+            self.__index += 1
+            return text
+        return text[:int(duration * self.charactersPerSecond)]
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+class SpeechToText:
+    """
+    语音识别后端基类
+    输入一段话从开头到当前位置的 float32 单声道音频（采样率为 rate），返回识别文本；
+    说话过程中会用不断变长的音频反复调用以得到中间结果，说完后再调用一次得到最终结果。
+    继承这个类，实现 transcribe 函数（需要时实现 load/close）
+    """
+
+    def __init__(self, rate: int = 16000, engineName: str = __name__):
+        """
+        初始化语音识别后端
+        :param rate: 输入音频的采样率
+        :param engineName: 后端名称
+        """
+        self.engineName = engineName.split('.')[-1]
+        """后端名称"""
+        self.rate = rate
+        """输入音频的采样率"""
+
+    def load(self) -> None:
+        """
+        加载模型（在识别线程中调用，避免阻塞 GUI 线程）
+        :return: None
+        """
+        ...
+
+    def transcribe(self, audio: np.ndarray, final: bool) -> str:
+        """
+        识别一段音频
+        :param audio: float32 单声道音频（-1 ~ 1），是录音缓冲区的视图，不要修改或保存
+        :param final: 是否为最终结果（中间结果可以使用更快但更粗糙的参数）
+        :return: 识别文本
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        释放模型
+        :return: None
+        """
+        ...
+
+    def __repr__(self):
+        return f"{self.engineName}(rate={self.rate})"
@@ -0,0 +1,137 @@
+from enum import Enum
+
+import numpy as np
+
+from src.main.python.com.wutong.livepet.audio.AudioSource import AudioSource
+
+
+class SyntheticSignal(Enum):
+    Silence = "silence"
+    Sine = "sine"
+    Noise = "noise"
+    Speech = "speech"
+
+
+class SyntheticSource(AudioSource):
+    """
+    合成信号音频源
+    生成静音、正弦波、白噪声以及类语音的突发信号，不依赖任何音频设备，用于无头环境下的性能分析和回归基准测试
+    相同的 seed 会生成完全相同的数据
+    """
+
+    def __init__(self,
+                 signal: SyntheticSignal | str = SyntheticSignal.Sine,
+                 channels: int = 2,
+                 rate: int = 48000,
+                 chunk: int = 4096,
+                 realtime: bool = True,
+                 frequency: float = 440.0,
+                 amplitude: float = 0.5,
+                 duration: float = None,
+                 seed: int = 0):
+        """
+        初始化合成信号音频源
+        :param signal: 信号类型
+        :param channels: 通道数
+        :param rate: 采样率
+        :param chunk: 每块的帧数
+        :param realtime: 是否按实时速度输出
+        :param frequency: 正弦波频率 / 类语音信号的基频
+        :param amplitude: 振幅 (0 ~ 1)
+        :param duration: 总时长（秒） Default: None （无限长）
+        :param seed: 随机种子
+        """
+        super().__init__(channels=channels, rate=rate, chunk=chunk, realtime=realtime, sourceName=__name__)
+        self.signal = signal if isinstance(signal, SyntheticSignal) else SyntheticSignal(signal)
+        """信号类型"""
+        self.frequency = frequency
+        """频率"""
+        self.amplitude = amplitude
+        """振幅"""
+        self.duration = duration
+        """总时长"""
+        self.seed = seed
+        """随机种子"""
+
+        self.__rng = np.random.default_rng(seed)
+        self.__position = 0
+        """已输出的帧数"""
+        self.__phase = 0.0
+        """类语音信号的相位累加器"""
+        self.__segmentRemaining = 0
+        """当前语音/停顿段剩余帧数"""
+        self.__segmentLength = 0
+        """当前语音/停顿段总帧数"""
+        self.__voiced = False
+        """当前段是否为发声段"""
+        self.__pitch = frequency
+        """当前发声段的基频"""
+
+    def open(self) -> None:
+        self.__rng = np.random.default_rng(self.seed)
+        self.__position = 0
+        self.__phase = 0.0
+        self.__segmentRemaining = 0
+        super().open()
+
+    def __sine(self, frames: int) -> np.ndarray:
+        t = (self.__position + np.arange(frames)) / self.rate
+        return np.sin(2 * np.pi * self.frequency * t)
+
+    def __nextSegment(self) -> None:
+        """
+        切换到下一个语音段：发声段 80~300ms，停顿段 50~400ms
+        """
+        self.__voiced = not self.__voiced
+        low, high = (0.08, 0.3) if self.__voiced else (0.05, 0.4)
+        self.__segmentLength = self.__segmentRemaining = max(1, int(self.__rng.uniform(low, high) * self.rate))
+        self.__pitch = self.frequency * self.__rng.uniform(0.8, 1.25)
+
+    def __speech(self, frames: int) -> np.ndarray:
+        """
+        类语音信号：带谐波的基频 + 音节包络 + 少量气声噪声，由发声段和停顿段交替组成
+        """
+        out = np.zeros(frames)
+        filled = 0
+        while filled < frames:
+            if self.__segmentRemaining == 0:
+                self.__nextSegment()
+            count = min(frames - filled, self.__segmentRemaining)
+            if self.__voiced:
+                offset = self.__segmentLength - self.__segmentRemaining
+                envelope = np.sin(np.pi * (offset + np.arange(count)) / self.__segmentLength) ** 2
+                vibrato = 1 + 0.02 * np.sin(2 * np.pi * 5 * (self.__position + filled + np.arange(count)) / self.rate)
+                phase = self.__phase + np.cumsum(2 * np.pi * self.__pitch * vibrato / self.rate)
+                self.__phase = phase[-1] % (2 * np.pi)
+                voice = sum(np.sin(k * phase) / k for k in range(1, 9))
+                out[filled:filled + count] = envelope * (0.6 * voice + 0.05 * self.__rng.standard_normal(count))
+            filled += count
+            self.__segmentRemaining -= count
+        return out
+
+    def read(self) -> np.ndarray | None:
+        if not self.isOpened:
+            return None
+        frames = self.chunk
+        if self.duration is not None:
+            frames = min(frames, int(self.duration * self.rate) - self.__position)
+            if frames <= 0:
+                return None
+
+        match self.signal:
+            case SyntheticSignal.Sine:
+                mono = self.__sine(frames)
+            case SyntheticSignal.Noise:
+                mono = self.__rng.uniform(-1.0, 1.0, frames)
+            case SyntheticSignal.Speech:
+                mono = self.__speech(frames)
+            case _:
+                mono = np.zeros(frames)
+        self.__position += frames
+
+        mono = np.clip(mono * self.amplitude, -1.0, 1.0)
+        if frames < self.chunk:  # 最后一块补零，保持块大小不变
+            mono = np.pad(mono, (0, self.chunk - frames))
+        data = (np.repeat(mono, self.channels) * np.iinfo(np.int32).max).astype(np.int32)
+        self.pace()
+        return data
@@ -0,0 +1,304 @@
+import collections
+import threading
+import time
+from enum import Enum
+
+import numpy as np
+from PySide6.QtCore import QObject, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.audio.ActivityGate import ActivityGate
+from src.main.python.com.wutong.livepet.audio.AudioSource import AudioSource
+from src.main.python.com.wutong.livepet.audio.DeviceSource import SoundDeviceSource
+from src.main.python.com.wutong.livepet.audio.SpeechToText import SpeechToText
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+
+class VoiceMode(Enum):
+    PushToTalk = "pushToTalk"
+    VoiceActivated = "voiceActivated"
+
+
+class VoiceSignals(QObject):
+    """
+    语音输入信号
+    在录音/识别线程中发出，连接到 GUI 线程的槽时由 Qt 排队投递
+    """
+    speechStarted = Signal()
+    """开始说话"""
+    partial = Signal(str)
+    """中间识别结果: partial(text)"""
+    final = Signal(str, float)
+    """最终识别结果: final(text, endpointTime)，endpointTime 为判定说完时的 time.perf_counter()"""
+    failed = Signal(str)
+    """识别失败: failed(error)"""
+
+
+class Utterance:
+    """
+    一段话：录音写入预先分配的缓冲区，识别线程读取缓冲区前 length 个采样的视图
+    """
+
+    def __init__(self, buffer: np.ndarray):
+        self.buffer = buffer
+        """录音缓冲区"""
+        self.length = 0
+        """已写入的采样数"""
+        self.transcribed = 0
+        """上一次中间识别时的采样数"""
+        self.text = ""
+        """上一次的中间结果"""
+        self.endpointTime: float | None = None
+        """判定说完的时间点"""
+
+    def write(self, samples: np.ndarray) -> bool:
+        """
+        追加采样
+        :param samples: float32 采样
+        :return: 缓冲区是否已满
+        """
+        count = min(len(samples), len(self.buffer) - self.length)
+        self.buffer[self.length:self.length + count] = samples[:count]
+        self.length += count
+        return self.length >= len(self.buffer)
+
+
+class VoiceInput:
+    """
+    语音输入
+    录音线程把麦克风数据转换为识别后端的采样率并写入预先分配的缓冲区，按下说话键或声音活动检测判定一段话的开始和结束；
+    识别线程在说话过程中每隔 partialInterval 秒识别一次已录下的部分，输出中间结果，说完后立即识别整段话，最终结果优先于中间结果。
+    声音活动检测的开头会丢掉几块数据，因此保留 preRoll 秒的预录音
+    """
+
+    def __init__(self,
+                 stt: SpeechToText,
+                 source: AudioSource = None,
+                 mode: VoiceMode = VoiceMode.VoiceActivated,
+                 gate: ActivityGate = None,
+                 endSilence: float = 0.4,
+                 preRoll: float = 0.3,
+                 partialInterval: float = 0.6,
+                 minUtterance: float = 0.3,
+                 maxUtterance: float = 15.0):
+        """
+        初始化语音输入（需要在 GUI 线程中创建，以保证信号对象属于 GUI 线程）
+        :param stt: 语音识别后端
+        :param source: 音频源 Default: None （系统默认麦克风，单声道，每块 32ms）
+        :param mode: 按键说话或声音激活
+        :param gate: 声音活动检测 Default: None （按 endSilence 设置释放帧数）
+        :param endSilence: 声音激活模式下，静音持续多久判定为说完（秒），越短延迟越低，但容易把停顿切成两句
+        :param preRoll: 预录音时长（秒）
+        :param partialInterval: 中间结果的识别间隔（秒），为 0 时不输出中间结果
+        :param minUtterance: 短于该时长（秒）的一段话视为误触发，直接丢弃
+        :param maxUtterance: 一段话的最大时长（秒），超过时立即识别
+        """
+        self.stt = stt
+        """语音识别后端"""
+        self.source = source or SoundDeviceSource(channels=1, rate=stt.rate, chunk=stt.rate * 32 // 1000, dtype=np.float32)
+        """音频源"""
+        self.mode = mode
+        """输入模式"""
+        chunkDuration = self.source.chunkDuration
+        self.gate = gate or ActivityGate(channels=self.source.channels,
+                                         fullScale=ActivityGate.fullScaleOf(self.source.dtype),
+                                         attackFrames=max(1, round(0.064 / chunkDuration)),
+                                         releaseFrames=max(1, round(endSilence / chunkDuration)))
+        """声音活动检测"""
+        self.partialInterval = partialInterval
+        """中间结果的识别间隔"""
+        self.minUtterance = minUtterance
+        """最短时长"""
+        self.maxUtterance = maxUtterance
+        """最大时长"""
+
+        self.signals = VoiceSignals()
+        """语音输入信号"""
+        self.metrics = MetricsRegistry.instance()
+        """指标注册表"""
+
+        self.__capacity = int(maxUtterance * stt.rate)
+        """缓冲区的采样数"""
+        self.__buffers: list[np.ndarray] = [np.zeros(self.__capacity, dtype=np.float32) for _ in range(2)]
+        """空闲的录音缓冲区，识别上一段话时可以同时录下一段"""
+        self.__preRoll: collections.deque[np.ndarray] = collections.deque(maxlen=max(1, round(preRoll / chunkDuration)))
+        """预录音"""
+        self.__current: Utterance | None = None
+        """正在录的一段话"""
+        self.__finals: collections.deque[Utterance] = collections.deque()
+        """等待最终识别的话"""
+        self.__condition = threading.Condition()
+        self.__pressed = False
+        """说话键是否按下"""
+        self.__running = False
+        self.__listener: threading.Thread | None = None
+        self.__transcriber: threading.Thread | None = None
+
+    @property
+    def isRunning(self) -> bool:
+        """
+        是否正在运行
+        :return: True or False
+        """
+        return self.__running
+
+    @property
+    def isSpeaking(self) -> bool:
+        """
+        是否正在录一段话
+        :return: True or False
+        """
+        return self.__current is not None
+
+    def start(self):
+        """
+        打开音频源，启动录音和识别线程
+        :return: None
+        """
+        if self.__running:
+            return
+        self.__running = True
+        self.source.open()
+        self.__listener = threading.Thread(target=self.__listen, name="VoiceInput-listen", daemon=True)
+        self.__transcriber = threading.Thread(target=self.__transcribe, name="VoiceInput-transcribe", daemon=True)
+        self.__listener.start()
+        self.__transcriber.start()
+
+    def stop(self, timeout: float = 2.0):
+        """
+        停止录音和识别并关闭音频源
+        :param timeout: 等待线程退出的时间（秒）
+        :return: None
+        """
+        if not self.__running:
+            return
+        self.__running = False
+        with self.__condition:
+            self.__condition.notify_all()
+        for thread in (self.__listener, self.__transcriber):
+            thread.join(timeout)
+        self.source.close()
+        self.stt.close()
+
+    def press(self):
+        """
+        按下说话键（线程安全，仅按键说话模式）
+        :return: None
+        """
+        self.__pressed = True
+
+    def release(self):
+        """
+        松开说话键（线程安全），松开后立即识别，没有静音等待
+        :return: None
+        """
+        self.__pressed = False
+
+    def __convert(self, data: np.ndarray) -> np.ndarray:
+        """
+        转换为识别后端采样率的 float32 单声道
+        """
+        samples = data.astype(np.float32, copy=False)
+        if self.source.channels > 1:
+            samples = samples[:samples.size - samples.size % self.source.channels].reshape(-1, self.source.channels).mean(axis=1)
+        fullScale = ActivityGate.fullScaleOf(self.source.dtype)
+        if fullScale != 1.0:
+            samples = samples / fullScale
+        rate, target = self.source.rate, self.stt.rate
+        if rate == target:
+            return samples
+        if rate % target == 0:  # 整数倍降采样：块平均，兼做低通
+            factor = rate // target
+            return samples[:samples.size - samples.size % factor].reshape(-1, factor).mean(axis=1)
+        positions = np.arange(0, samples.size, rate / target)
+        return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+    def __listen(self):
+        try:
+            while self.__running:
+                data = self.source.read()
+                if data is None:
+                    break
+                speaking = self.gate.update(data) if self.mode is VoiceMode.VoiceActivated else self.__pressed
+                samples = self.__convert(data)
+                with self.__condition:
+                    if speaking and self.__current is None:
+                        self.__begin()
+                    if self.__current is None:
+                        self.__preRoll.append(samples)
+                    elif self.__current.write(samples) or not speaking:
+                        self.__end()
+                    elif self.__ready():
+                        self.__condition.notify_all()
+        except Exception as e:
+            logger.exception(f"VoiceInput listening failed: {e}")
+            self.signals.failed.emit(str(e))
+        finally:
+            with self.__condition:
+                if self.__current is not None:
+                    self.__end()
+
+    def __begin(self):
+        self.__current = Utterance(self.__buffers.pop() if self.__buffers else np.zeros(self.__capacity, dtype=np.float32))
+        for samples in self.__preRoll:
+            self.__current.write(samples)
+        self.__preRoll.clear()
+        self.signals.speechStarted.emit()
+
+    def __end(self):
+        utterance, self.__current = self.__current, None
+        utterance.endpointTime = time.perf_counter()
+        if utterance.length < self.minUtterance * self.stt.rate:
+            self.__recycle(utterance)
+            return
+        self.__finals.append(utterance)
+        self.__condition.notify_all()
+
+    def __recycle(self, utterance: Utterance):
+        if len(self.__buffers) < 2:
+            self.__buffers.append(utterance.buffer)
+
+    def __ready(self) -> bool:
+        current = self.__current
+        return (not self.__running or bool(self.__finals)
+                or (self.partialInterval > 0 and current is not None
+                    and current.length - current.transcribed >= self.partialInterval * self.stt.rate))
+
+    def __transcribe(self):
+        try:
+            self.stt.load()
+        except Exception as e:
+            logger.exception(f"Loading speech recognition {self.stt} failed: {e}")
+            self.signals.failed.emit(str(e))
+            return
+        while True:
+            with self.__condition:
+                self.__condition.wait_for(self.__ready)
+                if not self.__running and not self.__finals:
+                    return
+                final = bool(self.__finals)
+                utterance = self.__finals.popleft() if final else self.__current
+                if utterance is None:
+                    continue
+                length = utterance.length
+            try:
+                start = time.perf_counter()
+                text = self.stt.transcribe(utterance.buffer[:length], final)
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                logger.warning(f"Speech recognition failed: {e}")
+                self.signals.failed.emit(str(e))
+                text, elapsed = "", 0.0
+            if not final:
+                utterance.transcribed = length
+                if text and text != utterance.text:
+                    utterance.text = text
+                    self.signals.partial.emit(text)
+                continue
+            with self.__condition:
+                self.__recycle(utterance)
+            if text:
+                self.signals.final.emit(text, utterance.endpointTime)
+            if self.metrics.enabled:
+                self.metrics.observe("voice.endpointToFinal", time.perf_counter() - utterance.endpointTime)
+                self.metrics.observe("voice.realtimeFactor", elapsed * self.stt.rate / length, "x")
@@ -0,0 +1,79 @@
+import librosa
+import numpy as np
+
+
+class WaveProcessor:
+    """
+    音频降噪处理
+    从 WaveListener 中拆分出来的纯计算部分（STFT 谱减降噪），不依赖 Qt 和音频设备，可以离线分析和基准测试
+    """
+
+    def __init__(self,
+                 decoder: type = np.float64,
+                 noiseUpdateInterval: int = 30,
+                 alpha: float = 0.9):
+        """
+        初始化音频降噪处理
+        :param decoder: 计算使用的数据类型
+        :param noiseUpdateInterval: 噪声谱更新间隔（块数）
+        :param alpha: 噪声谱平滑因子
+        """
+        self.decoder = decoder
+        """计算使用的数据类型"""
+        self.noise_profile = None
+        """噪声谱"""
+        self.noise_update_counter = 0
+        """噪声谱更新计数器"""
+        self.noise_update_interval = noiseUpdateInterval
+        """噪声谱更新间隔"""
+        self.alpha = alpha  # 平滑因子
+        """噪声谱平滑因子"""
+
+    def reset(self) -> None:
+        """
+        重置噪声谱
+        :return: None
+        """
+        self.noise_profile = None
+        self.noise_update_counter = 0
+
+    def refreshNoiseProfile(self, audio_data: np.ndarray) -> None:
+        """
+        静音期间的低成本噪声谱刷新
+        只计数，每 noise_update_interval 块才做一次 STFT；静音段正好是估计噪声的最佳样本
+        :param audio_data: 音频数据
+        :return: None
+        """
+        self.noise_update_counter += 1
+        if self.noise_profile is not None and self.noise_update_counter < self.noise_update_interval:
+            return
+        new_noise_profile = np.abs(librosa.stft(audio_data.astype(self.decoder))) ** 2
+        if self.noise_profile is None:
+            self.noise_profile = new_noise_profile
+        else:
+            self.noise_profile = self.alpha * self.noise_profile + (1 - self.alpha) * new_noise_profile  # 平滑更新
+        self.noise_update_counter = 0
+
+    def process(self, audio_data: np.ndarray) -> np.ndarray:
+        """
+        对一块音频数据做谱减降噪
+        :param audio_data: 音频数据
+        :return: 降噪后的音频数据
+        """
+        audio_data = audio_data.astype(self.decoder)
+        if self.noise_profile is None:
+            self.noise_profile = np.abs(librosa.stft(audio_data)) ** 2
+
+        self.noise_update_counter += 1
+        if self.noise_update_counter >= self.noise_update_interval:
+            new_noise_profile = np.abs(librosa.stft(audio_data)) ** 2
+            self.noise_profile = self.alpha * self.noise_profile + (1 - self.alpha) * new_noise_profile  # 平滑更新
+            self.noise_update_counter = 0
+
+        stft_audio = librosa.stft(audio_data)
+        magnitude = np.abs(stft_audio) ** 2
+
+        mask = (magnitude - self.noise_profile) / magnitude  # 可能需要调整
+        mask = np.maximum(mask, 0.0)
+        masked_stft = stft_audio * np.sqrt(mask)
+        return librosa.istft(masked_stft).astype(self.decoder)
@@ -0,0 +1,69 @@
+import numpy as np
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.audio.SpeechToText import SpeechToText
+
+
+class WhisperSpeechToText(SpeechToText):
+    """
+    基于 faster-whisper 的本地语音识别（可选依赖：pip install faster-whisper）
+    中间结果使用贪心解码，最终结果使用束搜索；不带时间戳、不参考上一段文本，减少每次调用的耗时
+    """
+
+    def __init__(self,
+                 modelSize: str = "small",
+                 device: str = "auto",
+                 computeType: str = "int8",
+                 language: str = "zh",
+                 beamSize: int = 5,
+                 initialPrompt: str = "以下是普通话的句子。"):
+        """
+        初始化 whisper 语音识别
+        :param modelSize: 模型大小或本地模型目录：tiny / base / small / medium / large-v3 ...
+        :param device: 运行设备：auto / cpu / cuda
+        :param computeType: 计算精度：int8 / float16 ...
+        :param language: 语言 Default: zh （为 None 时自动检测，会增加延迟）
+        :param beamSize: 最终结果的束宽
+        :param initialPrompt: 初始提示词，引导输出简体中文和标点
+        """
+        super().__init__(rate=16000, engineName=__name__)
+        self.modelSize = modelSize
+        """模型大小"""
+        self.device = device
+        """运行设备"""
+        self.computeType = computeType
+        """计算精度"""
+        self.language = language
+        """语言"""
+        self.beamSize = beamSize
+        """最终结果的束宽"""
+        self.initialPrompt = initialPrompt
+        """初始提示词"""
+
+        self.model = None
+        """whisper 模型"""
+
+    def load(self) -> None:
+        if self.model is not None:
+            return
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("WhisperSpeechToText requires faster-whisper: pip install faster-whisper") from e
+        logger.info(f"Loading whisper model {self.modelSize} on {self.device} ({self.computeType})...")
+        self.model = WhisperModel(self.modelSize, device=self.device, compute_type=self.computeType)
+        logger.success(f"Whisper model {self.modelSize} loaded")
+
+    def transcribe(self, audio: np.ndarray, final: bool) -> str:
+        self.load()
+        segments, _ = self.model.transcribe(audio,
+                                            language=self.language,
+                                            beam_size=self.beamSize if final else 1,
+                                            initial_prompt=self.initialPrompt,
+                                            condition_on_previous_text=False,
+                                            without_timestamps=True,
+                                            vad_filter=False)
+        return "".join(segment.text for segment in segments).strip()
+
+    def close(self) -> None:
+        self.model = None
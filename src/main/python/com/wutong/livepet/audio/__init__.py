@@ -0,0 +1,6 @@
+__namespace__ = "com.wutong.livepet.audio"
+__author__ = "Wutong"
+__version__ = "0.0.1"
+__description__ = "音频源与音频处理，支持实时设备、文件回放和合成信号"
+
+from .AudioSource import AudioSource
@@ -0,0 +1,208 @@
+import asyncio
+import re
+from collections import deque
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage, ChatRole
+
+CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+"""中日韩字符（大约每个字符一个 token）"""
+
+
+def estimateTokens(text: str) -> int:
+    """
+    估算文本的 token 数：中日韩字符每个约 1 个 token，其余字符每 4 个约 1 个 token
+    :param text: 文本
+    :return: token 数
+    """
+    if not text:
+        return 0
+    cjk = len(CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4 + 1
+
+
+def tokensOf(message: ChatMessage) -> int:
+    """
+    消息的 token 数（估算结果缓存在消息上）
+    :param message: 消息
+    :return: token 数
+    """
+    if message.tokens is None:
+        message.tokens = estimateTokens(message.message) + 4  # 角色等格式开销
+    return message.tokens
+
+
+class ChatContext:
+    """
+    按 token 预算管理对话上下文
+    提示词 = 固定的系统提示词 + 滚动摘要 + 最近的对话窗口。窗口只在超出预算时一次性裁掉一大段，
+    裁剪之间的每次请求前缀完全相同，Ollama 可以复用 KV 缓存；被裁掉的对话在后台压缩进滚动摘要
+    """
+
+    def __init__(self,
+                 history: list[ChatMessage],
+                 tokenBudget: int = 1536,
+                 lowWatermark: float = 0.5,
+                 hardLimit: float = 1.5,
+                 summarizer: callable = None):
+        """
+        初始化上下文管理
+        :param history: 对话历史记录（开头的系统提示词会被固定）
+        :param tokenBudget: 提示词的 token 预算
+        :param lowWatermark: 裁剪后窗口占预算的比例，越小两次裁剪之间能复用前缀的轮数越多
+        :param hardLimit: 摘要尚未生成时允许超出预算的倍数，超过后直接丢弃最旧的对话
+        :param summarizer: 摘要协程函数: await summarizer(previousSummary, messages) -> str，为 None 时直接丢弃
+        """
+        self.history = history
+        """对话历史记录"""
+        self.tokenBudget = tokenBudget
+        """token 预算"""
+        self.lowWatermark = lowWatermark
+        """裁剪后的目标比例"""
+        self.hardLimit = hardLimit
+        """硬上限倍数"""
+        self.summarizer = summarizer
+        """摘要协程函数"""
+
+        self.summary = ""
+        """滚动摘要"""
+        self.__summaryMessage: ChatMessage | None = None
+        """滚动摘要对应的系统消息"""
+        self.__compacting: asyncio.Task | None = None
+        """正在执行的压缩任务"""
+
+        self.records: deque[dict] = deque(maxlen=100)
+        """最近请求的提示词大小和首字延迟"""
+
+    @property
+    def pinned(self) -> int:
+        """
+        固定在开头的系统消息数量
+        :return: 数量
+        """
+        count = 0
+        while count < len(self.history) and self.history[count].role == ChatRole.System.value:
+            count += 1
+        return count
+
+    @property
+    def isCompacting(self) -> bool:
+        """
+        是否正在压缩
+        :return: True or False
+        """
+        return self.__compacting is not None and not self.__compacting.done()
+
+    def promptTokens(self) -> int:
+        """
+        当前提示词的估算 token 数
+        :return: token 数
+        """
+        return sum(tokensOf(message) for message in self.build())
+
+    def build(self, recalled: ChatMessage = None) -> list[ChatMessage]:
+        """
+        构造发送给模型的消息列表
+        :param recalled: 本次请求检索到的长期记忆，插入到最后一条用户消息之前，前面的前缀保持不变
+        :return: 消息列表
+        """
+        pinned = self.pinned
+        messages = self.history[:pinned]
+        if self.__summaryMessage:
+            messages.append(self.__summaryMessage)
+        window = self.history[pinned:]
+
+        limit = int(self.tokenBudget * self.hardLimit) - sum(tokensOf(message) for message in messages)
+        total = sum(tokensOf(message) for message in window)
+        start = 0
+        while total > limit and start < len(window) - 1:  # 摘要还没生成且严重超出预算
+            total -= tokensOf(window[start])
+            start += 1
+        if start:
+            # 窗口从用户消息开始，否则可能以助手消息或失去工具调用的工具结果开头；
+            # 后面没有用户消息时（工具调用进行中）退回到最近的一条用户消息，宁可略超预算
+            users = [i for i, message in enumerate(window) if message.role == ChatRole.User.value]
+            start = next((i for i in users if i >= start), users[-1] if users else start)
+        window = window[start:]
+        if recalled:
+            last = next((i for i in range(len(window) - 1, -1, -1) if window[i].role == ChatRole.User.value), len(window))
+            window.insert(last, recalled)
+        return messages + window
+
+    def maintain(self):
+        """
+        检查预算，超出时在后台启动一次压缩（需要在事件循环线程中调用）
+        :return: None
+        """
+        if self.isCompacting:
+            return
+        pinned = self.pinned
+        window = self.history[pinned:]
+        fixed = sum(tokensOf(message) for message in self.history[:pinned]) + (tokensOf(self.__summaryMessage) if self.__summaryMessage else 0)
+        total = fixed + sum(tokensOf(message) for message in window)
+        if total <= self.tokenBudget:
+            return
+
+        target = int(self.tokenBudget * self.lowWatermark)
+        cut = 0
+        while cut < len(window) - 2 and total > target:
+            total -= tokensOf(window[cut])
+            cut += 1
+        while cut < len(window) - 1 and window[cut].role != ChatRole.User.value:  # 窗口从用户消息开始
+            cut += 1
+        if cut == 0:
+            return
+        self.__compacting = asyncio.get_running_loop().create_task(self.__compact(window[:cut]), name="chat-compact")
+
+    async def __compact(self, evicted: list[ChatMessage]):
+        summary = self.summary
+        if self.summarizer:
+            try:
+                summary = await self.summarizer(self.summary, evicted)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Chat summary failed, dropping {len(evicted)} messages: {e}")
+        # 压缩期间历史记录只会在末尾追加，被裁掉的消息仍然在固定消息之后
+        pinned = self.pinned
+        del self.history[pinned:pinned + len(evicted)]
+        self.summary = summary
+        self.__summaryMessage = ChatMessage(ChatRole.System, f"以下是之前对话的摘要：\n{summary}") if summary else None
+        logger.info(f"Chat context compacted {len(evicted)} messages, prompt now {self.promptTokens()} tokens")
+
+    def record(self, promptTokens: int, promptEvalCount: int | None, timeToFirstToken: float | None):
+        """
+        记录一次请求的提示词大小和首字延迟
+        :param promptTokens: 估算的提示词 token 数
+        :param promptEvalCount: Ollama 实际计算的提示词 token 数（命中 KV 缓存的部分不计入）
+        :param timeToFirstToken: 首字延迟（秒）
+        :return: None
+        """
+        self.records.append({"promptTokens": promptTokens, "promptEvalCount": promptEvalCount, "timeToFirstToken": timeToFirstToken})
+
+    def metrics(self) -> dict:
+        """
+        导出统计数据
+        :return: 当前提示词大小、摘要长度和最近请求的平均值
+        """
+        def mean(key: str):
+            values = [record[key] for record in self.records if record[key] is not None]
+            return sum(values) / len(values) if values else None
+
+        return {"promptTokens": self.promptTokens(),
+                "tokenBudget": self.tokenBudget,
+                "summaryTokens": estimateTokens(self.summary),
+                "windowMessages": len(self.history) - self.pinned,
+                "requests": len(self.records),
+                "meanPromptTokens": mean("promptTokens"),
+                "meanPromptEvalCount": mean("promptEvalCount"),
+                "meanTimeToFirstToken": mean("timeToFirstToken")}
+
+    def cancel(self):
+        """
+        取消正在执行的压缩
+        :return: None
+        """
+        if self.isCompacting:
+            self.__compacting.cancel()
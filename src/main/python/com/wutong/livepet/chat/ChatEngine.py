@@ -0,0 +1,832 @@
+import asyncio
+import contextlib
+import functools
+import itertools
+import threading
+import time
+from enum import Enum
+
+from PySide6.QtCore import QObject, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.chat.ChatContext import ChatContext, tokensOf, estimateTokens
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage, ChatRole
+from src.main.python.com.wutong.livepet.chat.HistoryStore import HistoryStore
+from src.main.python.com.wutong.livepet.chat.MemoryStore import MemoryStore, MemoryKind
+from src.main.python.com.wutong.livepet.chat.ModelRouter import ModelRouter, Route, RouteClass
+from src.main.python.com.wutong.livepet.chat.RequestScheduler import RequestScheduler, Priority
+from src.main.python.com.wutong.livepet.chat.ToolExecutor import ToolExecutor
+from src.main.python.com.wutong.livepet.chat.backends.ChatBackend import ChatBackend
+from src.main.python.com.wutong.livepet.chat.backends.OllamaBackend import OllamaBackend
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+SUMMARY_PROMPT = "请把下面的对话压缩成一段简短的摘要，保留用户的重要信息、偏好和尚未完成的话题，只输出摘要本身。"
+"""滚动摘要使用的提示词"""
+MEMORY_PROMPT = "以下是与当前话题可能相关的长期记忆，仅在相关时参考："
+"""长期记忆消息的开头"""
+
+
+class ModelState(Enum):
+    Cold = "cold"
+    Warming = "warming"
+    Ready = "ready"
+    Unavailable = "unavailable"
+
+
+class ChatSignals(QObject):
+    """
+    对话信号
+    在事件循环线程中发出，连接到 GUI 线程的槽时由 Qt 排队投递
+    """
+    started = Signal(int)
+    """请求开始生成: started(requestId)"""
+    chunk = Signal(int, str)
+    """流式文本块: chunk(requestId, text)，收到后需要调用 ChatEngine.ack"""
+    finished = Signal(int, str)
+    """生成完成: finished(requestId, result)"""
+    cancelled = Signal(int)
+    """请求被取消: cancelled(requestId)"""
+    failed = Signal(int, str)
+    """请求失败或超时: failed(requestId, error)"""
+    stateChanged = Signal(str, str)
+    """模型状态变化: stateChanged(ModelState.value, model)"""
+
+
+class Conversation:
+    """
+    一个对话
+    同一对话内的请求严格串行，历史记录只在事件循环线程中修改
+    """
+
+    def __init__(self,
+                 conversationId: str,
+                 system: str = "",
+                 tokenBudget: int = 1536,
+                 summarizer: callable = None,
+                 store: HistoryStore = None,
+                 restoreMessages: int = 20,
+                 memory: MemoryStore = None,
+                 router: ModelRouter = None):
+        """
+        初始化对话
+        :param conversationId: 对话ID
+        :param system: 系统提示词
+        :param tokenBudget: 提示词的 token 预算
+        :param summarizer: 摘要协程函数: await summarizer(previousSummary, messages) -> str
+        :param store: 历史存储 Default: None （不持久化）
+        :param restoreMessages: 启动时从历史存储中恢复的最近消息条数
+        :param memory: 长期记忆 Default: None （不检索也不索引）
+        :param router: 多模型路由 Default: None （全部请求使用同一个模型）
+        """
+        self.conversationId = conversationId
+        """对话ID"""
+        self.history: list[ChatMessage] = []
+        """历史记录"""
+        if system:
+            self.history.append(ChatMessage(ChatRole.System, system))
+        self.store = store
+        """历史存储"""
+        self.memory = memory
+        """长期记忆"""
+        self.router = router
+        """多模型路由"""
+        self.oldestRowId: int | None = None
+        """已加载的最旧一条消息的行ID，用于向前翻页"""
+        if store and restoreMessages > 0:
+            rows = store.loadRecent(conversationId, restoreMessages)
+            if rows:
+                self.oldestRowId = rows[0][0]
+            self.history.extend(message for _, message in rows)
+        self.context = ChatContext(self.history, tokenBudget, summarizer=summarizer)
+        """上下文管理"""
+        self.model: str | None = None
+        """对话使用的模型（由 prepare 发现并确定）"""
+        self.state = ModelState.Cold
+        """模型状态"""
+        self.ready = asyncio.Event()
+        """模型就绪事件，就绪前提交的消息在此排队"""
+        self.lastActivity = time.monotonic()
+        """最近一次用户活动的时间点"""
+        self.preferredModel: str | None = None
+        """期望使用的模型"""
+        self.options: dict = {}
+        """预加载使用的模型参数"""
+        self.warmTask: asyncio.Task | None = None
+        """发现、预加载和保活任务"""
+
+        self.signals = ChatSignals()
+        """对话信号，需要在 GUI 线程中创建"""
+
+        self.lock = asyncio.Lock()
+        """串行锁"""
+        self.unsent: list[ChatMessage] = []
+        """已提交但还没有写入历史记录的消息"""
+        self.requests: list["ChatRequest"] = []
+        """排队和正在执行的请求"""
+
+    def append(self, message: ChatMessage, persist: bool = True):
+        """
+        追加消息到历史记录并异步持久化（事件循环线程）
+        :param message: 消息
+        :param persist: 是否持久化（工具调用的中间消息不持久化）
+        :return: None
+        """
+        self.history.append(message)
+        if persist and self.store:
+            self.store.append(self.conversationId, message)
+
+    def loadOlder(self, limit: int = 20) -> list[ChatMessage]:
+        """
+        从历史存储中向前翻页，读取更早的消息（只用于显示，不进入提示词）
+        :param limit: 条数
+        :return: 消息列表，按时间从旧到新
+        """
+        if not self.store:
+            return []
+        if self.oldestRowId is None:
+            rows = self.store.loadRecent(self.conversationId, limit)
+        else:
+            rows = self.store.pageBefore(self.conversationId, self.oldestRowId, limit)
+        if rows:
+            self.oldestRowId = rows[0][0]
+        return [message for _, message in rows]
+
+
+class ChatRequest:
+    """
+    一次对话请求
+    """
+
+    def __init__(self,
+                 requestId: int,
+                 conversation: Conversation,
+                 message: ChatMessage,
+                 model: str = None,
+                 options: dict = None,
+                 tools: list[callable] = None):
+        self.requestId = requestId
+        """请求ID"""
+        self.conversation = conversation
+        """所属对话"""
+        self.message = message
+        """用户消息"""
+        self.model = model
+        """模型名，为 None 时由路由选择或使用对话的模型"""
+        self.route: Route | None = None
+        """路由选择的路由"""
+        self.routeClass: RouteClass | None = None
+        """路由类别"""
+        self.options = options or {}
+        """模型参数"""
+        self.tools = tools or []
+        """工具列表"""
+
+        self.result = ""
+        """已生成的文本"""
+        self.pending: list[str] = []
+        """因 UI 来不及消费而暂存的文本块"""
+        self.inflight = 0
+        """已发出但 UI 尚未确认的文本块数量"""
+        self.task: asyncio.Task | None = None
+        """执行任务"""
+        self.submitTime = time.perf_counter()
+        """提交的时间点"""
+        self.startTime: float | None = None
+        """开始生成的时间点"""
+        self.firstTokenTime: float | None = None
+        """收到第一个文本块的时间点"""
+        self.lastTokenTime: float | None = None
+        """收到上一个文本块的时间点"""
+        self.promptTokens: int | None = None
+        """后端实际计算的提示词 token 数"""
+        self.completionTokens: int | None = None
+        """后端生成的 token 数（多轮工具调用时累加）"""
+        self.recalled: ChatMessage | None = None
+        """本次请求检索到的长期记忆"""
+        self.toolCalls: list[dict] = []
+        """当前一轮回复中的工具调用"""
+        self.roundStart = 0
+        """当前一轮回复在 result 中的起始位置"""
+
+
+class ChatEngine:
+    """
+    异步流式对话引擎
+    在独立线程中运行 asyncio 事件循环，通过 ChatBackend（默认 Ollama）流式生成，所有模型请求经过 RequestScheduler 排队：
+    同一对话内的请求串行执行，新消息到达时取消正在生成的回复，支持首字/间隔/总时长超时，
+    UI 未确认的文本块超过 maxInflightChunks 时合并暂存，避免淹没 GUI 线程的事件队列
+    """
+
+    __instance: "ChatEngine | None" = None
+
+    def __init__(self,
+                 backend: ChatBackend = None,
+                 firstTokenTimeout: float = 60.0,
+                 idleTimeout: float = 30.0,
+                 totalTimeout: float = 300.0,
+                 maxInflightChunks: int = 4,
+                 cancelOnNewMessage: bool = True,
+                 keepAlive: float = 300.0,
+                 idleUnload: float = 1800.0,
+                 readyTimeout: float = 120.0,
+                 toolExecutor: ToolExecutor = None,
+                 maxToolRounds: int = 4,
+                 memoryTopK: int = 4,
+                 memoryTokens: int = 256,
+                 scheduler: RequestScheduler = None):
+        """
+        初始化对话引擎
+        :param backend: 对话后端 Default: None （本机 Ollama）
+        :param firstTokenTimeout: 等待第一个文本块的超时时间（秒）
+        :param idleTimeout: 两个文本块之间的超时时间（秒）
+        :param totalTimeout: 整个请求的超时时间（秒）
+        :param maxInflightChunks: UI 未确认的文本块上限
+        :param cancelOnNewMessage: 同一对话有新消息时是否取消正在生成的回复（False 则排队）
+        :param keepAlive: 每次请求时给后端的模型保活时间（秒）
+        :param idleUnload: 用户无活动超过该时间（秒）后不再续期，让模型自然卸载
+        :param readyTimeout: 消息等待模型就绪的最长时间（秒）
+        :param toolExecutor: 工具执行引擎 Default: None （4 线程，10 秒超时）
+        :param maxToolRounds: 一次请求中最多执行几轮工具调用
+        :param memoryTopK: 每次请求最多检索的长期记忆条数
+        :param memoryTokens: 注入提示词的长期记忆 token 预算
+        :param scheduler: 模型请求调度器 Default: None （同一时间只向后端发出一个请求）
+        """
+        self.backend = backend or OllamaBackend()
+        """对话后端，连接池在请求之间复用"""
+        self.firstTokenTimeout = firstTokenTimeout
+        """首字超时"""
+        self.idleTimeout = idleTimeout
+        """间隔超时"""
+        self.totalTimeout = totalTimeout
+        """总超时"""
+        self.maxInflightChunks = maxInflightChunks
+        """UI 未确认的文本块上限"""
+        self.cancelOnNewMessage = cancelOnNewMessage
+        """新消息是否取消正在生成的回复"""
+        self.keepAlive = keepAlive
+        """模型保活时间"""
+        self.idleUnload = idleUnload
+        """无活动后停止续期的时间"""
+        self.readyTimeout = readyTimeout
+        """等待模型就绪的超时"""
+        self.toolExecutor = toolExecutor or ToolExecutor()
+        """工具执行引擎"""
+        self.maxToolRounds = maxToolRounds
+        """最多工具调用轮数"""
+        self.memoryTopK = memoryTopK
+        """长期记忆检索条数"""
+        self.memoryTokens = memoryTokens
+        """长期记忆 token 预算"""
+        self.scheduler = scheduler or RequestScheduler()
+        """模型请求调度器，引擎中的所有对话共用"""
+
+        self.logger = logger
+        """日志记录器"""
+        self.metrics = MetricsRegistry.instance()
+        """指标注册表（默认关闭）"""
+
+        self.loop = asyncio.new_event_loop()
+        """事件循环"""
+        self.conversations: dict[str, Conversation] = {}
+        """对话表"""
+
+        self.__thread = threading.Thread(target=self.__run, name="ChatEngine", daemon=True)
+        self.__requestIds = itertools.count(1)
+        self.__requests: dict[int, ChatRequest] = {}
+
+    @classmethod
+    def instance(cls) -> "ChatEngine":
+        """
+        全局共享的对话引擎（首次调用时创建并启动）
+        :return: ChatEngine
+        """
+        if cls.__instance is None:
+            cls.__instance = ChatEngine()
+            cls.__instance.start()
+        return cls.__instance
+
+    @classmethod
+    def stopInstance(cls, timeout: float = 2.0) -> bool | None:
+        """
+        停止全局共享的对话引擎（如果已经创建），之后 instance() 会创建新的引擎
+        :param timeout: 等待线程退出的时间（秒）
+        :return: 是否按时停止，没有创建时为 None
+        """
+        engine = cls.__instance
+        return engine.stop(timeout) if engine is not None else None
+
+    def __run(self):
+        asyncio.set_event_loop(self.loop)
+        self.logger.success("ChatEngine event loop started")
+        self.loop.run_forever()
+        self.loop.close()
+        self.logger.info("ChatEngine event loop stopped")
+
+    @property
+    def isRunning(self) -> bool:
+        """
+        事件循环线程是否在运行
+        :return: True or False
+        """
+        return self.__thread.is_alive()
+
+    def start(self):
+        """
+        启动事件循环线程
+        :return: None
+        """
+        if not self.__thread.is_alive():
+            self.__thread.start()
+
+    def conversation(self,
+                     conversationId: str,
+                     system: str = "",
+                     tokenBudget: int = 1536,
+                     store: HistoryStore = None,
+                     restoreMessages: int = 20,
+                     memory: MemoryStore = None,
+                     router: ModelRouter = None) -> Conversation:
+        """
+        获取或创建对话（需要在 GUI 线程中调用，以保证信号对象属于 GUI 线程）
+        以下参数仅在创建时使用
+        :param conversationId: 对话ID
+        :param system: 系统提示词
+        :param tokenBudget: 提示词的 token 预算
+        :param store: 历史存储 Default: None （不持久化）
+        :param restoreMessages: 启动时从历史存储中恢复的最近消息条数
+        :param memory: 长期记忆 Default: None （不检索也不索引）
+        :param router: 多模型路由 Default: None （全部请求使用同一个模型）
+        :return: Conversation
+        """
+        if conversationId not in self.conversations:
+            conversation = Conversation(conversationId, system, tokenBudget, store=store, restoreMessages=restoreMessages, memory=memory, router=router)
+            conversation.context.summarizer = lambda summary, messages: self.summarize(conversation.model, summary, messages, conversationId)
+            self.conversations[conversationId] = conversation
+        return self.conversations[conversationId]
+
+    async def summarize(self, model: str, previousSummary: str, messages: list[ChatMessage], owner: str = "") -> str:
+        """
+        把之前的摘要和一段对话压缩成新的摘要（在事件循环线程中执行，作为后台请求排队，可以被交互请求抢占）
+        :param model: 模型名
+        :param previousSummary: 之前的摘要
+        :param messages: 需要压缩的对话
+        :param owner: 发起者（对话ID）
+        :return: 新的摘要
+        """
+        dialogue = "\n".join(f"{message.role}: {message.message}" for message in messages)
+        if previousSummary:
+            dialogue = f"之前的摘要：{previousSummary}\n{dialogue}"
+        request = functools.partial(self.backend.chat,
+                                    model,
+                                    [ChatMessage(ChatRole.System, SUMMARY_PROMPT), ChatMessage(ChatRole.User, dialogue)],
+                                    keepAlive=self.keepAlive)
+        response = await self.scheduler.run(request, Priority.Background, owner, key=f"summary:{model}:{hash(dialogue)}")
+        return response.strip()
+
+    def submit(self,
+               conversationId: str,
+               message: ChatMessage,
+               model: str = None,
+               options: dict = None,
+               tools: list[callable] = None) -> int:
+        """
+        提交一条消息（线程安全，立即返回），模型未就绪时排队等待
+        :param conversationId: 对话ID
+        :param message: 用户消息
+        :param model: 模型名 Default: None （使用 prepare 确定的模型）
+        :param options: 模型参数
+        :param tools: 工具列表
+        :return: 请求ID
+        """
+        request = ChatRequest(next(self.__requestIds), self.conversations[conversationId], message, model, options, tools)
+        request.conversation.lastActivity = time.monotonic()
+        self.loop.call_soon_threadsafe(self.__schedule, request)
+        return request.requestId
+
+    def record(self, conversationId: str, messages: list[ChatMessage]) -> int:
+        """
+        把不经过模型的一轮对话（例如缓存的回复）写入历史记录（线程安全，立即返回）
+        与 submit 一样会取消正在生成的回复，并分配新的请求ID，使旧请求的文本块被过滤
+        :param conversationId: 对话ID
+        :param messages: 消息列表
+        :return: 请求ID
+        """
+        conversation = self.conversations[conversationId]
+        conversation.lastActivity = time.monotonic()
+
+        def schedule():
+            if self.cancelOnNewMessage:
+                self.__cancelAll(conversation)
+            self.loop.create_task(self.__record(conversation, messages), name=f"record-{conversationId}")
+
+        self.loop.call_soon_threadsafe(schedule)
+        return next(self.__requestIds)
+
+    async def __record(self, conversation: Conversation, messages: list[ChatMessage]):
+        async with conversation.lock:
+            for message in conversation.unsent + messages:
+                conversation.append(message)
+            conversation.unsent.clear()
+
+    def remember(self, conversationId: str, fact: str):
+        """
+        记住一条用户相关的事实（线程安全，在后台索引）
+        :param conversationId: 对话ID
+        :param fact: 事实
+        :return: None
+        """
+        memory = self.conversations[conversationId].memory
+        if memory:
+            memory.add(fact, MemoryKind.Fact)
+
+    def prepare(self, conversationId: str, preferredModel: str, options: dict = None):
+        """
+        在后台发现可用模型并预加载（线程安全，立即返回），状态通过 stateChanged 信号通知
+        期望的模型不存在时使用第一个可用模型；后端不可用时按退避间隔重试
+        :param conversationId: 对话ID
+        :param preferredModel: 期望使用的模型
+        :param options: 预加载使用的模型参数
+        :return: None
+        """
+        conversation = self.conversations[conversationId]
+        conversation.preferredModel = preferredModel
+        conversation.options = options or {}
+        self.loop.call_soon_threadsafe(self.__warm, conversation)
+
+    def touch(self, conversationId: str):
+        """
+        记录用户活动（线程安全），例如打开聊天框；模型已经冷却时重新预加载
+        :param conversationId: 对话ID
+        :return: None
+        """
+        conversation = self.conversations[conversationId]
+        conversation.lastActivity = time.monotonic()
+        if conversation.state is ModelState.Cold and conversation.preferredModel:
+            self.loop.call_soon_threadsafe(self.__warm, conversation)
+
+    def release(self, conversationId: str):
+        """
+        取消对话的全部请求和后台保活任务（线程安全）
+        :param conversationId: 对话ID
+        :return: None
+        """
+        conversation = self.conversations[conversationId]
+
+        def cancel():
+            self.__cancelAll(conversation)
+            if conversation.warmTask:
+                conversation.warmTask.cancel()
+
+        self.loop.call_soon_threadsafe(cancel)
+
+    async def unload(self, model: str):
+        """
+        立即从后端卸载模型
+        :param model: 模型名
+        :return: None
+        """
+        if model:
+            await self.backend.unload(model)
+            self.logger.info(f"Model {model} unloaded")
+
+    async def closeConversation(self, conversationId: str) -> dict[str, BaseException | None]:
+        """
+        关闭对话（在事件循环中执行）：取消全部请求和后台保活任务并移出对话表，
+        同时卸载这个对话使用（包括路由使用）、其他对话都不再使用的模型
+        :param conversationId: 对话ID
+        :return: {卸载的模型名: 卸载失败的异常，成功时为 None}
+        """
+        conversation = self.conversations.pop(conversationId, None)
+        if conversation is None:
+            return {}
+        self.__cancelAll(conversation)
+        if conversation.warmTask:
+            conversation.warmTask.cancel()
+        inUse = {model for other in self.conversations.values() for model in self.__modelsOf(other)}
+        models = [model for model in self.__modelsOf(conversation) if model not in inUse]
+        for model in models:
+            self.logger.info(f"Unloading model {model}...")
+        results = await asyncio.gather(*(self.unload(model) for model in models), return_exceptions=True)
+        return {model: result for model, result in zip(models, results)}
+
+    @staticmethod
+    def __modelsOf(conversation: Conversation) -> list[str]:
+        models = [conversation.model]
+        if conversation.router:
+            models += [route.model for route in conversation.router.routes.values()]
+        return [model for model in dict.fromkeys(models) if model]
+
+    def __setState(self, conversation: Conversation, state: ModelState):
+        if conversation.state is not state:
+            conversation.state = state
+            conversation.signals.stateChanged.emit(state.value, conversation.model or "")
+            self.logger.info(f"Conversation {conversation.conversationId} model {conversation.model} {state.value}")
+
+    def __warm(self, conversation: Conversation):
+        if conversation.warmTask and not conversation.warmTask.done():
+            if conversation.state is not ModelState.Cold:
+                return
+            conversation.warmTask.cancel()
+        conversation.warmTask = self.loop.create_task(self.__prepare(conversation), name=f"warm-{conversation.conversationId}")
+
+    async def __prepare(self, conversation: Conversation):
+        delay = 1.0
+        while True:
+            self.__setState(conversation, ModelState.Warming)
+            try:
+                models = await self.backend.listModels()
+                if not models:
+                    raise RuntimeError("no model installed")
+                if conversation.preferredModel in models:
+                    conversation.model = conversation.preferredModel
+                else:
+                    self.logger.warning(f"Model {conversation.preferredModel} not found, use {models[0]} instead.")
+                    conversation.model = models[0]
+                if conversation.router:
+                    conversation.router.resolve(models, conversation.model)
+                for model in self.__warmModels(conversation):
+                    self.logger.info(f"Preloading model {model}...")
+                    # 多个对话预加载同一个模型时只请求一次；加载中途取消并不会让后端停止加载，因此不可抢占
+                    await self.scheduler.run(functools.partial(self.backend.load, model, conversation.options, self.keepAlive),
+                                             Priority.Background, conversation.conversationId, key=f"load:{model}", preemptible=False)
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"Model discovery failed, retry in {delay:.0f}s: {e}")
+                self.__setState(conversation, ModelState.Unavailable)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+        conversation.ready.set()
+        self.__setState(conversation, ModelState.Ready)
+        await self.__keepWarm(conversation)
+
+    async def __keepWarm(self, conversation: Conversation):
+        """
+        在保活时间到期前续期；用户长时间无活动则停止续期，模型由后端自然卸载
+        """
+        while True:
+            await asyncio.sleep(self.keepAlive * 0.8)
+            if time.monotonic() - conversation.lastActivity > self.idleUnload:
+                conversation.ready.clear()
+                self.__setState(conversation, ModelState.Cold)
+                return
+            if conversation.requests:  # 正在进行的请求本身会续期
+                continue
+            for model in self.__warmModels(conversation):
+                try:
+                    await self.scheduler.run(functools.partial(self.backend.load, model, keepAlive=self.keepAlive),
+                                             Priority.Background, conversation.conversationId, key=f"load:{model}")
+                except Exception as e:
+                    self.logger.warning(f"Refreshing keep_alive of {model} failed: {e}")
+
+    @staticmethod
+    def __warmModels(conversation: Conversation) -> list[str]:
+        """
+        需要预加载和续期的模型：对话的模型和路由中常驻的模型
+        """
+        return list(dict.fromkeys([conversation.model, *(conversation.router.warmModels if conversation.router else [])]))
+
+    def cancel(self, conversationId: str):
+        """
+        取消对话中排队和正在生成的请求（线程安全）
+        :param conversationId: 对话ID
+        :return: None
+        """
+        self.loop.call_soon_threadsafe(self.__cancelAll, self.conversations[conversationId])
+
+    def ack(self, requestId: int):
+        """
+        UI 确认已消费一个文本块（线程安全）
+        :param requestId: 请求ID
+        :return: None
+        """
+        self.loop.call_soon_threadsafe(self.__ack, requestId)
+
+    def run(self, coroutine):
+        """
+        在事件循环中执行协程（线程安全）
+        :param coroutine: 协程
+        :return: concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self, timeout: float = 2.0) -> bool:
+        """
+        取消全部请求并停止事件循环，停止的是全局共享的引擎时同时清除 instance()
+        :param timeout: 等待线程退出的时间（秒）
+        :return: 事件循环线程是否按时退出
+        """
+        if ChatEngine.__instance is self:
+            ChatEngine.__instance = None
+        if not self.__thread.is_alive():
+            return True
+
+        async def shutdown():
+            tasks = [request.task for request in self.__requests.values() if request.task]
+            tasks += [conversation.warmTask for conversation in self.conversations.values() if conversation.warmTask]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.backend.close()
+            self.toolExecutor.shutdown()
+
+        try:
+            self.run(shutdown()).result(timeout)
+        except Exception as e:
+            self.logger.warning(f"ChatEngine shutdown incomplete: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.__thread.join(timeout)
+        return not self.__thread.is_alive()
+
+    def __schedule(self, request: ChatRequest):
+        conversation = request.conversation
+        if conversation.state is ModelState.Cold and conversation.preferredModel:
+            self.__warm(conversation)
+        if self.cancelOnNewMessage:
+            self.__cancelAll(conversation)
+        conversation.unsent.append(request.message)
+        conversation.requests.append(request)
+        self.__requests[request.requestId] = request
+        request.task = self.loop.create_task(self.__process(request), name=f"chat-{request.requestId}")
+
+    def __cancelAll(self, conversation: Conversation):
+        for request in conversation.requests:
+            if request.task and not request.task.done():
+                request.task.cancel()
+
+    async def __process(self, request: ChatRequest):
+        conversation = request.conversation
+        signals = conversation.signals
+        try:
+            async with conversation.lock:
+                # 排队期间被取消的消息也写入历史，保证上下文完整
+                for message in conversation.unsent:
+                    conversation.append(message)
+                conversation.unsent.clear()
+                try:
+                    if not request.model and not conversation.ready.is_set():
+                        async with asyncio.timeout(self.readyTimeout):
+                            await conversation.ready.wait()
+                    conversation.context.maintain()
+                    if not request.model and conversation.router:
+                        request.route, request.routeClass, reason = conversation.router.route(
+                            request.message, request.tools, conversation.context.promptTokens())
+                        request.model = request.route.model
+                        self.logger.info(f"Chat request {request.requestId} routed to {request.routeClass.value} model {request.model} ({reason})")
+                    request.model = request.model or conversation.model
+                    conversation.model = conversation.model or request.model
+                    request.recalled = await self.__recall(request)
+                    # 每个路由单独限制并发；没有路由时由对话锁保证串行
+                    async with request.route.semaphore if request.route else contextlib.nullcontext():
+                        signals.started.emit(request.requestId)
+                        async with asyncio.timeout(self.totalTimeout):
+                            await self.__stream(request)
+                            rounds = 0
+                            while request.toolCalls and rounds < self.maxToolRounds:
+                                rounds += 1
+                                await self.__runTools(request)
+                                await self.__stream(request)
+                    if request.route:
+                        conversation.router.record(request.routeClass,
+                                                   request.firstTokenTime - request.startTime if request.firstTokenTime else None,
+                                                   time.perf_counter() - request.startTime)
+                    if self.metrics.enabled:
+                        self.__observe(request)
+                    self.__flush(request)
+                    conversation.append(ChatMessage(ChatRole.Assistant, request.result[request.roundStart:]))
+                    if conversation.memory and request.result:
+                        conversation.memory.add(f"用户：{request.message.message}\n回复：{request.result}", anchor=request.message.message)
+                    signals.finished.emit(request.requestId, request.result)
+                except asyncio.CancelledError:
+                    if request.result[request.roundStart:]:
+                        conversation.append(ChatMessage(ChatRole.Assistant, request.result[request.roundStart:]))
+                    raise
+                except TimeoutError:
+                    self.logger.warning(f"Chat request {request.requestId} timed out")
+                    signals.failed.emit(request.requestId, "timeout")
+                except Exception as e:
+                    self.logger.exception(f"Chat request {request.requestId} failed: {e}")
+                    signals.failed.emit(request.requestId, str(e))
+        except asyncio.CancelledError:
+            self.logger.info(f"Chat request {request.requestId} cancelled")
+            signals.cancelled.emit(request.requestId)
+        finally:
+            conversation.requests.remove(request)
+            self.__requests.pop(request.requestId, None)
+
+    async def __recall(self, request: ChatRequest) -> ChatMessage | None:
+        """
+        检索与用户消息相关的长期记忆，排除已经在上下文中的对话，按 token 预算截断
+        """
+        conversation = request.conversation
+        if not conversation.memory or not request.message.message:
+            return None
+        inContext = {message.message for message in conversation.history if message.role == ChatRole.User.value}
+        results = await asyncio.to_thread(conversation.memory.search, request.message.message, self.memoryTopK, excludeAnchors=inContext)
+        lines, budget = [], self.memoryTokens
+        for text, _ in results:
+            budget -= estimateTokens(text)
+            if budget < 0:
+                break
+            lines.append(f"- {text}")
+        if not lines:
+            return None
+        if self.metrics.enabled:
+            self.metrics.observe("chat.recalledMemories", len(lines), "memories", MetricsRegistry.COUNT_BUCKETS)
+        return ChatMessage(ChatRole.System, "\n".join([MEMORY_PROMPT, *lines]))
+
+    async def __runTools(self, request: ChatRequest):
+        """
+        执行一轮工具调用，把调用和结果写入历史记录（不持久化），随后继续生成
+        """
+        conversation = request.conversation
+        calls = request.toolCalls
+        for index, call in enumerate(calls):
+            call["id"] = call.get("id") or f"call_{request.requestId}_{len(conversation.history)}_{index}"
+        conversation.append(ChatMessage(ChatRole.Assistant, request.result[request.roundStart:], toolCalls=calls), persist=False)
+        self.logger.info(f"Chat request {request.requestId} calling tools {[call['name'] for call in calls]}")
+        results = await self.toolExecutor.execute(calls, request.tools)
+        for call, result in zip(calls, results):
+            conversation.append(ChatMessage(ChatRole.Tool, result, toolCallId=call["id"], toolName=call["name"]), persist=False)
+        request.toolCalls = []
+        request.roundStart = len(request.result)
+
+    async def __stream(self, request: ChatRequest):
+        async with self.scheduler.slot(Priority.Interactive, request.conversation.conversationId):
+            await self.__generate(request)
+
+    async def __generate(self, request: ChatRequest):
+        context = request.conversation.context
+        messages = context.build(request.recalled)
+        if request.startTime is None:
+            request.startTime = time.perf_counter()
+        keepAlive = request.route.keepAlive if request.route and request.route.keepAlive is not None else self.keepAlive
+        stream = self.backend.stream(request.model, messages, request.options, keepAlive, request.tools)
+        timeout = self.firstTokenTimeout
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(anext(stream), timeout)
+                except StopAsyncIteration:
+                    break
+                timeout = self.idleTimeout
+                if chunk.text:
+                    now = time.perf_counter()
+                    if request.firstTokenTime is None:
+                        request.firstTokenTime = now
+                    elif self.metrics.enabled:
+                        self.metrics.observe("chat.interTokenLatency", now - request.lastTokenTime)
+                    request.lastTokenTime = now
+                    request.result += chunk.text
+                    self.__emit(request, chunk.text)
+                if chunk.toolCalls:
+                    request.toolCalls.extend(chunk.toolCalls)
+                if chunk.done:
+                    request.promptTokens = chunk.promptTokens
+                    if chunk.completionTokens is not None:
+                        request.completionTokens = (request.completionTokens or 0) + chunk.completionTokens
+                    context.record(sum(tokensOf(message) for message in messages),
+                                   chunk.promptTokens,
+                                   request.firstTokenTime - request.startTime if request.firstTokenTime else None)
+        finally:
+            await stream.aclose()
+
+    def __observe(self, request: ChatRequest):
+        """
+        记录一次完成的请求：排队等待、首字延迟、总耗时、生成速度和 token 数
+        """
+        now = time.perf_counter()
+        metrics = self.metrics
+        metrics.observe("chat.queueWait", request.startTime - request.submitTime)
+        metrics.observe("chat.duration", now - request.submitTime)
+        metrics.observe("chat.promptTokens", request.promptTokens, "tokens", MetricsRegistry.COUNT_BUCKETS)
+        metrics.observe("chat.completionTokens", request.completionTokens, "tokens", MetricsRegistry.COUNT_BUCKETS)
+        if request.firstTokenTime is None:
+            return
+        metrics.observe("chat.timeToFirstToken", request.firstTokenTime - request.startTime)
+        generating = request.lastTokenTime - request.firstTokenTime
+        if request.completionTokens and generating > 0:
+            metrics.observe("chat.tokensPerSecond", (request.completionTokens - 1) / generating, "tokens/s", MetricsRegistry.RATE_BUCKETS)
+
+    def __emit(self, request: ChatRequest, text: str):
+        if request.inflight >= self.maxInflightChunks:
+            request.pending.append(text)
+            return
+        request.inflight += 1
+        request.conversation.signals.chunk.emit(request.requestId, text)
+
+    def __flush(self, request: ChatRequest):
+        if request.pending:
+            text = "".join(request.pending)
+            request.pending.clear()
+            request.inflight += 1
+            request.conversation.signals.chunk.emit(request.requestId, text)
+
+    def __ack(self, requestId: int):
+        request = self.__requests.get(requestId)
+        if request is None:
+            return
+        request.inflight = max(0, request.inflight - 1)
+        if request.inflight < self.maxInflightChunks:
+            self.__flush(request)
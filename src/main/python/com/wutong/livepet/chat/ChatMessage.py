@@ -0,0 +1,49 @@
+from enum import Enum
+
+
+class ChatRole(Enum):
+    System = "system"
+    User = "user"
+    Assistant = "assistant"
+    Tool = "tool"
+
+
+class ChatMessage:
+    def __init__(self,
+                 role: ChatRole | str,
+                 message: str,
+                 image: str = None,
+                 toolCalls: list[dict] = None,
+                 toolCallId: str = None,
+                 toolName: str = None):
+        self.message = message
+        self.role = role if isinstance(role, str) else role.value
+        self.image = image
+        self.toolCalls = toolCalls or []
+        """助手消息中的工具调用: [{"id", "name", "arguments"}]"""
+        self.toolCallId = toolCallId
+        """工具消息对应的调用ID"""
+        self.toolName = toolName
+        """工具消息对应的工具名"""
+        self.tokens: int | None = None
+        """估算的 token 数缓存"""
+
+    def __dict__(self):
+        return {"content": self.message, "role": self.role, "image": self.image}
+
+    def __iter__(self):
+        return iter(self.__dict__().items())
+
+    def toDict(self) -> dict:
+        """
+        转换为 Ollama 接口的消息格式
+        :return: {"role", "content", "images", "tool_calls", "tool_name"}
+        """
+        message = {"role": self.role, "content": self.message}
+        if self.image:
+            message["images"] = [self.image]
+        if self.toolCalls:
+            message["tool_calls"] = [{"function": {"name": call["name"], "arguments": call["arguments"]}} for call in self.toolCalls]
+        if self.toolName:
+            message["tool_name"] = self.toolName
+        return message
@@ -0,0 +1,69 @@
+import re
+import unicodedata
+import zlib
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[^\W_]+")
+"""连续的文字和数字（去掉标点、空白和下划线）"""
+PARTICLES = "啊呀吧呢嘛哦哈呐啦"
+"""句尾语气词，规范化时去掉"""
+
+
+def normalize(text: str) -> str:
+    """
+    规范化文本：全角转半角、转小写、去掉标点、空白和句尾语气词
+    :param text: 文本
+    :return: 规范化后的文本
+    """
+    return "".join(WORD_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())).rstrip(PARTICLES)
+
+
+class Embedder:
+    """
+    本地文本向量
+    对字符 1~3 元组做带符号的特征哈希（crc32，跨进程稳定），结果 L2 归一化，
+    两个向量的点积即余弦相似度；不依赖模型，单条文本耗时在几十微秒量级
+    """
+
+    def __init__(self, dimension: int = 512, weights: tuple[float, ...] = (0.5, 1.0, 1.0)):
+        """
+        初始化文本向量
+        :param dimension: 向量维数
+        :param weights: 1 元、2 元、3 元字符组的权重
+        """
+        self.dimension = dimension
+        """向量维数"""
+        self.weights = weights
+        """各阶字符组的权重"""
+
+    def embed(self, text: str) -> np.ndarray:
+        """
+        计算文本向量
+        :param text: 文本
+        :return: float32 向量（全零表示文本为空）
+        """
+        words = WORD_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())
+        text = f"\x02{' '.join(words).rstrip(PARTICLES)}\x03"  # 首尾标记让开头和结尾的字符组单独计数
+        hashes, weights = [], []
+        for n, weight in enumerate(self.weights, 1):
+            for i in range(len(text) - n + 1):
+                hashes.append(zlib.crc32(text[i:i + n].encode()))
+                weights.append(weight)
+        if not hashes:
+            return np.zeros(self.dimension, dtype=np.float32)
+        hashes = np.asarray(hashes, dtype=np.uint32)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        vector = np.bincount(hashes % self.dimension, weights=signs * np.asarray(weights), minlength=self.dimension)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32)
+
+    def embedMany(self, texts: list[str]) -> np.ndarray:
+        """
+        批量计算文本向量
+        :param texts: 文本列表
+        :return: float32 矩阵 (len(texts), dimension)
+        """
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack([self.embed(text) for text in texts])
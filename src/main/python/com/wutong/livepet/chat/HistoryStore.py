@@ -0,0 +1,155 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from loguru import logger
+
+from src import ROOT_PATH
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage
+
+
+class HistoryStore:
+    """
+    SQLite 对话历史存储（WAL 模式）
+    写入在独立线程中批量提交，append 只入队，不会阻塞对话路径；
+    读取只按 (conversation, id) 索引取最近的若干条，启动耗时与累计的历史量无关
+    """
+
+    def __init__(self,
+                 path: str = None,
+                 batchSize: int = 64,
+                 flushInterval: float = 0.5):
+        """
+        初始化历史存储
+        :param path: 数据库文件路径 Default: None （ROOT_PATH/chatHistory/history.db）
+        :param batchSize: 单次提交的最大条数
+        :param flushInterval: 攒批的最长等待时间（秒）
+        """
+        self.path = path or os.path.join(ROOT_PATH, "chatHistory", "history.db")
+        """数据库文件路径"""
+        self.batchSize = batchSize
+        """单次提交的最大条数"""
+        self.flushInterval = flushInterval
+        """攒批的最长等待时间"""
+
+        if not os.path.exists(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+
+        self.__reader = self.__connect()
+        """读连接（WAL 模式下读写互不阻塞）"""
+        self.__readLock = threading.Lock()
+        self.__reader.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                image TEXT,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS messages_conversation ON messages (conversation, id);
+        """)
+
+        self.__queue: queue.Queue = queue.Queue()
+        self.__writer = threading.Thread(target=self.__write, name="HistoryStore", daemon=True)
+        self.__writer.start()
+
+    def __connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def __write(self):
+        connection = self.__connect()
+        running = True
+        while running:
+            batch, events = [], []
+            try:
+                item = self.__queue.get(timeout=self.flushInterval)
+            except queue.Empty:
+                continue
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batchSize or not running:
+                    break
+                try:
+                    item = self.__queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    connection.execute("BEGIN")
+                    connection.executemany("INSERT INTO messages (conversation, role, content, image, created) VALUES (?, ?, ?, ?, ?)", batch)
+                    connection.execute("COMMIT")
+                except sqlite3.Error as e:
+                    connection.execute("ROLLBACK")
+                    logger.exception(f"HistoryStore write failed, {len(batch)} messages lost: {e}")
+            for event in events:
+                event.set()
+        connection.close()
+
+    def append(self, conversationId: str, message: ChatMessage):
+        """
+        追加一条消息（线程安全，只入队）
+        :param conversationId: 对话ID
+        :param message: 消息
+        :return: None
+        """
+        self.__queue.put((conversationId, message.role, message.message, message.image, time.time()))
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待已入队的消息全部写入
+        :param timeout: 超时时间（秒）
+        :return: 是否在超时前写完
+        """
+        event = threading.Event()
+        self.__queue.put(event)
+        return event.wait(timeout)
+
+    def __select(self, sql: str, params: tuple) -> list[tuple[int, ChatMessage]]:
+        with self.__readLock:
+            rows = self.__reader.execute(sql, params).fetchall()
+        return [(rowId, ChatMessage(role, content, image)) for rowId, role, content, image in reversed(rows)]
+
+    def loadRecent(self, conversationId: str, limit: int) -> list[tuple[int, ChatMessage]]:
+        """
+        读取最近的若干条消息
+        :param conversationId: 对话ID
+        :param limit: 条数
+        :return: [(行ID, 消息)]，按时间从旧到新
+        """
+        return self.__select("SELECT id, role, content, image FROM messages WHERE conversation = ? ORDER BY id DESC LIMIT ?",
+                             (conversationId, limit))
+
+    def pageBefore(self, conversationId: str, beforeId: int, limit: int) -> list[tuple[int, ChatMessage]]:
+        """
+        向前翻页，读取 beforeId 之前的若干条消息
+        :param conversationId: 对话ID
+        :param beforeId: 行ID（不含）
+        :param limit: 条数
+        :return: [(行ID, 消息)]，按时间从旧到新
+        """
+        return self.__select("SELECT id, role, content, image FROM messages WHERE conversation = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                             (conversationId, beforeId, limit))
+
+    def close(self, timeout: float = 2.0):
+        """
+        写完剩余的消息并关闭
+        :param timeout: 等待写线程退出的时间（秒）
+        :return: None
+        """
+        if self.__writer.is_alive():
+            self.__queue.put(None)
+            self.__writer.join(timeout)
+        with self.__readLock:
+            self.__reader.close()
+        logger.info(f"HistoryStore {self.path} closed")
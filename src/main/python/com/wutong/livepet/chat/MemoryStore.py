@@ -0,0 +1,231 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from enum import Enum
+
+import numpy as np
+from loguru import logger
+
+from src import ROOT_PATH
+from src.main.python.com.wutong.livepet.chat.Embedder import Embedder
+
+
+class MemoryKind(Enum):
+    Exchange = "exchange"
+    Fact = "fact"
+
+
+class MemoryStore:
+    """
+    长期记忆向量库
+    向量保存在内存映射的 float16 矩阵文件中（每条 dimension * 2 字节），文本等元数据保存在 SQLite 表中，行号即向量的行；
+    add 只入队，嵌入和写入在后台线程中完成；search 分块把向量转换为 float32 做矩阵乘法并取 top-k，
+    几万条记忆的检索在几毫秒内完成
+    """
+
+    def __init__(self,
+                 path: str = None,
+                 embedder: Embedder = None,
+                 initialCapacity: int = 1024,
+                 dedupeThreshold: float = 0.95,
+                 blockSize: int = 2048,
+                 batchSize: int = 256):
+        """
+        初始化长期记忆
+        :param path: 保存目录 Default: None （ROOT_PATH/chatHistory/memory）
+        :param embedder: 文本向量 Default: None （1024 维字符哈希向量），同一目录必须始终使用相同的维数
+        :param initialCapacity: 向量文件的初始行数，写满后翻倍
+        :param dedupeThreshold: 与已有记忆的相似度不低于该值时不再写入
+        :param blockSize: 检索时每次转换为 float32 的行数
+        :param batchSize: 后台线程单次写入的最大条数
+        """
+        self.path = path or os.path.join(ROOT_PATH, "chatHistory", "memory")
+        """保存目录"""
+        self.embedder = embedder or Embedder(1024)
+        """文本向量"""
+        self.dimension = self.embedder.dimension
+        """向量维数"""
+        self.dedupeThreshold = dedupeThreshold
+        """去重阈值"""
+        self.blockSize = blockSize
+        """检索分块行数"""
+        self.batchSize = batchSize
+        """单次写入的最大条数"""
+
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self.__vectorsPath = os.path.join(self.path, "vectors.f16")
+        self.__lock = threading.Lock()
+        """保护向量矩阵和数据库连接"""
+        self.__database = sqlite3.connect(os.path.join(self.path, "memory.db"), check_same_thread=False, isolation_level=None)
+        self.__database.execute("PRAGMA journal_mode=WAL")
+        self.__database.execute("PRAGMA synchronous=NORMAL")
+        self.__database.execute("""
+            CREATE TABLE IF NOT EXISTS memories (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                text TEXT NOT NULL,
+                anchor TEXT,
+                created REAL NOT NULL
+            )
+        """)
+        # 以元数据为准：向量已写入但元数据未提交的行视为不存在
+        self.count = self.__database.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM memories").fetchone()[0]
+        """已索引的记忆条数"""
+        rows = os.path.getsize(self.__vectorsPath) // (self.dimension * 2) if os.path.exists(self.__vectorsPath) else 0
+        self.__vectors = self.__map(max(rows, initialCapacity, self.count))
+
+        self.__queue: queue.Queue = queue.Queue()
+        self.__indexer = threading.Thread(target=self.__index, name="MemoryStore", daemon=True)
+        self.__indexer.start()
+
+    def __map(self, capacity: int) -> np.memmap:
+        """
+        映射向量文件，文件不足 capacity 行时由 numpy 扩展
+        """
+        mode = "r+" if os.path.exists(self.__vectorsPath) else "w+"
+        return np.memmap(self.__vectorsPath, dtype=np.float16, mode=mode, shape=(capacity, self.dimension))
+
+    @property
+    def capacity(self) -> int:
+        """
+        向量文件的行数
+        :return: 行数
+        """
+        return self.__vectors.shape[0]
+
+    def add(self, text: str, kind: MemoryKind = MemoryKind.Exchange, anchor: str = None):
+        """
+        添加一条记忆（线程安全，只入队，在后台线程中嵌入和写入）
+        :param text: 记忆文本
+        :param kind: 记忆类型：一轮对话或用户相关的事实
+        :param anchor: 来源标识，例如这一轮对话的用户消息，检索时可以据此排除已经在上下文中的记忆
+        :return: None
+        """
+        if text and text.strip():
+            self.__queue.put((text.strip(), kind.value, anchor, time.time()))
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待已入队的记忆全部写入
+        :param timeout: 超时时间（秒）
+        :return: 是否在超时前写完
+        """
+        event = threading.Event()
+        self.__queue.put(event)
+        return event.wait(timeout)
+
+    def __index(self):
+        running = True
+        while running:
+            batch, events = [], []
+            item = self.__queue.get()
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.batchSize or not running:
+                    break
+                try:
+                    item = self.__queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self.__write(batch)
+                except Exception as e:
+                    logger.exception(f"MemoryStore indexing failed, {len(batch)} memories lost: {e}")
+            for event in events:
+                event.set()
+
+    def __write(self, batch: list[tuple]):
+        vectors = self.embedder.embedMany([text for text, *_ in batch])
+        # 与已有记忆去重：整批向量与全部记忆分块相乘，取每条的最大相似度
+        existing = np.full(len(batch), -1.0, dtype=np.float32)
+        with self.__lock:
+            for start in range(0, self.count, self.blockSize):
+                block = self.__vectors[start:min(start + self.blockSize, self.count)].astype(np.float32)
+                existing = np.maximum(existing, (vectors @ block.T).max(axis=1))
+        similarity = vectors @ vectors.T
+        keep = []
+        for index in range(len(batch)):  # 同一批内去重
+            if existing[index] < self.dedupeThreshold and not (similarity[index, keep] >= self.dedupeThreshold).any():
+                keep.append(index)
+        if not keep:
+            return
+        with self.__lock:
+            capacity = self.capacity
+            while self.count + len(keep) > capacity:
+                capacity *= 2
+            if capacity != self.capacity:
+                self.__vectors.flush()
+                del self.__vectors  # Windows 下扩展文件前必须先释放旧的映射
+                self.__vectors = self.__map(capacity)
+            self.__vectors[self.count:self.count + len(keep)] = vectors[keep]
+            self.__database.execute("BEGIN")
+            self.__database.executemany("INSERT INTO memories (id, text, kind, anchor, created) VALUES (?, ?, ?, ?, ?)",
+                                        [(self.count + offset, *batch[index]) for offset, index in enumerate(keep)])
+            self.__database.execute("COMMIT")
+            self.count += len(keep)
+
+    def __topK(self, vector: np.ndarray, k: int) -> list[tuple[int, float]]:
+        with self.__lock:
+            vectors, count = self.__vectors, self.count
+            ids, scores = [], []
+            for start in range(0, count, self.blockSize):
+                block = vectors[start:min(start + self.blockSize, count)].astype(np.float32) @ vector
+                take = min(k, len(block))
+                best = np.argpartition(block, -take)[-take:]
+                ids.append(best + start)
+                scores.append(block[best])
+        if not ids:
+            return []
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        order = np.argsort(scores)[::-1]
+        return [(int(ids[i]), float(scores[i])) for i in order[:k]]
+
+    def search(self, query: str, k: int = 5, minScore: float = 0.1, excludeAnchors: set[str] = None) -> list[tuple[str, float]]:
+        """
+        检索最相关的记忆（线程安全）
+        :param query: 查询文本
+        :param k: 最多返回的条数
+        :param minScore: 最低余弦相似度
+        :param excludeAnchors: 排除这些来源的记忆（例如已经在上下文窗口中的对话）
+        :return: [(记忆文本, 相似度)]，按相似度从高到低
+        """
+        if not self.count:
+            return []
+        vector = self.embedder.embed(query)
+        # 多取一些候选，过滤掉被排除的来源后仍能凑够 k 条
+        candidates = [(i, score) for i, score in self.__topK(vector, k * 2 + len(excludeAnchors or ())) if score >= minScore]
+        if not candidates:
+            return []
+        with self.__lock:
+            rows = dict((row[0], row[1:]) for row in self.__database.execute(
+                f"SELECT id, text, anchor FROM memories WHERE id IN ({','.join('?' * len(candidates))})", [i for i, _ in candidates]))
+        results = []
+        for i, score in candidates:
+            text, anchor = rows.get(i, (None, None))
+            if text is None or (excludeAnchors and anchor in excludeAnchors):
+                continue
+            results.append((text, score))
+        return results[:k]
+
+    def close(self, timeout: float = 2.0):
+        """
+        写完剩余的记忆并关闭
+        :param timeout: 等待后台线程退出的时间（秒）
+        :return: None
+        """
+        if self.__indexer.is_alive():
+            self.__queue.put(None)
+            self.__indexer.join(timeout)
+        with self.__lock:
+            self.__vectors.flush()
+            self.__database.close()
+        logger.info(f"MemoryStore {self.path} closed with {self.count} memories")
@@ -0,0 +1,179 @@
+import asyncio
+import re
+import threading
+from collections import deque
+from enum import Enum
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage
+from src.main.python.com.wutong.livepet.metrics.Histogram import Histogram
+
+HEAVY_PATTERN = re.compile(r"为什么|为啥|怎么|如何|解释|分析|总结|比较|区别|原理|翻译|写一|帮我写|代码|步骤|计划|推荐|"
+                           r"\b(why|how|explain|analy[sz]e|summari[sz]e|compare|translate|write|code|steps?|plan)\b",
+                           re.IGNORECASE)
+"""需要推理或较长回答的问题"""
+
+CODE_PATTERN = re.compile(r"```|def |class |function |import |[{};]\s*$", re.MULTILINE)
+"""消息中包含代码"""
+
+
+class RouteClass(Enum):
+    Fast = "fast"
+    Heavy = "heavy"
+
+
+class Route:
+    """
+    一条路由：模型、并发上限和保活策略
+    """
+
+    def __init__(self, model: str, maxConcurrency: int = 1, keepAlive: float = None, keepWarm: bool = False):
+        """
+        初始化路由
+        :param model: 模型名
+        :param maxConcurrency: 同时发往该模型的请求上限
+        :param keepAlive: 请求时给后端的保活时间（秒） Default: None （使用 ChatEngine.keepAlive）
+        :param keepWarm: 是否在空闲时持续续期，保持常驻
+        """
+        self.model = model
+        """模型名"""
+        self.maxConcurrency = maxConcurrency
+        """并发上限"""
+        self.keepAlive = keepAlive
+        """保活时间"""
+        self.keepWarm = keepWarm
+        """是否常驻"""
+        self.semaphore = asyncio.Semaphore(maxConcurrency)
+        """并发信号量（在事件循环线程中使用）"""
+
+
+class ModelRouter:
+    """
+    多模型路由
+    用本地的廉价规则给每个请求分类：短的闲聊交给常驻的小模型，长问题、需要推理、带代码、带图片或需要工具的请求交给大模型；
+    每个模型单独限制并发，大模型使用较短的保活时间，用完后尽快释放显存。
+    每次路由的决策和各路由的首字延迟、总耗时都会记录下来，用于调整规则
+    """
+
+    def __init__(self,
+                 fast: Route,
+                 heavy: Route,
+                 fastMaxChars: int = 24,
+                 fastMaxHistoryTokens: int = None,
+                 fastSupportsTools: bool = False,
+                 fastSupportsImages: bool = False):
+        """
+        初始化多模型路由
+        :param fast: 小模型路由
+        :param heavy: 大模型路由
+        :param fastMaxChars: 小模型处理的最长消息（字符）
+        :param fastMaxHistoryTokens: 上下文超过该 token 数时使用大模型 Default: None （不限制）
+        :param fastSupportsTools: 小模型是否能可靠地调用工具
+        :param fastSupportsImages: 小模型是否支持图片
+        """
+        self.routes = {RouteClass.Fast: fast, RouteClass.Heavy: heavy}
+        """路由表"""
+        self.fastMaxChars = fastMaxChars
+        """小模型处理的最长消息"""
+        self.fastMaxHistoryTokens = fastMaxHistoryTokens
+        """小模型处理的最大上下文"""
+        self.fastSupportsTools = fastSupportsTools
+        """小模型是否支持工具"""
+        self.fastSupportsImages = fastSupportsImages
+        """小模型是否支持图片"""
+
+        self.decisions: deque[dict] = deque(maxlen=200)
+        """最近的路由决策"""
+        self.__lock = threading.Lock()
+        self.__counts: dict[str, int] = {}
+        """各路由原因的次数"""
+        self.__histograms: dict[str, Histogram] = {}
+        """各路由的延迟直方图"""
+
+    @property
+    def warmModels(self) -> list[str]:
+        """
+        需要常驻的模型
+        :return: 模型名列表
+        """
+        return list(dict.fromkeys(route.model for route in self.routes.values() if route.keepWarm))
+
+    def resolve(self, installed: list[str], fallback: str):
+        """
+        把未安装的模型替换为 fallback（在发现模型后调用）
+        :param installed: 已安装的模型
+        :param fallback: 替代模型
+        :return: None
+        """
+        for routeClass, route in self.routes.items():
+            if route.model not in installed:
+                logger.warning(f"Route {routeClass.value} model {route.model} not found, use {fallback} instead.")
+                route.model = fallback
+
+    def classify(self, message: ChatMessage, tools: list = None, historyTokens: int = 0) -> tuple[RouteClass, str]:
+        """
+        给请求分类
+        :param message: 用户消息
+        :param tools: 请求携带的工具
+        :param historyTokens: 当前上下文的 token 数
+        :return: (路由类别, 原因)
+        """
+        text = message.message or ""
+        if message.image and not self.fastSupportsImages:
+            return RouteClass.Heavy, "image"
+        if tools and not self.fastSupportsTools:
+            return RouteClass.Heavy, "tools"
+        if len(text) > self.fastMaxChars:
+            return RouteClass.Heavy, "length"
+        if CODE_PATTERN.search(text):
+            return RouteClass.Heavy, "code"
+        if HEAVY_PATTERN.search(text):
+            return RouteClass.Heavy, "question"
+        if self.fastMaxHistoryTokens and historyTokens > self.fastMaxHistoryTokens:
+            return RouteClass.Heavy, "context"
+        return RouteClass.Fast, "smalltalk"
+
+    def route(self, message: ChatMessage, tools: list = None, historyTokens: int = 0) -> tuple[Route, RouteClass, str]:
+        """
+        选择路由并记录决策
+        :param message: 用户消息
+        :param tools: 请求携带的工具
+        :param historyTokens: 当前上下文的 token 数
+        :return: (路由, 路由类别, 原因)
+        """
+        routeClass, reason = self.classify(message, tools, historyTokens)
+        with self.__lock:
+            key = f"{routeClass.value}.{reason}"
+            self.__counts[key] = self.__counts.get(key, 0) + 1
+        self.decisions.append({"route": routeClass.value, "reason": reason, "chars": len(message.message or "")})
+        return self.routes[routeClass], routeClass, reason
+
+    def record(self, routeClass: RouteClass, timeToFirstToken: float | None, duration: float):
+        """
+        记录一次请求在该路由上的延迟
+        :param routeClass: 路由类别
+        :param timeToFirstToken: 首字延迟（秒）
+        :param duration: 总耗时（秒）
+        :return: None
+        """
+        for name, value in ((f"{routeClass.value}.timeToFirstToken", timeToFirstToken), (f"{routeClass.value}.duration", duration)):
+            if value is None:
+                continue
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                with self.__lock:
+                    histogram = self.__histograms.setdefault(name, Histogram(f"route.{name}", "s"))
+            histogram.observe(value)
+
+    def metrics(self) -> dict:
+        """
+        导出路由统计
+        :return: {"models", "decisions", "latency"}
+        """
+        with self.__lock:
+            counts = dict(self.__counts)
+            histograms = dict(self.__histograms)
+        return {"models": {routeClass.value: route.model for routeClass, route in self.routes.items()},
+                "decisions": counts,
+                "latency": {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}}
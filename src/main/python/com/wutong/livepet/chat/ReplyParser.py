@@ -0,0 +1,251 @@
+import time
+from enum import Enum
+
+from loguru import logger
+
+SENTENCE_ENDS = "。！？!?…\n"
+"""句末标点"""
+
+
+class ActionKind(Enum):
+    Motion = "motion"
+    Expression = "expression"
+
+
+class ReplyAction:
+    """
+    回复中的标记或关键词触发的动作：播放动作或切换表情
+    """
+
+    def __init__(self, kind: ActionKind, name: str, group: str = None, priority: int = 2):
+        """
+        初始化动作
+        :param kind: 动作类型
+        :param name: 动作名或表情名
+        :param group: 动作组名（仅动作）
+        :param priority: 动作优先级（仅动作）
+        """
+        self.kind = kind
+        """动作类型"""
+        self.name = name
+        """动作名或表情名"""
+        self.group = group
+        """动作组名"""
+        self.priority = priority
+        """动作优先级"""
+
+    @classmethod
+    def motion(cls, group: str, name: str, priority: int = 2) -> "ReplyAction":
+        """
+        播放动作
+        :param group: 动作组名
+        :param name: 动作名
+        :param priority: 优先级
+        :return: ReplyAction
+        """
+        return cls(ActionKind.Motion, name, group, priority)
+
+    @classmethod
+    def expression(cls, name: str) -> "ReplyAction":
+        """
+        切换表情
+        :param name: 表情名
+        :return: ReplyAction
+        """
+        return cls(ActionKind.Expression, name)
+
+    def apply(self, model):
+        """
+        在模型上执行动作（GUI 线程），动作组或表情不存在时只记录日志
+        :param model: Live2D
+        :return: None
+        """
+        try:
+            if self.kind is ActionKind.Motion:
+                model.startMotion(self.group, self.name, self.priority)
+            else:
+                model.loadExpression(self.name)
+        except Exception as e:
+            logger.warning(f"Reply action {self} failed: {e}")
+
+    def __repr__(self):
+        return f"{self.kind.value}({self.group + '/' if self.group else ''}{self.name})"
+
+
+class ReplyParser:
+    """
+    流式回复解析
+    逐字扫描到达的文本块，每个字只处理一次，不回头重新扫描已经输出的文本：
+    方括号标记（例如 [happy]）在闭合时触发动作并从显示文本中去掉，只有尚未闭合的标记会暂存；
+    关键词用 Aho-Corasick 自动机匹配，命中时触发动作但保留原文；句末标点可以触发一个附加动作（例如点头）。
+    同一个动作在 cooldown 秒内只触发一次
+    """
+
+    def __init__(self,
+                 markers: dict[str, ReplyAction] = None,
+                 keywords: dict[str, ReplyAction] = None,
+                 sentenceAction: ReplyAction = None,
+                 stripUnknownMarkers: bool = True,
+                 maxMarkerLength: int = 16,
+                 cooldown: float = 1.0):
+        """
+        初始化流式回复解析
+        :param markers: 标记表 {标记名: 动作}，回复中写作 [标记名]
+        :param keywords: 关键词表 {关键词: 动作}
+        :param sentenceAction: 每句话结束时触发的动作 Default: None （不触发）
+        :param stripUnknownMarkers: 是否同样去掉不在标记表中的标记（模型有时会编造标记）
+        :param maxMarkerLength: 标记名的最大长度，超过时视为普通文本
+        :param cooldown: 同一个动作的最短触发间隔（秒）
+        """
+        self.markers = {name.lower(): action for name, action in (markers or {}).items()}
+        """标记表"""
+        self.sentenceAction = sentenceAction
+        """句末动作"""
+        self.stripUnknownMarkers = stripUnknownMarkers
+        """是否去掉未知标记"""
+        self.maxMarkerLength = maxMarkerLength
+        """标记名的最大长度"""
+        self.cooldown = cooldown
+        """同一个动作的最短触发间隔"""
+
+        # Aho-Corasick 自动机：goto 表、失配指针和每个状态命中的关键词动作
+        self.__goto: list[dict[str, int]] = [{}]
+        self.__fail: list[int] = [0]
+        self.__outputs: list[list[ReplyAction]] = [[]]
+        for keyword, action in (keywords or {}).items():
+            self.__insert(keyword.lower(), action)
+        self.__build()
+
+        self.__state = 0
+        """自动机的当前状态"""
+        self.__marker: list[str] | None = None
+        """正在读取的标记（含左括号），None 表示不在标记中"""
+        self.__sentenceLength = 0
+        """当前句子已输出的字数"""
+        self.__lastFired: dict[int, float] = {}
+        """每个动作上一次触发的时间点"""
+
+    def __insert(self, keyword: str, action: ReplyAction):
+        state = 0
+        for char in keyword:
+            if char not in self.__goto[state]:
+                self.__goto.append({})
+                self.__fail.append(0)
+                self.__outputs.append([])
+                self.__goto[state][char] = len(self.__goto) - 1
+            state = self.__goto[state][char]
+        self.__outputs[state].append(action)
+
+    def __build(self):
+        queue = list(self.__goto[0].values())
+        for state in queue:  # 广度优先，queue 在遍历中增长
+            for char, child in self.__goto[state].items():
+                fallback = self.__fail[state]
+                while fallback and char not in self.__goto[fallback]:
+                    fallback = self.__fail[fallback]
+                self.__fail[child] = self.__goto[fallback].get(char, 0)
+                self.__outputs[child] = self.__outputs[child] + self.__outputs[self.__fail[child]]
+                queue.append(child)
+
+    def instructions(self) -> str:
+        """
+        提示模型使用标记的说明，可以追加到系统提示词中
+        :return: 说明文本，没有标记时为空字符串
+        """
+        if not self.markers:
+            return ""
+        return f"需要表达情绪或动作时，可以在回复中插入这些标记：{' '.join(f'[{name}]' for name in self.markers)}，标记不会显示出来。"
+
+    def reset(self):
+        """
+        开始解析新的回复
+        :return: None
+        """
+        self.__state = 0
+        self.__marker = None
+        self.__sentenceLength = 0
+
+    def feed(self, text: str) -> tuple[str, list[ReplyAction]]:
+        """
+        解析一个文本块
+        :param text: 文本块
+        :return: (需要显示的文本, 触发的动作)
+        """
+        visible, actions = [], []
+        for char in text:
+            if self.__marker is not None:
+                if char == "]":
+                    self.__closeMarker(visible, actions)
+                elif char == "[" or char in SENTENCE_ENDS or len(self.__marker) > self.maxMarkerLength:
+                    # 不是标记：原样输出暂存的文本，当前字符重新处理
+                    pending, self.__marker = self.__marker, None
+                    for item in pending:
+                        self.__emit(item, visible, actions)
+                    if char == "[":
+                        self.__marker = [char]
+                    else:
+                        self.__emit(char, visible, actions)
+                else:
+                    self.__marker.append(char)
+            elif char == "[":
+                self.__marker = [char]
+            else:
+                self.__emit(char, visible, actions)
+        return "".join(visible), actions
+
+    def flush(self) -> tuple[str, list[ReplyAction]]:
+        """
+        回复结束，输出尚未闭合的标记中暂存的文本
+        :return: (需要显示的文本, 触发的动作)
+        """
+        visible, actions = [], []
+        pending, self.__marker = self.__marker or [], None
+        for char in pending:
+            self.__emit(char, visible, actions)
+        if self.__sentenceLength and self.sentenceAction:
+            self.__fire(self.sentenceAction, actions)
+        self.reset()
+        return "".join(visible), actions
+
+    def parse(self, text: str) -> tuple[str, list[ReplyAction]]:
+        """
+        解析一段完整的回复（例如缓存的回复）
+        :param text: 回复
+        :return: (需要显示的文本, 触发的动作)
+        """
+        self.reset()
+        visible, actions = self.feed(text)
+        tail, tailActions = self.flush()
+        return visible + tail, actions + tailActions
+
+    def __closeMarker(self, visible: list[str], actions: list[ReplyAction]):
+        pending, self.__marker = self.__marker, None
+        name = "".join(pending[1:]).strip().lower()
+        action = self.markers.get(name)
+        if action is not None:
+            self.__fire(action, actions)
+        elif not (self.stripUnknownMarkers and name and name[0].isalpha() and all(char.isalnum() or char in "_- " for char in name)):
+            for char in pending + ["]"]:
+                self.__emit(char, visible, actions)
+
+    def __emit(self, char: str, visible: list[str], actions: list[ReplyAction]):
+        visible.append(char)
+        lower = char.lower()
+        state = self.__state
+        while state and lower not in self.__goto[state]:
+            state = self.__fail[state]
+        self.__state = self.__goto[state].get(lower, 0)
+        for action in self.__outputs[self.__state]:
+            self.__fire(action, actions)
+        if char in SENTENCE_ENDS:
+            if self.__sentenceLength and self.sentenceAction:
+                self.__fire(self.sentenceAction, actions)
+            self.__sentenceLength = 0
+        elif not char.isspace():
+            self.__sentenceLength += 1
+
+    def __fire(self, action: ReplyAction, actions: list[ReplyAction]):
+        now = time.monotonic()
+        if now - self.__lastFired.get(id(action), -self.cooldown) >= self.cooldown:
+            self.__lastFired[id(action)] = now
+            actions.append(action)
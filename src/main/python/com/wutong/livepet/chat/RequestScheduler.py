@@ -0,0 +1,221 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict, deque
+from enum import Enum
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+
+class Priority(Enum):
+    Interactive = 0
+    Background = 1
+
+
+class Ticket:
+    """
+    一次排队：等待被分配执行槽位
+    """
+
+    def __init__(self, priority: Priority, owner: str, preemptible: bool):
+        self.priority = priority
+        """优先级"""
+        self.owner = owner
+        """发起者（对话ID），同一优先级内按发起者轮转"""
+        self.preemptible = preemptible
+        """是否可以被交互请求抢占"""
+        self.granted = asyncio.get_running_loop().create_future()
+        """获得槽位时完成"""
+        self.task: asyncio.Task | None = None
+        """持有槽位时正在执行的任务，抢占时取消"""
+        self.preempted = False
+        """是否被抢占"""
+        self.enqueueTime = time.perf_counter()
+        """排队的时间点"""
+
+
+class RequestScheduler:
+    """
+    模型请求调度器
+    多个桌宠和组件共享同一个本地模型服务时，所有请求在这里排队：交互请求总是先于后台请求（摘要、预加载、续期）；
+    同一优先级内按发起者轮转，一个对话的积压不会饿死其他对话；同时执行的请求数不超过 maxConcurrency；
+    相同 key 的后台请求在执行期间合并为一次；交互请求到达而槽位已满时，抢占一个可抢占的后台请求，被抢占的请求稍后重新执行。
+    只能在事件循环线程中使用
+    """
+
+    def __init__(self, maxConcurrency: int = 1, preemptBackground: bool = True):
+        """
+        初始化调度器
+        :param maxConcurrency: 同时发往模型服务的请求上限（Ollama 默认串行处理同一模型的请求）
+        :param preemptBackground: 槽位已满时交互请求是否抢占后台请求
+        """
+        self.maxConcurrency = maxConcurrency
+        """并发上限"""
+        self.preemptBackground = preemptBackground
+        """是否抢占后台请求"""
+        self.__registry = MetricsRegistry.instance()
+
+        self.__queues: dict[Priority, OrderedDict[str, deque[Ticket]]] = {priority: OrderedDict() for priority in Priority}
+        """各优先级的排队：{发起者: 排队的请求}，按轮转顺序排列"""
+        self.__running: list[Ticket] = []
+        """持有槽位的请求"""
+        self.__inflight: dict[str, asyncio.Future] = {}
+        """正在执行的去重请求: {key: 结果}"""
+        self.__counters = {"granted": 0, "deduplicated": 0, "preempted": 0}
+        """调度次数"""
+
+    @property
+    def waiting(self) -> int:
+        """
+        排队中的请求数
+        :return: 请求数
+        """
+        return sum(len(tickets) for queue in self.__queues.values() for tickets in queue.values())
+
+    @property
+    def running(self) -> int:
+        """
+        持有槽位的请求数
+        :return: 请求数
+        """
+        return len(self.__running)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: Priority = Priority.Interactive, owner: str = "", preemptible: bool = False):
+        """
+        获取一个执行槽位，退出时释放
+            async with scheduler.slot(Priority.Interactive, conversationId):
+                async for chunk in backend.stream(...): ...
+        :param priority: 优先级
+        :param owner: 发起者
+        :param preemptible: 是否可以被抢占（被抢占时当前任务会被取消）
+        :return: 异步上下文管理器
+        """
+        ticket = await self.__acquire(priority, owner, preemptible)
+        try:
+            yield
+        finally:
+            self.__release(ticket)
+
+    async def run(self, factory: callable, priority: Priority = Priority.Background, owner: str = "", key: str = None, preemptible: bool = True):
+        """
+        排队执行一个请求
+        :param factory: 创建请求协程的函数，被抢占后会重新调用
+        :param priority: 优先级
+        :param owner: 发起者
+        :param key: 去重键，相同 key 的请求正在执行时直接等待它的结果 Default: None （不去重）
+        :param preemptible: 是否可以被交互请求抢占（仅对后台请求有效）
+        :return: 请求的结果
+        """
+        if key is not None:
+            if key in self.__inflight:
+                self.__counters["deduplicated"] += 1
+                return await asyncio.shield(self.__inflight[key])
+            future = asyncio.get_running_loop().create_future()
+            self.__inflight[key] = future
+            try:
+                result = await self.__run(factory, priority, owner, preemptible)
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # 没有合并的请求时避免 "exception was never retrieved"
+                raise
+            except asyncio.CancelledError:
+                future.cancel()  # 发起者被取消时，合并进来的请求同样被取消
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self.__inflight.pop(key, None)
+        return await self.__run(factory, priority, owner, preemptible)
+
+    async def __run(self, factory: callable, priority: Priority, owner: str, preemptible: bool):
+        while True:
+            ticket = await self.__acquire(priority, owner, preemptible and priority is Priority.Background)
+            try:
+                ticket.task = asyncio.get_running_loop().create_task(factory())
+                try:
+                    return await ticket.task
+                except asyncio.CancelledError:
+                    if not ticket.preempted or asyncio.current_task().cancelling():
+                        ticket.task.cancel()
+                        raise
+                    logger.info(f"Background request of {owner or 'anonymous'} preempted, requeued")
+            finally:
+                self.__release(ticket)
+
+    async def __acquire(self, priority: Priority, owner: str, preemptible: bool) -> Ticket:
+        ticket = Ticket(priority, owner, preemptible)
+        self.__queues[priority].setdefault(owner, deque()).append(ticket)
+        self.__dispatch()
+        if not ticket.granted.done() and priority is Priority.Interactive:
+            self.__preempt()
+        try:
+            await ticket.granted
+        except asyncio.CancelledError:
+            if ticket.granted.done() and not ticket.granted.cancelled():
+                self.__release(ticket)  # 刚分配到槽位就被取消
+            else:
+                self.__remove(ticket)
+            raise
+        if self.__registry.enabled:
+            self.__registry.observe(f"scheduler.{priority.name.lower()}Wait", time.perf_counter() - ticket.enqueueTime)
+        return ticket
+
+    def __remove(self, ticket: Ticket):
+        queue = self.__queues[ticket.priority]
+        tickets = queue.get(ticket.owner)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del queue[ticket.owner]
+
+    def __release(self, ticket: Ticket):
+        if ticket in self.__running:
+            self.__running.remove(ticket)
+            self.__dispatch()
+
+    def __dispatch(self):
+        while len(self.__running) < self.maxConcurrency:
+            ticket = self.__next()
+            if ticket is None:
+                return
+            self.__running.append(ticket)
+            self.__counters["granted"] += 1
+            ticket.granted.set_result(None)
+
+    def __next(self) -> Ticket | None:
+        """
+        按优先级取下一个请求；同一优先级内取队首发起者的第一个请求，然后把该发起者移到队尾
+        """
+        for priority in Priority:
+            queue = self.__queues[priority]
+            while queue:
+                owner, tickets = next(iter(queue.items()))
+                ticket = tickets.popleft()
+                if tickets:
+                    queue.move_to_end(owner)
+                else:
+                    del queue[owner]
+                if not ticket.granted.done():  # 已取消的排队
+                    return ticket
+        return None
+
+    def __preempt(self):
+        if not self.preemptBackground:
+            return
+        victims = [ticket for ticket in self.__running if ticket.preemptible and ticket.task and not ticket.preempted]
+        if victims:
+            victim = max(victims, key=lambda ticket: ticket.enqueueTime)  # 抢占最晚开始的，损失最小
+            victim.preempted = True
+            victim.task.cancel()
+            self.__counters["preempted"] += 1
+
+    def metrics(self) -> dict:
+        """
+        导出调度统计
+        :return: 排队数、执行数和各类调度次数
+        """
+        return {"waiting": self.waiting, "running": self.running, **self.__counters}
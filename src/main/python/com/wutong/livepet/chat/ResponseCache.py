@@ -0,0 +1,243 @@
+import collections
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+from loguru import logger
+
+from src import ROOT_PATH
+from src.main.python.com.wutong.livepet.chat.Embedder import Embedder, normalize, PARTICLES
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+|[^\W\d_a-z]")
+"""近似匹配比较的词: 连续的拉丁字母、连续的数字和其他单个文字"""
+FILLERS = frozenset(PARTICLES + "的")
+"""近似匹配时可以不同的虚词"""
+
+
+class ResponseCache:
+    """
+    回复缓存
+    先用规范化文本的哈希精确匹配，未命中时把问题向量与全部缓存向量做一次矩阵乘法找出相似度不低于阈值的条目，
+    近似匹配是字面的而不是语义的：候选条目的词（拉丁单词、数字和每个汉字）除虚词外必须完全相同，只允许语序和虚词不同，
+    所以只差一个词的问题（法国 / 西班牙、爱 / 恨）不会命中；过短的问题和对话进行中的问题不查缓存。
+    条目按 TTL 过期，满了之后淘汰最久未使用的条目，内容保存为 JSON，启动时重新计算向量
+    """
+
+    def __init__(self,
+                 path: str = None,
+                 threshold: float = 0.95,
+                 maxEntries: int = 512,
+                 ttl: float = 7 * 24 * 3600,
+                 minPromptLength: int = 2,
+                 maxPromptLength: int = 64,
+                 contextTimeout: float = 300.0,
+                 embedder: Embedder = None):
+        """
+        初始化回复缓存
+        :param path: 保存路径 Default: None （ROOT_PATH/chatHistory/responseCache.json），为空字符串时不保存
+        :param threshold: 近似匹配的余弦相似度阈值，>1 时只做精确匹配
+        :param maxEntries: 最大条目数
+        :param ttl: 条目的有效期（秒）
+        :param minPromptLength: 只缓存不短于该长度的问题（规范化后，单个字的应答几乎总是依赖上下文）
+        :param maxPromptLength: 只缓存不超过该长度的问题（闲聊通常很短，长问题往往依赖上下文）
+        :param contextTimeout: 对话在这段时间（秒）内有过往来时不查缓存，回复可能依赖上文
+        :param embedder: 文本向量 Default: None （512 维字符哈希向量）
+        """
+        self.path = os.path.join(ROOT_PATH, "chatHistory", "responseCache.json") if path is None else path
+        """保存路径"""
+        self.threshold = threshold
+        """相似度阈值"""
+        self.maxEntries = maxEntries
+        """最大条目数"""
+        self.ttl = ttl
+        """有效期"""
+        self.minPromptLength = minPromptLength
+        """可缓存问题的最小长度"""
+        self.maxPromptLength = maxPromptLength
+        """可缓存问题的最大长度"""
+        self.contextTimeout = contextTimeout
+        """对话空闲多久之后才查缓存"""
+        self.embedder = embedder or Embedder()
+        """文本向量"""
+
+        self.__lock = threading.Lock()
+        self.__vectors = np.zeros((maxEntries, self.embedder.dimension), dtype=np.float32)
+        """问题向量，每行一个槽位"""
+        self.__created = np.full(maxEntries, -np.inf)
+        """写入时间，-inf 表示空槽位"""
+        self.__lastUsed = np.full(maxEntries, -np.inf)
+        """最近使用时间"""
+        self.__entries: list[tuple[str, str, str] | None] = [None] * maxEntries
+        """槽位内容: (哈希, 问题, 回复)"""
+        self.__slots: dict[str, int] = {}
+        """哈希 -> 槽位"""
+
+        self.hits = 0
+        """精确命中次数"""
+        self.semanticHits = 0
+        """近似命中次数"""
+        self.misses = 0
+        """未命中次数"""
+
+        self.load()
+
+    @staticmethod
+    def key(prompt: str) -> str:
+        """
+        问题的规范化哈希
+        :param prompt: 问题
+        :return: 哈希
+        """
+        return hashlib.blake2b(normalize(prompt).encode(), digest_size=16).hexdigest()
+
+    @staticmethod
+    def tokens(prompt: str) -> collections.Counter:
+        """
+        近似匹配比较的词（不含虚词）
+        :param prompt: 问题
+        :return: {词: 次数}
+        """
+        return collections.Counter(token for token in TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", prompt).lower()) if token not in FILLERS)
+
+    def cacheable(self, prompt: str, idle: float = math.inf) -> bool:
+        """
+        问题是否可以缓存
+        :param prompt: 问题
+        :param idle: 对话距上一轮往来的时间（秒） Default: inf （没有上文）
+        :return: True or False
+        """
+        return self.minPromptLength <= len(normalize(prompt)) <= self.maxPromptLength and idle >= self.contextTimeout
+
+    def lookup(self, prompt: str, idle: float = math.inf) -> str | None:
+        """
+        查找缓存的回复
+        :param prompt: 问题
+        :param idle: 对话距上一轮往来的时间（秒） Default: inf （没有上文）
+        :return: 回复，未命中时为 None
+        """
+        if not self.cacheable(prompt, idle):
+            return None
+        now = time.time()
+        key = self.key(prompt)
+        with self.__lock:
+            slot = self.__slots.get(key)
+            if slot is not None and now - self.__created[slot] > self.ttl:
+                self.__evict(slot)
+                slot = None
+            if slot is not None:
+                self.hits += 1
+            elif self.threshold <= 1 and self.__slots:
+                scores = self.__vectors @ self.embedder.embed(prompt)
+                scores[now - self.__created > self.ttl] = -1  # 空槽位的写入时间为 -inf，同样被排除
+                candidates = np.flatnonzero(scores >= self.threshold)
+                if len(candidates):
+                    tokens = self.tokens(prompt)
+                    for candidate in candidates[np.argsort(-scores[candidates])]:
+                        if self.tokens(self.__entries[candidate][1]) == tokens:  # 相似度高但用词不同的问题不命中
+                            slot = int(candidate)
+                            self.semanticHits += 1
+                            break
+            if slot is None:
+                self.misses += 1
+                return None
+            self.__lastUsed[slot] = now
+            return self.__entries[slot][2]
+
+    def put(self, prompt: str, reply: str):
+        """
+        缓存回复，问题已存在时覆盖
+        :param prompt: 问题
+        :param reply: 回复
+        :return: None
+        """
+        if not reply or not self.cacheable(prompt):
+            return
+        self.__put(prompt, reply, time.time(), time.time())
+
+    def __put(self, prompt: str, reply: str, created: float, lastUsed: float):
+        key = self.key(prompt)
+        vector = self.embedder.embed(prompt)
+        with self.__lock:
+            slot = self.__slots.get(key)
+            if slot is None:
+                slot = int(np.argmin(self.__lastUsed))  # 空槽位的使用时间为 -inf，优先使用
+                if self.__entries[slot] is not None:
+                    self.__evict(slot)
+            self.__vectors[slot] = vector
+            self.__created[slot] = created
+            self.__lastUsed[slot] = lastUsed
+            self.__entries[slot] = (key, prompt, reply)
+            self.__slots[key] = slot
+
+    def __evict(self, slot: int):
+        self.__slots.pop(self.__entries[slot][0], None)
+        self.__entries[slot] = None
+        self.__vectors[slot] = 0
+        self.__created[slot] = -np.inf
+        self.__lastUsed[slot] = -np.inf
+
+    def __len__(self):
+        return len(self.__slots)
+
+    def clear(self):
+        """
+        清空缓存
+        :return: None
+        """
+        with self.__lock:
+            for slot in list(self.__slots.values()):
+                self.__evict(slot)
+
+    def load(self):
+        """
+        从文件恢复缓存（跳过已过期的条目）
+        :return: None
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"ResponseCache {self.path} unreadable, starting empty: {e}")
+            return
+        now = time.time()
+        items = [item for item in items if now - item["created"] <= self.ttl]
+        for item in sorted(items, key=lambda item: item["lastUsed"])[-self.maxEntries:]:
+            self.__put(item["prompt"], item["reply"], item["created"], item["lastUsed"])
+        logger.info(f"ResponseCache loaded {len(self)} entries from {self.path}")
+
+    def save(self):
+        """
+        保存缓存到文件（先写临时文件再替换，避免写到一半时损坏）
+        :return: None
+        """
+        if not self.path:
+            return
+        with self.__lock:
+            items = [{"prompt": entry[1], "reply": entry[2], "created": float(self.__created[slot]), "lastUsed": float(self.__lastUsed[slot])}
+                     for slot, entry in enumerate(self.__entries) if entry is not None]
+        if not os.path.exists(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        os.replace(temp, self.path)
+
+    def metrics(self) -> dict:
+        """
+        导出统计数据
+        :return: 条目数和命中情况
+        """
+        lookups = self.hits + self.semanticHits + self.misses
+        return {"entries": len(self),
+                "hits": self.hits,
+                "semanticHits": self.semanticHits,
+                "misses": self.misses,
+                "hitRate": (self.hits + self.semanticHits) / lookups if lookups else None}
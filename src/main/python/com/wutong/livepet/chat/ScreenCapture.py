@@ -0,0 +1,163 @@
+import base64
+import hashlib
+import io
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import pyautogui
+from PIL import Image
+from PySide6.QtCore import QObject, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.metrics.Histogram import exponentialBuckets
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+BYTE_BUCKETS = exponentialBuckets(1024, 2, 12)
+"""编码后帧大小的桶上界（1KB ~ 2MB）"""
+
+
+class Frame:
+    """
+    一帧编码后的截图
+    """
+
+    def __init__(self, data: str, digest: str, size: tuple[int, int], imageFormat: str, cached: bool):
+        self.data = data
+        """base64 编码的图片，可以直接作为 ChatMessage.image"""
+        self.digest = digest
+        """缩放后像素的哈希"""
+        self.size = size
+        """缩放后的尺寸"""
+        self.format = imageFormat
+        """编码格式"""
+        self.cached = cached
+        """内容与缓存中的某一帧相同，没有重新编码"""
+
+
+class CaptureSignals(QObject):
+    """
+    截图信号
+    在截图线程中发出，连接到 GUI 线程的槽时由 Qt 排队投递
+    """
+    captured = Signal(int, object)
+    """截图完成: captured(captureId, Frame)"""
+    failed = Signal(int, str)
+    """截图失败: failed(captureId, error)"""
+
+
+class ScreenCapture:
+    """
+    屏幕截图
+    截图、缩放到视觉模型的输入尺寸和编码都在单独的线程中完成，GUI 线程只负责提交请求和接收结果；
+    编码缓冲区在多次截图之间复用，编码结果按缩放后像素的哈希缓存，画面没有变化时直接返回缓存的同一帧
+    """
+
+    def __init__(self, maxSize: int = 1024, imageFormat: str = "JPEG", quality: int = 80, cacheSize: int = 8):
+        """
+        初始化屏幕截图（需要在 GUI 线程中创建，以保证信号对象属于 GUI 线程）
+        :param maxSize: 缩放后的最长边（像素），与视觉模型的输入尺寸一致即可
+        :param imageFormat: 编码格式：JPEG 或 PNG
+        :param quality: JPEG 质量
+        :param cacheSize: 缓存的帧数
+        """
+        self.maxSize = maxSize
+        """最长边"""
+        self.format = imageFormat.upper()
+        """编码格式"""
+        self.quality = quality
+        """JPEG 质量"""
+        self.cacheSize = cacheSize
+        """缓存的帧数"""
+        self.metrics = MetricsRegistry.instance()
+        """指标注册表"""
+
+        self.signals = CaptureSignals()
+        """截图信号"""
+        self.__pool = ThreadPoolExecutor(1, thread_name_prefix="ScreenCapture")
+        """截图线程，单线程保证缓冲区不会被并发使用"""
+        self.__buffer = io.BytesIO()
+        """复用的编码缓冲区"""
+        self.__cache: OrderedDict[str, Frame] = OrderedDict()
+        """编码结果缓存: {哈希: 帧}"""
+        self.__lock = threading.Lock()
+        self.__captureIds = itertools.count(1)
+
+    def capture(self, region: tuple[int, int, int, int] = None) -> int:
+        """
+        提交一次截图（线程安全，立即返回），结果通过 captured/failed 信号通知
+        :param region: 截图区域 (x, y, width, height) Default: None （整个屏幕）
+        :return: 截图ID
+        """
+        captureId = next(self.__captureIds)
+        self.__pool.submit(self.__run, captureId, region)
+        return captureId
+
+    def __run(self, captureId: int, region: tuple[int, int, int, int] | None):
+        try:
+            frame = self.grab(region)
+        except Exception as e:
+            logger.warning(f"Screen capture {captureId} failed: {e}")
+            self.signals.failed.emit(captureId, str(e))
+            return
+        self.signals.captured.emit(captureId, frame)
+
+    def grab(self, region: tuple[int, int, int, int] = None) -> Frame:
+        """
+        同步截图并编码（在截图线程中调用，也可以在其他非 GUI 线程中直接调用）
+        :param region: 截图区域 (x, y, width, height) Default: None （整个屏幕）
+        :return: Frame
+        """
+        start = time.perf_counter()
+        image = pyautogui.screenshot(region=region)
+        # thumbnail 先按整数倍 reduce 再插值，比直接 resize 快得多
+        image.thumbnail((self.maxSize, self.maxSize), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16).hexdigest()
+        captured = time.perf_counter()
+
+        with self.__lock:
+            frame = self.__cache.get(digest)
+            if frame is not None:
+                self.__cache.move_to_end(digest)
+        if frame is not None:
+            frame = Frame(frame.data, digest, frame.size, frame.format, True)
+        else:
+            with self.__lock:
+                self.__buffer.seek(0)
+                self.__buffer.truncate()
+                if self.format == "JPEG":
+                    image.save(self.__buffer, "JPEG", quality=self.quality)
+                else:
+                    image.save(self.__buffer, self.format, optimize=False)
+                with self.__buffer.getbuffer() as view:  # 释放视图后缓冲区才能再次 truncate
+                    data = base64.b64encode(view).decode()
+                frame = Frame(data, digest, image.size, self.format, False)
+                self.__cache[digest] = frame
+                while len(self.__cache) > self.cacheSize:
+                    self.__cache.popitem(last=False)
+
+        if self.metrics.enabled:
+            self.metrics.observe("vision.capture", captured - start)
+            if not frame.cached:
+                self.metrics.observe("vision.encode", time.perf_counter() - captured)
+            self.metrics.observe("vision.frameBytes", len(frame.data) * 3 // 4, "bytes", BYTE_BUCKETS)
+        return frame
+
+    def clear(self):
+        """
+        清空编码缓存
+        :return: None
+        """
+        with self.__lock:
+            self.__cache.clear()
+
+    def shutdown(self):
+        """
+        关闭截图线程（不等待正在进行的截图）
+        :return: None
+        """
+        self.__pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,157 @@
+import asyncio
+import inspect
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.metrics.Histogram import Histogram
+
+
+def tool(timeout: float = None, pure: bool = False, ttl: float = 60.0):
+    """
+    工具装饰器，声明工具的超时时间和缓存策略
+        @tool(timeout=3, pure=True, ttl=600)
+        def weather(city: str) -> str: ...
+    :param timeout: 超时时间（秒） Default: None （使用 ToolExecutor 的默认超时）
+    :param pure: 是否为纯函数（相同参数总是得到相同结果，可以缓存）
+    :param ttl: 纯函数结果的缓存时间（秒）
+    :return: 装饰器
+    """
+    def decorator(function: callable) -> callable:
+        function.toolTimeout = timeout
+        function.toolPure = pure
+        function.toolTtl = ttl
+        return function
+
+    return decorator
+
+
+class ToolExecutor:
+    """
+    工具执行引擎
+    一轮回复中的多个工具调用互不依赖，全部并发执行：同步工具在有界线程池中运行，协程工具直接在事件循环中运行，
+    每个调用单独计时和超时；纯函数的结果按参数缓存 ttl 秒。失败和超时以文本形式返回给模型，由模型决定如何继续
+    """
+
+    def __init__(self, maxWorkers: int = 4, timeout: float = 10.0, cacheSize: int = 256):
+        """
+        初始化工具执行引擎
+        :param maxWorkers: 线程池的最大线程数
+        :param timeout: 默认超时时间（秒）
+        :param cacheSize: 纯函数结果缓存的最大条数
+        """
+        self.timeout = timeout
+        """默认超时时间"""
+        self.cacheSize = cacheSize
+        """结果缓存的最大条数"""
+
+        self.__pool = ThreadPoolExecutor(maxWorkers, thread_name_prefix="ToolExecutor")
+        """工具线程池"""
+        self.__cache: dict[tuple[str, str], tuple[float, str]] = {}
+        """纯函数结果缓存: {(工具名, 参数): (过期时间, 结果)}"""
+        self.__lock = threading.Lock()
+        self.__histograms: dict[str, Histogram] = {}
+        """每个工具的耗时直方图"""
+        self.__counters: dict[str, dict[str, int]] = {}
+        """每个工具的调用、缓存命中、失败和超时次数"""
+
+    def __count(self, name: str, key: str):
+        with self.__lock:
+            counters = self.__counters.setdefault(name, {"calls": 0, "cacheHits": 0, "errors": 0, "timeouts": 0})
+            counters[key] += 1
+
+    def __observe(self, name: str, elapsed: float):
+        histogram = self.__histograms.get(name)
+        if histogram is None:
+            with self.__lock:
+                histogram = self.__histograms.setdefault(name, Histogram(f"tool.{name}", "s"))
+        histogram.observe(elapsed)
+
+    async def execute(self, calls: list[dict], tools: list[callable]) -> list[str]:
+        """
+        并发执行一轮工具调用
+        :param calls: 工具调用: [{"name", "arguments"}]
+        :param tools: 可用的工具
+        :return: 与 calls 一一对应的结果文本
+        """
+        table = {function.__name__: function for function in tools}
+        return list(await asyncio.gather(*(self.__call(table.get(call["name"]), call) for call in calls)))
+
+    async def __call(self, function: callable, call: dict) -> str:
+        name, arguments = call["name"], call.get("arguments") or {}
+        if function is None:
+            logger.warning(f"Model called unknown tool {name}")
+            return f"error: unknown tool {name}"
+        self.__count(name, "calls")
+
+        pure = getattr(function, "toolPure", False)
+        key = (name, json.dumps(arguments, sort_keys=True, ensure_ascii=False))
+        if pure:
+            with self.__lock:
+                cached = self.__cache.get(key)
+            if cached and cached[0] > time.monotonic():
+                self.__count(name, "cacheHits")
+                return cached[1]
+
+        timeout = getattr(function, "toolTimeout", None) or self.timeout
+        start = time.perf_counter()
+        try:
+            async with asyncio.timeout(timeout):
+                if inspect.iscoroutinefunction(function):
+                    result = await function(**arguments)
+                else:
+                    # 超时后线程中的调用无法中断，只是不再等待结果
+                    result = await asyncio.get_running_loop().run_in_executor(self.__pool, lambda: function(**arguments))
+        except TimeoutError:
+            self.__count(name, "timeouts")
+            logger.warning(f"Tool {name} timed out after {timeout}s")
+            return f"error: tool {name} timed out"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.__count(name, "errors")
+            logger.warning(f"Tool {name}({arguments}) failed: {e}")
+            return f"error: {e}"
+        finally:
+            self.__observe(name, time.perf_counter() - start)
+
+        result = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str)
+        if pure:
+            with self.__lock:
+                if len(self.__cache) >= self.cacheSize:
+                    now = time.monotonic()
+                    for expired in [k for k, (expiry, _) in self.__cache.items() if expiry <= now] or [next(iter(self.__cache))]:
+                        del self.__cache[expired]
+                self.__cache[key] = (time.monotonic() + getattr(function, "toolTtl", 60.0), result)
+        return result
+
+    def clearCache(self):
+        """
+        清空纯函数结果缓存
+        :return: None
+        """
+        with self.__lock:
+            self.__cache.clear()
+
+    def metrics(self) -> dict:
+        """
+        导出每个工具的统计数据
+        :return: {工具名: {"calls", "cacheHits", "errors", "timeouts", "latency"}}
+        """
+        with self.__lock:
+            counters = {name: dict(values) for name, values in self.__counters.items()}
+            histograms = dict(self.__histograms)
+        for name, values in counters.items():
+            if name in histograms:
+                values["latency"] = histograms[name].snapshot()
+        return counters
+
+    def shutdown(self):
+        """
+        关闭线程池（不等待正在执行的工具）
+        :return: None
+        """
+        self.__pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,6 @@
+__namespace__ = "com.wutong.livepet.chat"
+__author__ = "Wutong"
+__version__ = "0.0.1"
+__description__ = "桌宠对话引擎，在独立的事件循环线程中与本地大模型通信"
+
+from .ChatMessage import ChatRole, ChatMessage
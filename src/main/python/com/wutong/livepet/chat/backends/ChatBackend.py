@@ -0,0 +1,194 @@
+import base64
+import inspect
+import os
+from typing import AsyncIterator, Callable
+
+import httpx
+
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage
+
+TYPE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean", list: "array", dict: "object"}
+"""Python 类型对应的 JSON Schema 类型"""
+
+
+def toolSchema(tool: Callable | dict) -> dict:
+    """
+    根据函数签名和文档生成工具描述（已经是字典时原样返回）
+    :param tool: 工具函数
+    :return: {"type": "function", "function": {...}}
+    """
+    if isinstance(tool, dict):
+        return tool
+    doc = inspect.getdoc(tool) or ""
+    descriptions = {}
+    for line in doc.splitlines():
+        if line.startswith(":param ") and ":" in line[7:]:
+            name, description = line[7:].split(":", 1)
+            descriptions[name.strip()] = description.strip()
+    properties, required = {}, []
+    for name, parameter in inspect.signature(tool).parameters.items():
+        properties[name] = {"type": TYPE_NAMES.get(parameter.annotation, "string"),
+                            "description": descriptions.get(name, "")}
+        if parameter.default is inspect.Parameter.empty:
+            required.append(name)
+    summary = doc.split("\n:", 1)[0].strip()
+    return {"type": "function",
+            "function": {"name": tool.__name__,
+                         "description": summary,
+                         "parameters": {"type": "object", "properties": properties, "required": required}}}
+
+
+def encodeImage(image: str) -> str:
+    """
+    把图片路径转换为 base64（已经是 base64 时原样返回）
+    :param image: 图片路径或 base64
+    :return: base64
+    """
+    if os.path.isfile(image):
+        with open(image, "rb") as f:
+            return base64.b64encode(f.read()).decode()
+    return image
+
+
+class ChatChunk:
+    """
+    流式回复中的一个文本块
+    """
+
+    def __init__(self,
+                 text: str = "",
+                 done: bool = False,
+                 promptTokens: int | None = None,
+                 completionTokens: int | None = None,
+                 toolCalls: list[dict] = None):
+        self.text = text
+        """文本"""
+        self.done = done
+        """是否是最后一块"""
+        self.promptTokens = promptTokens
+        """服务端实际计算的提示词 token 数（仅最后一块）"""
+        self.completionTokens = completionTokens
+        """生成的 token 数（仅最后一块）"""
+        self.toolCalls = toolCalls or []
+        """工具调用: [{"id", "name", "arguments"}]，参数已解析为字典"""
+
+
+class ChatBackend:
+    """
+    对话后端基类
+    所有后端共用一个带连接池的 httpx.AsyncClient，长连接在请求之间复用；
+    client 在第一次使用时于事件循环线程中创建，之后只能在同一个事件循环中使用
+    """
+
+    def __init__(self,
+                 baseUrl: str,
+                 connectTimeout: float = 5.0,
+                 readTimeout: float = 120.0,
+                 maxConnections: int = 8,
+                 keepAliveExpiry: float = 60.0,
+                 retries: int = 2,
+                 headers: dict = None):
+        """
+        初始化对话后端
+        :param baseUrl: 服务地址
+        :param connectTimeout: 建立连接的超时时间（秒）
+        :param readTimeout: 读取的超时时间（秒），流式请求的首字/间隔超时由 ChatEngine 控制
+        :param maxConnections: 连接池的最大连接数
+        :param keepAliveExpiry: 空闲长连接的保留时间（秒）
+        :param retries: 建立连接失败时的重试次数
+        :param headers: 额外的请求头
+        """
+        self.baseUrl = baseUrl.rstrip("/")
+        """服务地址"""
+        self.timeout = httpx.Timeout(readTimeout, connect=connectTimeout)
+        """超时配置"""
+        self.limits = httpx.Limits(max_connections=maxConnections,
+                                   max_keepalive_connections=maxConnections,
+                                   keepalive_expiry=keepAliveExpiry)
+        """连接池配置"""
+        self.retries = retries
+        """连接重试次数"""
+        self.headers = headers or {}
+        """额外的请求头"""
+        self.__client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        共享的 HTTP 客户端（第一次使用时创建）
+        :return: httpx.AsyncClient
+        """
+        if self.__client is None or self.__client.is_closed:
+            self.__client = httpx.AsyncClient(base_url=self.baseUrl,
+                                              timeout=self.timeout,
+                                              headers=self.headers,
+                                              transport=httpx.AsyncHTTPTransport(retries=self.retries, limits=self.limits))
+        return self.__client
+
+    async def listModels(self) -> list[str]:
+        """
+        列出可用的模型
+        :return: 模型名列表
+        """
+        ...
+
+    async def chat(self,
+                   model: str,
+                   messages: list[ChatMessage],
+                   options: dict = None,
+                   keepAlive: float = None,
+                   tools: list[Callable | dict] = None) -> str:
+        """
+        非流式对话
+        :param model: 模型名
+        :param messages: 消息列表
+        :param options: 模型参数
+        :param keepAlive: 模型保活时间（秒），不支持的后端忽略
+        :param tools: 工具列表
+        :return: 回复文本
+        """
+        return "".join([chunk.text async for chunk in self.stream(model, messages, options, keepAlive, tools)])
+
+    def stream(self,
+               model: str,
+               messages: list[ChatMessage],
+               options: dict = None,
+               keepAlive: float = None,
+               tools: list[Callable | dict] = None) -> AsyncIterator[ChatChunk]:
+        """
+        流式对话
+        :param model: 模型名
+        :param messages: 消息列表
+        :param options: 模型参数
+        :param keepAlive: 模型保活时间（秒），不支持的后端忽略
+        :param tools: 工具列表
+        :return: 文本块的异步迭代器（支持 aclose）
+        """
+        ...
+
+    async def load(self, model: str, options: dict = None, keepAlive: float = None):
+        """
+        预加载模型或续期保活时间，不支持的后端不做任何事
+        :param model: 模型名
+        :param options: 模型参数
+        :param keepAlive: 模型保活时间（秒）
+        :return: None
+        """
+        ...
+
+    async def unload(self, model: str):
+        """
+        立即卸载模型，不支持的后端不做任何事
+        :param model: 模型名
+        :return: None
+        """
+        ...
+
+    async def close(self):
+        """
+        关闭连接池
+        :return: None
+        """
+        if self.__client is not None:
+            await self.__client.aclose()
+            self.__client = None
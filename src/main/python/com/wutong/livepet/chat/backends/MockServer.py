@@ -0,0 +1,268 @@
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.chat.ChatContext import estimateTokens
+
+CJK_RANGES = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef"
+TOKEN_PATTERN = re.compile(rf"[{CJK_RANGES}]|\s*[^\s{CJK_RANGES}]{{1,4}}|\s+")
+"""把文本切成近似 token 的片段：中日韩字符单独成块，其余字符最多 4 个一块"""
+
+DEFAULT_RESPONSES = ["指挥官，今天也辛苦了！要不要休息一下，喝杯茶？",
+                     "嗯……让我想想。这个问题有点难，不过我们可以一步一步来。",
+                     "Hello, Commander! The weather looks nice today, shall we go for a walk?"]
+"""默认的回复"""
+
+
+class MockServer:
+    """
+    模拟流式对话服务
+    同时提供 Ollama（/api/tags、/api/chat）和 OpenAI 兼容（/v1/models、/v1/chat/completions）接口，
+    按配置的首字延迟和吞吐量回放预设回复，用于在没有模型的机器上测试对话吞吐和 UI 表现。
+    使用 HTTP/1.1 分块传输，客户端可以复用长连接
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 responses: list[str] = None,
+                 models: list[str] = None,
+                 firstTokenLatency: float = 0.3,
+                 tokensPerSecond: float = 30.0,
+                 jitter: float = 0.2,
+                 seed: int = None):
+        """
+        初始化模拟服务
+        :param host: 监听地址
+        :param port: 监听端口 Default: 0 （自动分配）
+        :param responses: 预设回复，按顺序轮流回放
+        :param models: 模型名列表
+        :param firstTokenLatency: 首字延迟（秒）
+        :param tokensPerSecond: 每秒输出的 token 数，<=0 时不限速
+        :param jitter: 间隔的随机抖动比例
+        :param seed: 随机种子
+        """
+        self.responses = responses or DEFAULT_RESPONSES
+        """预设回复"""
+        self.models = models or ["mock:latest"]
+        """模型名列表"""
+        self.firstTokenLatency = firstTokenLatency
+        """首字延迟"""
+        self.tokensPerSecond = tokensPerSecond
+        """吞吐量"""
+        self.jitter = jitter
+        """随机抖动比例"""
+
+        self.requests = 0
+        """处理过的请求数"""
+        self.connections = 0
+        """建立过的连接数（连接复用时远小于请求数）"""
+        self.__lock = threading.Lock()
+        self.__random = random.Random(seed)
+        self.__responses = itertools.cycle(self.responses)
+
+        self.server = ThreadingHTTPServer((host, port), self.__handler())
+        """HTTP 服务"""
+        self.server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.server.serve_forever, name="MockServer", daemon=True)
+
+    @property
+    def url(self) -> str:
+        """
+        服务地址
+        :return: http://host:port
+        """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockServer":
+        """
+        在后台线程中启动服务
+        :return: self
+        """
+        self.__thread.start()
+        logger.info(f"MockServer listening on {self.url}")
+        return self
+
+    def stop(self):
+        """
+        停止服务
+        :return: None
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        logger.info(f"MockServer stopped after {self.requests} requests on {self.connections} connections")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def nextResponse(self) -> list[str]:
+        """
+        取下一条预设回复，切分为 token 片段
+        :return: token 片段
+        """
+        with self.__lock:
+            self.requests += 1
+            return TOKEN_PATTERN.findall(next(self.__responses))
+
+    def countConnection(self):
+        """
+        记录一次新建连接
+        :return: None
+        """
+        with self.__lock:
+            self.connections += 1
+
+    def interval(self) -> float:
+        """
+        两个 token 之间的间隔
+        :return: 秒
+        """
+        if self.tokensPerSecond <= 0:
+            return 0.0
+        with self.__lock:
+            return max(0.0, 1 / self.tokensPerSecond * (1 + self.__random.uniform(-self.jitter, self.jitter)))
+
+    def __handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                mock.countConnection()
+
+            def log_message(self, format, *args):
+                ...
+
+            def __json(self, data: dict, status: int = 200):
+                body = json.dumps(data, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def __beginStream(self, contentType: str):
+                self.send_response(200)
+                self.send_header("Content-Type", contentType)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            def __write(self, data: str):
+                data = data.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def __endStream(self):
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+            def __tokens(self):
+                time.sleep(mock.firstTokenLatency)
+                tokens = mock.nextResponse()
+                for index, token in enumerate(tokens):
+                    if index:
+                        time.sleep(mock.interval())
+                    yield token
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self.__json({"models": [{"name": model, "model": model} for model in mock.models]})
+                elif self.path == "/v1/models":
+                    self.__json({"object": "list", "data": [{"id": model, "object": "model"} for model in mock.models]})
+                else:
+                    self.__json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                try:
+                    if body.get("model") not in mock.models:
+                        self.__json({"error": f"model '{body.get('model')}' not found"}, 404)
+                    elif self.path == "/api/chat":
+                        self.__ollama(body)
+                    elif self.path == "/v1/chat/completions":
+                        self.__openai(body)
+                    else:
+                        self.__json({"error": "not found"}, 404)
+                except (BrokenPipeError, ConnectionResetError):  # 客户端中途取消
+                    self.close_connection = True
+
+            def __ollama(self, body: dict):
+                model, messages = body["model"], body.get("messages") or []
+                prompt = sum(estimateTokens(message.get("content", "")) + 4 for message in messages)
+                if not messages:  # 预加载或卸载
+                    self.__json({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                                 "done_reason": "unload" if body.get("keep_alive") == 0 else "load"})
+                    return
+                if not body.get("stream", True):
+                    tokens = list(self.__tokens())
+                    self.__json({"model": model, "message": {"role": "assistant", "content": "".join(tokens)}, "done": True,
+                                 "prompt_eval_count": prompt, "eval_count": len(tokens)})
+                    return
+                self.__beginStream("application/x-ndjson")
+                count = 0
+                for token in self.__tokens():
+                    count += 1
+                    self.__write(json.dumps({"model": model, "message": {"role": "assistant", "content": token}, "done": False}, ensure_ascii=False) + "\n")
+                self.__write(json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                                         "prompt_eval_count": prompt, "eval_count": count}) + "\n")
+                self.__endStream()
+
+            def __openai(self, body: dict):
+                model = body["model"]
+                prompt = sum(estimateTokens(message["content"] if isinstance(message.get("content"), str) else "") + 4
+                             for message in body.get("messages") or [])
+                if not body.get("stream"):
+                    tokens = list(self.__tokens())
+                    self.__json({"object": "chat.completion", "model": model,
+                                 "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+                                 "usage": {"prompt_tokens": prompt, "completion_tokens": len(tokens)}})
+                    return
+                self.__beginStream("text/event-stream")
+                count = 0
+                for token in self.__tokens():
+                    count += 1
+                    event = {"object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                    self.__write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+                event = {"object": "chat.completion.chunk", "model": model, "choices": [],
+                         "usage": {"prompt_tokens": prompt, "completion_tokens": count}}
+                self.__write(f"data: {json.dumps(event)}\n\n")
+                self.__write("data: [DONE]\n\n")
+                self.__endStream()
+
+        return Handler
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="freel2d mock streaming chat server (Ollama + OpenAI compatible)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.3, help="time to first token in seconds")
+    parser.add_argument("--tps", type=float, default=30.0, help="tokens per second, <=0 for unlimited")
+    parser.add_argument("--model", action="append", help="model name to advertise, can be repeated")
+    parser.add_argument("--responses", help="text file with one canned response per line")
+    args = parser.parse_args()
+
+    cannedResponses = None
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            cannedResponses = [line.strip() for line in f if line.strip()]
+    mockServer = MockServer(args.host, args.port, cannedResponses, args.model, args.latency, args.tps)
+    mockServer.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        mockServer.stop()
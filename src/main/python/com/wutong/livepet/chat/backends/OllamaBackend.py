@@ -0,0 +1,94 @@
+import json
+import os
+from typing import AsyncIterator
+
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage
+from src.main.python.com.wutong.livepet.chat.backends.ChatBackend import ChatBackend, ChatChunk, toolSchema, encodeImage
+
+
+def defaultHost() -> str:
+    """
+    Ollama 默认地址（读取 OLLAMA_HOST，与 ollama 命令行一致）
+    :return: 地址
+    """
+    host = os.environ.get("OLLAMA_HOST", "127.0.0.1:11434")
+    if "://" not in host:
+        host = f"http://{host}"
+    return host.replace("0.0.0.0", "127.0.0.1")
+
+
+class OllamaBackend(ChatBackend):
+    """
+    Ollama 后端
+    直接调用 /api/tags 和 /api/chat，流式回复按行解析 NDJSON，最后一块带有 prompt_eval_count 和 eval_count
+    """
+
+    def __init__(self, host: str = None, **kwargs):
+        """
+        初始化 Ollama 后端
+        :param host: Ollama 地址 Default: None （使用 OLLAMA_HOST 或本机默认地址）
+        :param kwargs: 连接池和超时配置，见 ChatBackend
+        """
+        super().__init__(host or defaultHost(), **kwargs)
+
+    @staticmethod
+    def __message(message: ChatMessage) -> dict:
+        data = message.toDict()
+        if "images" in data:
+            data["images"] = [encodeImage(image) for image in data["images"]]
+        return data
+
+    def __body(self, model: str, messages: list[ChatMessage], options: dict, keepAlive: float | None, tools: list | None, stream: bool) -> dict:
+        body = {"model": model,
+                "messages": [self.__message(message) for message in messages],
+                "options": options or {},
+                "stream": stream}
+        if keepAlive is not None:
+            body["keep_alive"] = keepAlive
+        if tools:
+            body["tools"] = [toolSchema(tool) for tool in tools]
+        return body
+
+    @staticmethod
+    def __chunk(part: dict) -> ChatChunk:
+        if "error" in part:
+            raise RuntimeError(part["error"])
+        message = part.get("message") or {}
+        toolCalls = []
+        for call in message.get("tool_calls") or []:
+            arguments = call["function"].get("arguments") or {}
+            toolCalls.append({"id": call.get("id"),
+                              "name": call["function"]["name"],
+                              "arguments": json.loads(arguments) if isinstance(arguments, str) else arguments})
+        if not part.get("done"):
+            return ChatChunk(message.get("content", ""), toolCalls=toolCalls)
+        return ChatChunk(message.get("content", ""),
+                         done=True,
+                         promptTokens=part.get("prompt_eval_count"),
+                         completionTokens=part.get("eval_count"),
+                         toolCalls=toolCalls)
+
+    async def listModels(self) -> list[str]:
+        response = await self.client.get("/api/tags")
+        response.raise_for_status()
+        return [model["model"] for model in response.json()["models"]]
+
+    async def chat(self, model, messages, options=None, keepAlive=None, tools=None) -> str:
+        response = await self.client.post("/api/chat", json=self.__body(model, messages, options, keepAlive, tools, False))
+        response.raise_for_status()
+        return self.__chunk(response.json()).text
+
+    async def stream(self, model, messages, options=None, keepAlive=None, tools=None) -> AsyncIterator[ChatChunk]:
+        async with self.client.stream("POST", "/api/chat", json=self.__body(model, messages, options, keepAlive, tools, True)) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line:
+                    yield self.__chunk(json.loads(line))
+
+    async def load(self, model: str, options: dict = None, keepAlive: float = None):
+        await self.chat(model, [], options, keepAlive)
+
+    async def unload(self, model: str):
+        await self.chat(model, [], keepAlive=0)
@@ -0,0 +1,108 @@
+import json
+from typing import AsyncIterator
+
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage
+from src.main.python.com.wutong.livepet.chat.backends.ChatBackend import ChatBackend, ChatChunk, toolSchema, encodeImage
+
+OPTION_NAMES = {"temperature": "temperature",
+                "top_p": "top_p",
+                "seed": "seed",
+                "stop": "stop",
+                "num_predict": "max_tokens",
+                "presence_penalty": "presence_penalty",
+                "frequency_penalty": "frequency_penalty"}
+"""Ollama 模型参数对应的 OpenAI 参数名，其余参数不发送"""
+
+
+class OpenAIBackend(ChatBackend):
+    """
+    OpenAI 兼容后端（llama.cpp server、vLLM、LM Studio 等本地服务）
+    调用 /models 和 /chat/completions，流式回复按 SSE 解析，用量在最后一个事件中返回
+    不支持预加载和卸载，load/unload 不做任何事
+    """
+
+    def __init__(self, baseUrl: str = "http://127.0.0.1:8080/v1", apiKey: str = None, **kwargs):
+        """
+        初始化 OpenAI 兼容后端
+        :param baseUrl: 接口地址（包含 /v1）
+        :param apiKey: API Key Default: None （本地服务通常不需要）
+        :param kwargs: 连接池和超时配置，见 ChatBackend
+        """
+        headers = kwargs.pop("headers", None) or {}
+        if apiKey:
+            headers["Authorization"] = f"Bearer {apiKey}"
+        super().__init__(baseUrl, headers=headers, **kwargs)
+
+    @staticmethod
+    def __message(message: ChatMessage) -> dict:
+        if message.toolCalls:
+            return {"role": message.role,
+                    "content": message.message or None,
+                    "tool_calls": [{"id": call["id"], "type": "function",
+                                    "function": {"name": call["name"], "arguments": json.dumps(call["arguments"], ensure_ascii=False)}}
+                                   for call in message.toolCalls]}
+        if message.toolCallId:
+            return {"role": message.role, "tool_call_id": message.toolCallId, "content": message.message}
+        if not message.image:
+            return {"role": message.role, "content": message.message}
+        return {"role": message.role,
+                "content": [{"type": "text", "text": message.message},
+                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{encodeImage(message.image)}"}}]}
+
+    def __body(self, model: str, messages: list[ChatMessage], options: dict, tools: list | None, stream: bool) -> dict:
+        body = {"model": model, "messages": [self.__message(message) for message in messages], "stream": stream}
+        for key, value in (options or {}).items():
+            if key in OPTION_NAMES:
+                body[OPTION_NAMES[key]] = value
+        if stream:
+            body["stream_options"] = {"include_usage": True}
+        if tools:
+            body["tools"] = [toolSchema(tool) for tool in tools]
+        return body
+
+    async def listModels(self) -> list[str]:
+        response = await self.client.get("/models")
+        response.raise_for_status()
+        return [model["id"] for model in response.json()["data"]]
+
+    async def chat(self, model, messages, options=None, keepAlive=None, tools=None) -> str:
+        response = await self.client.post("/chat/completions", json=self.__body(model, messages, options, tools, False))
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"].get("content") or ""
+
+    async def stream(self, model, messages, options=None, keepAlive=None, tools=None) -> AsyncIterator[ChatChunk]:
+        usage = {}
+        toolCalls: dict[int, dict] = {}
+        async with self.client.stream("POST", "/chat/completions", json=self.__body(model, messages, options, tools, True)) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                event = json.loads(data)
+                usage = event.get("usage") or usage
+                for choice in event.get("choices") or []:
+                    delta = choice.get("delta") or {}
+                    for call in delta.get("tool_calls") or []:  # 工具调用的参数分多个事件下发
+                        function = call.get("function") or {}
+                        merged = toolCalls.setdefault(call.get("index", 0), {"id": None, "name": "", "arguments": ""})
+                        merged["id"] = merged["id"] or call.get("id")
+                        merged["name"] += function.get("name") or ""
+                        merged["arguments"] += function.get("arguments") or ""
+                    if delta.get("content"):
+                        yield ChatChunk(delta["content"])
+        calls = []
+        for call in toolCalls.values():
+            try:
+                arguments = json.loads(call["arguments"] or "{}")
+            except json.JSONDecodeError:
+                arguments = {}
+            calls.append({"id": call["id"], "name": call["name"], "arguments": arguments})
+        yield ChatChunk(done=True,
+                        promptTokens=usage.get("prompt_tokens"),
+                        completionTokens=usage.get("completion_tokens"),
+                        toolCalls=calls)
@@ -0,0 +1,6 @@
+__namespace__ = "com.wutong.livepet.chat.backends"
+__author__ = "Wutong"
+__version__ = "0.0.1"
+__description__ = "对话后端，统一 Ollama 与 OpenAI 兼容接口，并提供离线测试用的模拟流式服务"
+
+from .ChatBackend import ChatBackend, ChatChunk
@@ -1,2 +1,10 @@
 class Live2DModelNotInstalledException(Exception):
     pass
+
+
+class HotkeyConflictException(Exception):
+    pass
+
+
+class ComponentDependencyException(Exception):
+    pass
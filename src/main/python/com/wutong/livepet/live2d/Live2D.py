@@ -1,15 +1,14 @@
 import json
 import os
-import time
 
 import live2d.v3.live2d as live2d
-from PySide6.QtCore import QThreadPool
 from live2d.v3 import LAppModel
 from loguru import logger
 
 from src import MODEL_PATH
 from src.main.python.com.wutong.livepet.exception import Live2DModelNotInstalledException
-from src.main.python.com.wutong.livepet.widgets.Runnable import Runnable
+from src.main.python.com.wutong.livepet.runtime.TaskRuntime import TaskRuntime
+from src.main.python.com.wutong.livepet.runtime.TimerWheel import TimerWheel, Timer
 
 
 def findModel(modelName: str) -> str:
@@ -30,13 +29,13 @@ def findModel(modelName: str) -> str:
 class Live2D:
     def __init__(self,
                  modelName: str,
-                 threadPool: QThreadPool,
+                 runtime: TaskRuntime = None,
                  isAutoBlink: bool = True,
                  isAutoBreath: bool = True):
         """
         Live2D 构造器
         :param modelName: 模型名，需要保证模型文件夹在 /src/main/resources/models/ 目录下
-        :param threadPool: 需要传入 QThreadPool 对象，用于模型动作等等的异步处理
+        :param runtime: 任务运行时，用于模型动作等等的异步处理 Default: None （全局共享的任务运行时）
         :param isAutoBlink: 是否自动眨眼
         :param isAutoBreath: 是否自动呼吸
         """
@@ -44,8 +43,10 @@ class Live2D:
 
         self.modelName = modelName
         """模型名"""
-        self.threadPool = threadPool
-        """线程池"""
+        self.runtime = runtime or TaskRuntime.instance()
+        """任务运行时"""
+        self.__timers: list[Timer] = []
+        """待机动作等定时器，释放模型时取消"""
 
         self.__model: LAppModel = live2d.LAppModel()
         """Live2D 模型对象"""
@@ -58,6 +59,12 @@ class Live2D:
         self.logger = logger
         """日志记录器"""
 
+        self.__motionIndices: dict[tuple[str, str], int] = {}
+        """动作索引缓存，避免每次播放动作都重新读取 model3.json"""
+
+        self.motionListener: callable = None
+        """动作开始和结束的监听: motionListener(started, group, index)，在调用动作回调的线程中执行 Default: None"""
+
     def initialize(self):
         """
         初始化 Live2D 模型
@@ -166,6 +173,9 @@ class Live2D:
         Live2D 模型释放
         :return: None
         """
+        for timer in self.__timers:
+            timer.cancel()
+        self.__timers.clear()
         if self.model:
             self.model = None
             live2d.dispose()
@@ -183,7 +193,7 @@ class Live2D:
         :return: None
         """
         if self.model:
-            self.model.Touch(x, y, startCallback, endCallback)
+            self.model.Touch(x, y, *self.__listen(startCallback, endCallback))
         else:
             logger.exception("Live2D model not initialized")
             raise Live2DModelNotInstalledException("Live2D model not initialized")
@@ -223,10 +233,13 @@ class Live2D:
         :raises Live2DModelNotInstalledException: Live2D 模型未初始化
         """
         if self.model:
+            if (groupName, motionName) in self.__motionIndices:
+                return self.__motionIndices[groupName, motionName]
             groupData = self.loadMocFile()["FileReferences"]["Motions"]
             if groupName in groupData:
                 for index, motion in enumerate(groupData[groupName]):
                     if motion["File"] == motionName + ".motion3.json" or motion["File"] == f"motions/{motionName}.motion3.json":
+                        self.__motionIndices[groupName, motionName] = index
                         return index
             else:
                 logger.error(f"Group {groupName} not found in model {self.modelName}")
@@ -249,7 +262,7 @@ class Live2D:
         """
 
         if self.model:
-            self.threadPool.start(Runnable(self.model.StartMotion, groupName, self.getMotionNameInGroup(groupName, motionName), priority, startCallback, endCallback))
+            self.runtime.submit("Live2D.startMotion", self.model.StartMotion, groupName, self.getMotionNameInGroup(groupName, motionName), priority, *self.__listen(startCallback, endCallback))
         else:
             logger.exception("Live2D model not initialized")
             raise Live2DModelNotInstalledException("Live2D model not initialized")
@@ -267,17 +280,10 @@ class Live2D:
         self.logger.info(f"Starting random motion in group {groupName}")
 
         def run():
-            nonlocal groupName, priority, interval, startCallback, endCallback
-            timeSleep = interval
-            while self.model and (timeSleep := timeSleep - 0.01) >= 0:
-                time.sleep(0.01)
             if self.model:
-                self.model.StartRandomMotion(groupName, priority, startCallback, endCallback)
-                run()
-            else:
-                logger.info(f"Random motion in group {groupName} stopped")
+                self.model.StartRandomMotion(groupName, priority, *self.__listen(startCallback, endCallback))
 
-        self.threadPool.start(Runnable(run))
+        self.__timers.append(TimerWheel.instance().every(interval, run, f"Live2D.randomMotion.{groupName}"))
         logger.success(f"Random motion in group {groupName} started")
 
     def startRandomMotionsOnce(self, groupName: str, priority: int = 0, startCallback: callable = lambda group, index: None, endCallback: callable = lambda: None):
@@ -292,13 +298,32 @@ class Live2D:
         self.logger.info(f"Starting random motion in group {groupName}")
 
         def run():
-            nonlocal groupName, priority, startCallback, endCallback
             if not self.model.IsMotionFinished():
-                self.model.StartRandomMotion(groupName, priority, startCallback, endCallback)
+                self.model.StartRandomMotion(groupName, priority, *self.__listen(startCallback, endCallback))
 
-        self.threadPool.start(Runnable(run))
+        self.runtime.submit("Live2D.randomMotionOnce", run)
         logger.success(f"Random motion in group {groupName} started")
 
+    def __listen(self, startCallback: callable = lambda group, index: None, endCallback: callable = lambda: None) -> tuple[callable, callable]:
+        """
+        在动作回调中通知 motionListener
+        """
+        listener = self.motionListener
+        if listener is None:
+            return startCallback, endCallback
+        started = [None, -1]
+
+        def onStart(group, index):
+            started[:] = [group, index]
+            startCallback(group, index)
+            listener(True, group, index)
+
+        def onEnd():
+            endCallback()
+            listener(False, *started)
+
+        return onStart, onEnd
+
     def getAllParameter(self):
         return [self.model.GetParameter(i) for i in range(self.model.GetParameterCount())]
 
@@ -317,23 +342,36 @@ class Live2D:
         """
         self.logger.info(f"Starting continuous motions with priority {allPriority}")
 
-        def run():
-            nonlocal groupForMotions, allPriority, startCallback, endCallback
-            startCallback()
-            for groupName in sorted(groupForMotions.keys(), key=lambda x: groupForMotions[x][1]):
-                motionName = groupForMotions[groupName][0]
-                while self.model and not self.model.IsMotionFinished():
-                    time.sleep(0.01)
-                    continue
-                if self.model:
-                    self.model.StartMotion(groupName, self.getMotionNameInGroup(groupName, motionName), allPriority)
-                else:
-                    logger.warning(f"Continuous motion {groupName} {motionName} stopped")
-                logger.info(f"Continuous motion {groupName} {motionName} started")
-            endCallback()
+        pending = [(groupName, groupForMotions[groupName][0]) for groupName in sorted(groupForMotions.keys(), key=lambda x: groupForMotions[x][1])]
+
+        def start():
+            groupName, motionName = pending.pop(0)
+            self.model.StartMotion(groupName, self.getMotionNameInGroup(groupName, motionName), allPriority, *self.__listen())
+            logger.info(f"Continuous motion {groupName} {motionName} started")
+
+        def step():
+            # 时间轮每 20ms 检查一次，上一个动作结束后播放下一个
+            if not self.model:
+                timer.cancel()
+                logger.warning(f"Continuous motions stopped, {len(pending)} left")
+                return
+            if not self.model.IsMotionFinished():
+                return
+            start()
+            if not pending:
+                timer.cancel()
+                endCallback()
 
         if self.isMotionFinished():
-            self.threadPool.start(Runnable(run))
+            startCallback()
+            # 第一个动作在启动定时器之前立即开始，之后只有时间轮线程取出动作
+            start()
+            if pending:
+                self.__timers = [timer for timer in self.__timers if timer.isActive]
+                timer = TimerWheel.instance().every(0.02, step, "Live2D.continuousMotions")
+                self.__timers.append(timer)
+            else:
+                endCallback()
             logger.success(f"Continuous motions started with priority {allPriority}")
         else:
             logger.warning("Cannot start continuous motions while motion is playing")
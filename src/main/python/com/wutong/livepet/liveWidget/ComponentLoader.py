@@ -0,0 +1,281 @@
+import time
+from enum import Enum
+
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.exception import ComponentDependencyException
+from src.main.python.com.wutong.livepet.liveWidget.components.Component import Component
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+from src.main.python.com.wutong.livepet.runtime.TaskRuntime import TaskRuntime
+
+
+class ComponentState(Enum):
+    Pending = "pending"
+    Preparing = "preparing"
+    Initializing = "initializing"
+    Ready = "ready"
+    Failed = "failed"
+    Skipped = "skipped"
+
+
+class ComponentLoaderSignals(QObject):
+    """
+    组件加载信号
+    """
+    prepared = Signal(int, bool)
+    """后台准备结束: prepared(index, ok)，在工作线程中发出，排队投递到 GUI 线程"""
+    stateChanged = Signal(str, str)
+    """组件状态变化: stateChanged(componentName, state)"""
+    ready = Signal(object)
+    """组件就绪: ready(component)，在 GUI 线程中发出"""
+    late = Signal(object)
+    """关闭后才准备好的组件: late(component)，在 GUI 线程中发出，需要由接收者停止并释放"""
+    finished = Signal()
+    """全部组件加载结束（成功、失败或跳过）"""
+
+
+class ComponentLoader:
+    """
+    组件加载器
+    组件通过 componentDependencies 声明依赖的组件，依赖全部就绪后才开始加载；
+    每个组件分两步加载：componentPrepare 在任务运行时的工作线程中执行（打开设备、读取文件等耗时操作），
+    没有依赖关系的组件同时准备；componentRunnable 需要操作窗口，排队到 GUI 线程执行，并且等主窗口画完第一帧后才开始，
+    所以第一帧不会等待任何组件。依赖失败的组件跳过。
+    report() 返回每个组件的状态和准备、初始化耗时，加载耗时记录在 component.<组件名> 指标中
+    """
+
+    def __init__(self, liveWidget, components: list[Component], runtime: TaskRuntime = None, firstFrameTimeout: float = 1.0):
+        """
+        初始化组件加载器，需要在 GUI 线程中创建
+        :param liveWidget: 主窗口
+        :param components: 组件列表（直接引用）
+        :param runtime: 任务运行时 Default: None （全局共享的任务运行时）
+        :param firstFrameTimeout: 等待第一帧的最长时间（秒），窗口隐藏时不会出帧，超时后直接初始化
+        """
+        self.liveWidget = liveWidget
+        """主窗口"""
+        self.components = components
+        """组件列表"""
+        self.runtime = runtime or TaskRuntime.instance()
+        """任务运行时"""
+        self.firstFrameTimeout = firstFrameTimeout
+        """等待第一帧的最长时间"""
+
+        self.signals = ComponentLoaderSignals()
+        """组件加载信号"""
+        self.signals.prepared.connect(self.__onPrepared, Qt.ConnectionType.QueuedConnection)
+        self.__registry = MetricsRegistry.instance()
+
+        self.__order: list[Component] = []
+        """本次加载的组件"""
+        self.__states: dict[int, ComponentState] = {}
+        """{组件序号: 状态}"""
+        self.__timings: dict[int, dict[str, float]] = {}
+        """{组件序号: {prepare: 准备耗时, init: 初始化耗时, ready: 从开始加载到就绪的时间}}"""
+        self.__dependencies: dict[int, list[int]] = {}
+        """{组件序号: 依赖的组件序号}"""
+        self.__prepared: set[int] = set()
+        """准备成功的组件，关闭时需要释放"""
+        self.__waiting: list[int] = []
+        """已经准备好、等待第一帧后初始化的组件"""
+        self.__startTime = 0.0
+        self.__firstFrame = False
+        """主窗口是否已经画完第一帧"""
+        self.__closed = False
+
+    def load(self):
+        """
+        开始加载全部组件，立即返回（GUI 线程）
+        :return: None
+        :raise ComponentDependencyException: 依赖的组件没有添加到窗口，或者依赖成环
+        """
+        self.__order = list(self.components)
+        self.__dependencies = self.__resolve(self.__order)
+        self.__states = {index: ComponentState.Pending for index in range(len(self.__order))}
+        self.__timings = {index: {} for index in range(len(self.__order))}
+        self.__prepared, self.__waiting = set(), []
+        self.__startTime = time.perf_counter()
+        self.__firstFrame = False
+        self.__closed = False
+        if hasattr(self.liveWidget, "frameSwapped"):  # QOpenGLWidget
+            self.liveWidget.frameSwapped.connect(self.__onFirstFrame, Qt.ConnectionType.SingleShotConnection)
+            QTimer.singleShot(int(self.firstFrameTimeout * 1000), self.__onFirstFrame)
+        else:
+            self.__firstFrame = True
+        self.__advance()
+
+    def close(self):
+        """
+        停止加载（GUI 线程）：尚未开始的组件跳过，正在准备的组件准备结束后通过 late 信号交出，不再初始化
+        :return: None
+        """
+        self.__closed = True
+        if not self.isFinished:
+            self.__advance()
+
+    def state(self, component: Component) -> ComponentState:
+        """
+        组件的加载状态
+        :param component: 组件
+        :return: 状态，不在本次加载中的组件为 Pending
+        """
+        for index, other in enumerate(self.__order):
+            if other is component:
+                return self.__states[index]
+        return ComponentState.Pending
+
+    def prepared(self) -> list[Component]:
+        """
+        已经准备成功（关闭时需要释放）的组件，按添加顺序
+        :return: 组件列表
+        """
+        return [component for index, component in enumerate(self.__order) if index in self.__prepared]
+
+    @property
+    def isFinished(self) -> bool:
+        """
+        是否全部加载结束
+        :return: True or False
+        """
+        return all(state in (ComponentState.Ready, ComponentState.Failed, ComponentState.Skipped) for state in self.__states.values())
+
+    def report(self) -> dict:
+        """
+        每个组件的加载状态、依赖和耗时
+        :return: {组件名: {state, dependencies, prepare, init, ready}}
+        """
+        return {component.componentName: {"state": self.__states[index].value,
+                                          "dependencies": [self.__order[other].componentName for other in self.__dependencies[index]],
+                                          **self.__timings[index]}
+                for index, component in enumerate(self.__order)}
+
+    def __resolve(self, components: list[Component]) -> dict[int, list[int]]:
+        indexes = {id(component): index for index, component in enumerate(components)}
+        dependencies = {}
+        for index, component in enumerate(components):
+            dependencies[index] = []
+            for dependency in component.componentDependencies():
+                if id(dependency) not in indexes:
+                    raise ComponentDependencyException(f"Component {component.componentName} depends on {dependency.componentName}, which is not added")
+                dependencies[index].append(indexes[id(dependency)])
+        visiting, done = set(), set()
+
+        def visit(index: int, path: list[int]):
+            if index in done:
+                return
+            if index in visiting:
+                cycle = path[path.index(index):] + [index]
+                raise ComponentDependencyException(f"Component dependency cycle: {' -> '.join(components[i].componentName for i in cycle)}")
+            visiting.add(index)
+            for dependency in dependencies[index]:
+                visit(dependency, path + [index])
+            visiting.discard(index)
+            done.add(index)
+
+        for index in dependencies:
+            visit(index, [])
+        return dependencies
+
+    def __setState(self, index: int, state: ComponentState):
+        self.__states[index] = state
+        self.signals.stateChanged.emit(self.__order[index].componentName, state.value)
+
+    def __advance(self):
+        """
+        开始准备依赖全部就绪的组件，跳过依赖失败的组件
+        """
+        changed = True
+        while changed:
+            changed = False
+            for index, state in self.__states.items():
+                if state is not ComponentState.Pending:
+                    continue
+                dependencyStates = [self.__states[dependency] for dependency in self.__dependencies[index]]
+                if self.__closed or any(other in (ComponentState.Failed, ComponentState.Skipped) for other in dependencyStates):
+                    logger.warning(f"skip component {self.__order[index].componentName}")
+                    self.__setState(index, ComponentState.Skipped)
+                    changed = True
+                elif all(other is ComponentState.Ready for other in dependencyStates):
+                    self.__setState(index, ComponentState.Preparing)
+                    self.runtime.submit(f"ComponentLoader.{self.__order[index].componentName}", self.__prepare, index)
+        if self.isFinished:
+            self.__finish()
+
+    def __prepare(self, index: int):
+        """
+        在工作线程中准备组件
+        """
+        component = self.__order[index]
+        logger.info(f"prepare component {component.componentName}")
+        start = time.perf_counter()
+        try:
+            ok = component.componentPrepare(self.liveWidget) is not False
+        except Exception as e:
+            logger.exception(f"prepare component {component.componentName} failed, {e}")
+            ok = False
+        self.__timings[index]["prepare"] = time.perf_counter() - start
+        self.signals.prepared.emit(index, ok)
+
+    def __onPrepared(self, index: int, ok: bool):
+        if ok and self.__closed:  # 准备期间窗口已经关闭，不再初始化，交给关闭流程停止并释放
+            component = self.__order[index]
+            logger.warning(f"component {component.componentName} prepared after close, handing over to shutdown")
+            self.__setState(index, ComponentState.Skipped)
+            self.signals.late.emit(component)
+            self.__advance()
+            return
+        if not ok:
+            logger.error(f"load component {self.__order[index].componentName} failed")
+            self.__setState(index, ComponentState.Failed)
+            self.__advance()
+            return
+        self.__prepared.add(index)
+        self.__setState(index, ComponentState.Initializing)
+        if self.__firstFrame:
+            self.__initialize(index)
+        else:
+            self.__waiting.append(index)
+
+    def __onFirstFrame(self):
+        if self.__firstFrame:
+            return
+        self.__firstFrame = True
+        waiting, self.__waiting = self.__waiting, []
+        for index in waiting:
+            if self.__states[index] is ComponentState.Initializing:
+                self.__initialize(index)
+
+    def __initialize(self, index: int):
+        """
+        在 GUI 线程中初始化组件
+        """
+        component = self.__order[index]
+        start = time.perf_counter()
+        try:
+            ok = component.componentRunnable(self.liveWidget)
+        except Exception as e:
+            logger.exception(f"load component {component.componentName} failed, {e}")
+            ok = False
+        end = time.perf_counter()
+        self.__timings[index]["init"] = end - start
+        if ok:
+            self.__timings[index]["ready"] = end - self.__startTime
+            logger.success(f"load component {component.componentName} successfully")
+            if self.__registry.enabled:
+                self.__registry.observe(f"component.{component.componentName}", end - self.__startTime)
+        else:
+            logger.error(f"load component {component.componentName} failed")
+        self.__setState(index, ComponentState.Ready if ok else ComponentState.Failed)
+        if ok:
+            self.signals.ready.emit(component)
+        self.__advance()
+
+    def __finish(self):
+        states = list(self.__states.values())
+        ready = states.count(ComponentState.Ready)
+        if ready == len(states):
+            logger.success("load all components successfully")
+        else:
+            logger.warning(f"loaded {ready} of {len(states)} components")
+        self.signals.finished.emit()
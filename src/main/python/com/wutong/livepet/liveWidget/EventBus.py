@@ -0,0 +1,228 @@
+import collections
+import itertools
+import threading
+import time
+from enum import Enum
+
+from PySide6.QtCore import QObject, QTimer, Qt, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.liveWidget.components.Component import Component
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+
+class ComponentEvent(Enum):
+    Move = "move"
+    MousePress = "mousePress"
+    MouseRelease = "mouseRelease"
+    Show = "show"
+    Hide = "hide"
+    Frame = "frame"
+    MotionStart = "motionStart"
+    MotionEnd = "motionEnd"
+
+
+COMPONENT_HOOKS = {ComponentEvent.Move: "componentMove",
+                   ComponentEvent.MousePress: "componentMousePress",
+                   ComponentEvent.MouseRelease: "componentMouseRelease",
+                   ComponentEvent.Show: "componentShow",
+                   ComponentEvent.Hide: "componentHide"}
+"""组件钩子对应的事件，组件覆写了钩子才订阅"""
+COALESCED_EVENTS = (ComponentEvent.Move, ComponentEvent.Frame)
+"""高频事件，post 时合并为最新的一个，每帧最多投递一次"""
+
+
+class EventBusSignals(QObject):
+    """
+    事件总线信号
+    """
+    wake = Signal(bool)
+    """有待投递的事件: wake(urgent)，urgent 为 True 时有非合并事件，不等待下一帧"""
+
+
+class EventBus:
+    """
+    组件事件总线
+    组件只订阅自己处理的事件：注册组件时只订阅它覆写了的钩子（componentMove、componentShow 等），
+    其他事件（每帧的 Frame、模型动作的 MotionStart / MotionEnd）通过 subscribe 订阅。
+    每种事件的订阅者列表在订阅变化时预先计算，投递时直接遍历，没有订阅者的事件不产生任何调用。
+    publish 在 GUI 线程中同步投递；post 可以在任意线程中调用，事件排队到 GUI 线程，
+    其中移动和帧事件合并为最新的一个，每帧最多投递一次
+    """
+
+    def __init__(self, fps: int = 60):
+        """
+        初始化事件总线，需要在 GUI 线程中创建
+        :param fps: 合并事件每秒最多投递次数
+        """
+        self.frameInterval = 1 / fps
+        """合并事件的最短投递间隔（秒）"""
+
+        self.signals = EventBusSignals()
+        """事件总线信号"""
+        self.signals.wake.connect(self.__onWake, Qt.ConnectionType.QueuedConnection)
+        self.__registry = MetricsRegistry.instance()
+
+        self.__subscriptions: dict[int, tuple[ComponentEvent, callable]] = {}
+        """{订阅编号: (事件, 回调)}"""
+        self.__table: dict[ComponentEvent, tuple[callable, ...]] = {kind: () for kind in ComponentEvent}
+        """预先计算的订阅者列表 {事件: (回调, ...)}，订阅变化时整体替换"""
+        self.__components: dict[int, list[int]] = {}
+        """{id(组件): [订阅编号]}"""
+        self.__ids = itertools.count(1)
+        self.__lock = threading.Lock()
+        self.__queue: collections.deque[tuple[ComponentEvent, tuple, float]] = collections.deque()
+        """post 排队的事件 (事件, 参数, 时间点)"""
+        self.__latest: dict[ComponentEvent, tuple[tuple, float]] = {}
+        """post 合并的高频事件 {事件: (参数, 最早一次未投递的时间点)}"""
+        self.__scheduled = False
+        self.__lastFlush = 0.0
+        self.__counters = {"published": 0, "posted": 0, "delivered": 0, "coalesced": 0}
+        """计数，published 和 delivered 只在 GUI 线程中更新，posted 和 coalesced 在锁内更新"""
+
+    def register(self, component: Component) -> list[ComponentEvent]:
+        """
+        注册组件：订阅组件覆写了的钩子（GUI 线程）
+        :param component: 组件
+        :return: 订阅的事件
+        """
+        if id(component) in self.__components:
+            return []
+        kinds = [kind for kind, hook in COMPONENT_HOOKS.items() if getattr(type(component), hook) is not getattr(Component, hook)]
+        self.__components[id(component)] = [self.subscribe(kind, getattr(component, COMPONENT_HOOKS[kind])) for kind in kinds]
+        logger.info(f"component {component.componentName} subscribes to {', '.join(kind.value for kind in kinds) or 'nothing'}")
+        return kinds
+
+    def unregister(self, component: Component):
+        """
+        注销组件的全部钩子订阅（GUI 线程）
+        :param component: 组件
+        :return: None
+        """
+        for subscriptionId in self.__components.pop(id(component), []):
+            self.unsubscribe(subscriptionId)
+
+    def subscribe(self, kind: ComponentEvent, callback: callable) -> int:
+        """
+        订阅事件（GUI 线程），回调在 GUI 线程中执行，参数与发布时相同：
+        Move(event)、MousePress(event)、MouseRelease(event)、Show()、Hide()、Frame(time)、MotionStart(group, index)、MotionEnd(group, index)
+        :param kind: 事件
+        :param callback: 回调
+        :return: 订阅编号
+        """
+        subscriptionId = next(self.__ids)
+        self.__subscriptions[subscriptionId] = (kind, callback)
+        self.__rebuild(kind)
+        return subscriptionId
+
+    def unsubscribe(self, subscriptionId: int):
+        """
+        取消订阅
+        :param subscriptionId: 订阅编号
+        :return: None
+        """
+        subscription = self.__subscriptions.pop(subscriptionId, None)
+        if subscription is not None:
+            self.__rebuild(subscription[0])
+
+    def clear(self):
+        """
+        取消全部订阅
+        :return: None
+        """
+        self.__subscriptions.clear()
+        self.__components.clear()
+        self.__table = {kind: () for kind in ComponentEvent}
+
+    def hasSubscribers(self, kind: ComponentEvent) -> bool:
+        """
+        是否有订阅者，发布者可以据此跳过准备事件参数
+        :param kind: 事件
+        :return: True or False
+        """
+        return bool(self.__table[kind])
+
+    def publish(self, kind: ComponentEvent, *args):
+        """
+        立即投递事件（GUI 线程）
+        :param kind: 事件
+        :param args: 参数
+        :return: None
+        """
+        callbacks = self.__table[kind]
+        if not callbacks:
+            return
+        self.__counters["published"] += 1
+        self.__dispatch(callbacks, args)
+
+    def post(self, kind: ComponentEvent, *args):
+        """
+        排队投递事件（线程安全），移动和帧事件合并为最新的一个
+        :param kind: 事件
+        :param args: 参数
+        :return: None
+        """
+        if not self.__table[kind]:
+            return
+        now = time.perf_counter()
+        with self.__lock:
+            self.__counters["posted"] += 1
+            if kind in COALESCED_EVENTS:
+                previous = self.__latest.get(kind)
+                if previous is not None:
+                    self.__counters["coalesced"] += 1
+                self.__latest[kind] = (args, previous[1] if previous is not None else now)
+                urgent = False
+            else:
+                self.__queue.append((kind, args, now))
+                urgent = True
+            if self.__scheduled and not urgent:
+                return
+            self.__scheduled = True
+        self.signals.wake.emit(urgent)
+
+    def metrics(self) -> dict:
+        """
+        事件总线的计数：同步发布、排队发布、投递（回调次数）和合并的事件数，以及每种事件的订阅者数
+        :return: 计数
+        """
+        with self.__lock:
+            return {**self.__counters, "subscribers": {kind.value: len(callbacks) for kind, callbacks in self.__table.items()}}
+
+    def __rebuild(self, kind: ComponentEvent):
+        self.__table = {**self.__table, kind: tuple(callback for other, callback in self.__subscriptions.values() if other is kind)}
+
+    def __dispatch(self, callbacks: tuple[callable, ...], args: tuple):
+        for callback in callbacks:
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.exception(f"Event callback {getattr(callback, '__qualname__', callback)} failed: {e}")
+        self.__counters["delivered"] += len(callbacks)
+
+    def __onWake(self, urgent: bool):
+        if urgent:
+            self.__flush()
+            return
+        remaining = self.__lastFlush + self.frameInterval - time.perf_counter()
+        if remaining > 0:
+            QTimer.singleShot(max(1, round(remaining * 1000)), self.__flush)
+        else:
+            self.__flush()
+
+    def __flush(self):
+        with self.__lock:
+            queued, self.__queue = self.__queue, collections.deque()
+            latest, self.__latest = self.__latest, {}
+            self.__scheduled = False
+        if latest:
+            self.__lastFlush = time.perf_counter()
+        for kind, args, eventTime in queued:
+            self.__deliver(kind, args, eventTime)
+        for kind, (args, eventTime) in latest.items():
+            self.__deliver(kind, args, eventTime)
+
+    def __deliver(self, kind: ComponentEvent, args: tuple, eventTime: float):
+        self.__dispatch(self.__table[kind], args)
+        if self.__registry.enabled:
+            self.__registry.observe("eventBus.dispatchLatency", time.perf_counter() - eventTime)
@@ -1,14 +1,22 @@
 import gc
-import threading
+import time
 
 import pyautogui
-from PySide6.QtCore import QThreadPool, Qt
+from PySide6.QtCore import Qt
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from PySide6.QtWidgets import QApplication
 from loguru import logger
 
+from src.main.python.com.wutong.livepet.liveWidget.ComponentLoader import ComponentLoader
+from src.main.python.com.wutong.livepet.liveWidget.EventBus import EventBus, ComponentEvent
+from src.main.python.com.wutong.livepet.liveWidget.ShutdownCoordinator import ShutdownCoordinator
 from src.main.python.com.wutong.livepet.liveWidget.components.Component import Component
+from src.main.python.com.wutong.livepet.onInput.HotkeyEngine import HotkeyEngine
+from src.main.python.com.wutong.livepet.onInput.InputHub import InputHub
+from src.main.python.com.wutong.livepet.onInput.KeyInput import KeyInput
 from src.main.python.com.wutong.livepet.onInput.MouseInput import MouseInput
+from src.main.python.com.wutong.livepet.runtime.TaskRuntime import TaskRuntime
+from src.main.python.com.wutong.livepet.widgets.WindowGroup import WindowGroup
 
 
 class LiveWidget(QOpenGLWidget):
@@ -70,9 +78,8 @@ class LiveWidget(QOpenGLWidget):
         self.scaledSize = tuple(map(lambda x: int(x * self.frameScale), (self.frameWidth, self.frameHeight)))  # 缩放后的窗口大小
         """缩放后的窗口大小"""
 
-        self.threadPool = QThreadPool.globalInstance()  # 线程池
-        """线程池"""
-        self.threadPool.setParent(self)  # 设置线程池的父对象为当前窗口
+        self.runtime = TaskRuntime.instance()  # 任务运行时
+        """任务运行时（长期服务与短任务）"""
 
         self.logger = logger  # 日志对象
         """日志对象"""
@@ -82,7 +89,28 @@ class LiveWidget(QOpenGLWidget):
 
         self.setGeometry(self.positionX, self.positionY, self.scaledSize[0], self.scaledSize[1])  # 设置窗口位置和大小
 
-        self.mouseInput = MouseInput(self.logger, self.threadPool)
+        self.eventBus = EventBus(self.frameFps)  # 组件只收到自己订阅的事件
+        """组件事件总线"""
+
+        self.componentLoader = ComponentLoader(self, self.__components, self.runtime)  # 按依赖在后台并行加载组件
+        """组件加载器"""
+        self.componentLoader.signals.ready.connect(self.__onComponentReady)
+
+        self.shutdownCoordinator = ShutdownCoordinator(self.runtime)  # 关闭的期限见 shutdownCoordinator.timeout
+        """关闭协调器"""
+        self.componentLoader.signals.late.connect(self.shutdownCoordinator.adopt)  # 关闭后才准备好的组件在剩余期限内停止
+
+        self.windowGroup = WindowGroup(self, self.eventBus, self.frameFps)  # 窗口和组件一起移动，每帧最多一次
+        """窗口组"""
+
+        hub = InputHub.instance()
+        hub.frameInterval = min(hub.frameInterval, 1 / self.frameFps)  # 高频输入事件不超过最快窗口的刷新率
+        self.mouseInput = MouseInput(self.logger, hub)
+        """鼠标绑定"""
+        self.keyInput = KeyInput(self.logger, hub)
+        """键盘绑定"""
+        self.hotkeys = HotkeyEngine(hub)
+        """全局快捷键"""
 
     def frameless(self):
         """
@@ -135,6 +163,7 @@ class LiveWidget(QOpenGLWidget):
         :return: None
         """
         self.__components.remove(component)
+        self.eventBus.unregister(component)
 
     def getComponent(self, index: int) -> Component:
         """
@@ -146,20 +175,18 @@ class LiveWidget(QOpenGLWidget):
 
     def loadComponents(self):
         """
-        加载组件
+        加载组件，立即返回
+        组件按依赖顺序加载，没有依赖关系的组件在工作线程中同时准备，窗口画完第一帧后再在 GUI 线程中初始化，
+        加载进度见 componentLoader.report()
         :return: None
         """
-        for component in self.__components:
-            self.logger.info(f"load component {component.componentName}")
-            try:
-                if not component.componentRunnable(self):
-                    self.logger.error(f"load component {component.componentName} failed")
-                    continue
-                else:
-                    self.logger.success(f"load component {component.componentName} successfully")
-            except Exception as e:
-                self.logger.exception(f"load component {component.componentName} failed, {e}", exc_info=True)
-        self.logger.success("load all components successfully")
+        self.componentLoader.load()
+
+    def __onComponentReady(self, component: Component):
+        # 组件就绪后才接收事件；窗口已经显示时补发一次显示
+        subscriptions = self.eventBus.register(component)
+        if ComponentEvent.Show in subscriptions and self.isVisible():
+            component.componentShow()
 
     def loadInit(self):
         """
@@ -171,11 +198,11 @@ class LiveWidget(QOpenGLWidget):
 
     def setMaxThreadCount(self, count):
         """
-        设置最大线程数
+        设置短任务的最大线程数
         :param count: 最大线程数
         :return: None
         """
-        self.threadPool.setMaxThreadCount(count)
+        self.runtime.setMaxWorkers(count)
 
     def initUI(self):
         """
@@ -189,9 +216,7 @@ class LiveWidget(QOpenGLWidget):
         显示窗口
         :return: None
         """
-        for component in self.__components:
-            self.logger.info(f"show component {component.componentName}")
-            component.componentShow()
+        self.eventBus.publish(ComponentEvent.Show)
         super().show()
 
     @staticmethod
@@ -229,17 +254,16 @@ class LiveWidget(QOpenGLWidget):
         :return:
         """
         self.clickX, self.clickY = event.scenePosition().x(), event.scenePosition().y()
-        pass
+        self.eventBus.publish(ComponentEvent.MousePress, event)
 
     def mouseReleaseEvent(self, event):
-        pass
+        self.eventBus.publish(ComponentEvent.MouseRelease, event)
 
     def mouseMoveEvent(self, event):
-        for component in self.__components:
-            component.componentMove(event)
+        self.windowGroup.moveTo(self.positionX, self.positionY)
 
     def timerEvent(self, event):
-        pass
+        self.eventBus.publish(ComponentEvent.Frame, time.perf_counter())
 
     def wheelEvent(self, event):
         pass
@@ -258,35 +282,30 @@ class LiveWidget(QOpenGLWidget):
         self.loadComponents()
         self.update()
         self.mouseInput.startAll()
+        self.keyInput.startAll()
+        self.hotkeys.start()
         self.logger.success("liveWidget started successfully")
         self.app.exec()  # 进入消息循环
 
     def hide(self):
-        for component in self.__components:
-            self.logger.info(f"hide component {component.componentName}")
-            component.componentHide()
-            self.logger.success(f"hide component {component.componentName} successfully")
+        self.eventBus.publish(ComponentEvent.Hide)
         super().hide()
 
     def closeEvent(self, event):
         self.hide()
-
-        for component in self.__components:
-            self.logger.info(f"release component {component.componentName}")
-            if component.componentRelease():
-                self.logger.success(f"release component {component.componentName} successfully")
-            else:
-                self.logger.error(f"release component {component.componentName} failed")
-
-        def cleanup():
-            self.threadPool.releaseThread()  # 在另一个线程中释放线程池
-            self.logger.success("liveWidget threadPool released")
-            self.threadPool.clear()
-            self.logger.success("liveWidget threadPool cleared")
+        self.mouseInput.close()
+        self.keyInput.close()
+        self.hotkeys.close()
+        self.componentLoader.close()
+        self.eventBus.clear()
+        self.app.setQuitOnLastWindowClosed(False)  # 由关闭协调器在组件释放后退出
+
+        def finished():
+            gc.collect()
             self.app.exit()  # 确保在所有清理工作完成后再退出应用
             self.logger.success("liveWidget closeEvent successfully")
 
-        threading.Thread(target=cleanup).start()  # 在单独的线程中执行清理操作
-        gc.collect()
+        # 尚未准备好的组件不需要释放；组件在各自的线程中同时停止，期限到达后不再等待
+        self.shutdownCoordinator.shutdown(self.componentLoader.prepared(), finished)
         self.logger.success("liveWidget closed")
         event.accept()  # 接受关闭事件
@@ -0,0 +1,211 @@
+import os
+import threading
+import time
+
+from PySide6.QtCore import QObject, Qt, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.chat.ChatEngine import ChatEngine
+from src.main.python.com.wutong.livepet.liveWidget.components.Component import Component
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+from src.main.python.com.wutong.livepet.runtime.TaskRuntime import TaskRuntime
+from src.main.python.com.wutong.livepet.runtime.TimerWheel import TimerWheel
+
+
+class ShutdownSignals(QObject):
+    """
+    关闭信号
+    """
+    stopped = Signal()
+    """全部组件停止或到达期限，在等待线程中发出，排队投递到 GUI 线程"""
+    lateStopped = Signal(object)
+    """在全部组件释放之后才接手的组件停止结束: lateStopped(component)，排队投递到 GUI 线程"""
+
+
+class ShutdownCoordinator:
+    """
+    关闭协调器
+    关闭时先停止时间轮并取消任务运行时的全部任务，同时每个组件在各自的线程中执行 componentStop（停止录音、卸载模型等），
+    全部操作共用一个期限；组件停止后再停止全局共享的对话引擎（组件关闭对话、卸载模型时还需要它），
+    期限到达或全部结束后，在 GUI 线程中依次执行 componentRelease（关闭窗口）并退出。
+    超过期限的组件记录在 report() 中；如果到期限加宽限时间时关闭仍未完成（GUI 线程被卡住，释放没有执行），看门狗强制结束进程，
+    关闭正常完成后看门狗不再动作，进程是否继续运行由调用者决定
+    """
+
+    def __init__(self, runtime: TaskRuntime = None, timeout: float = 3.0, grace: float = 1.0, hardExit: bool = True):
+        """
+        初始化关闭协调器，需要在 GUI 线程中创建
+        :param runtime: 任务运行时 Default: None （全局共享的任务运行时）
+        :param timeout: 关闭的期限（秒），组件停止和任务取消共用
+        :param grace: 期限之后等待关闭完成的时间（秒）
+        :param hardExit: 超过期限加宽限时间仍未完成关闭时是否强制结束进程
+        """
+        self.runtime = runtime or TaskRuntime.instance()
+        """任务运行时"""
+        self.timeout = timeout
+        """关闭的期限"""
+        self.grace = grace
+        """期限之后等待关闭完成的时间"""
+        self.hardExit = hardExit
+        """是否强制结束进程"""
+
+        self.signals = ShutdownSignals()
+        """关闭信号"""
+        self.signals.stopped.connect(self.__onStopped, Qt.ConnectionType.QueuedConnection)
+        self.signals.lateStopped.connect(self.__release, Qt.ConnectionType.QueuedConnection)
+        self.__registry = MetricsRegistry.instance()
+
+        self.__components: list[Component] = []
+        self.__onFinished: callable = None
+        self.__startTime = 0.0
+        self.__deadline = 0.0
+        self.__report: dict[str, dict] = {}
+        """{组件名或 runtime: {status, stop, release}}"""
+        self.__threads: list[threading.Thread] = []
+        """停止线程，关闭期间接手的组件也加入其中"""
+        self.__lock = threading.Lock()
+        self.__started = False
+        self.__stopped = False
+        """停止阶段是否已经结束，之后接手的组件停止后单独释放"""
+        self.__finished = threading.Event()
+        """关闭已经完成（组件释放、onFinished 返回），看门狗不再强制退出"""
+
+    def shutdown(self, components: list[Component], onFinished: callable = lambda: None):
+        """
+        开始关闭，立即返回（GUI 线程）
+        :param components: 需要停止和释放的组件
+        :param onFinished: 全部组件释放后在 GUI 线程中调用，通常用于退出应用
+        :return: None
+        """
+        if self.__started:
+            return
+        self.__started = True
+        self.__components = list(components)
+        self.__onFinished = onFinished
+        self.__startTime = time.monotonic()
+        self.__deadline = deadline = self.__startTime + self.timeout
+        self.__report = {component.componentName: {"status": "stopping"} for component in self.__components}
+        self.__report["runtime"] = {"status": "stopping"}
+        logger.info(f"Shutting down {len(self.__components)} components within {self.timeout}s")
+
+        if self.hardExit:
+            threading.Thread(target=self.__watchdog, args=(deadline + self.grace,), name="Shutdown-watchdog", daemon=True).start()
+        threads = [threading.Thread(target=self.__stopRuntime, args=(deadline,), name="Shutdown-runtime", daemon=True)]
+        threads += [threading.Thread(target=self.__stopComponent, args=(component, deadline), name=f"Shutdown-{component.componentName}", daemon=True)
+                    for component in self.__components]
+        self.__threads = threads
+        for thread in threads:
+            thread.start()
+        threading.Thread(target=self.__wait, args=(deadline,), name="Shutdown-wait", daemon=True).start()
+
+    def adopt(self, component: Component):
+        """
+        接手关闭开始之后才准备好的组件（GUI 线程）：在剩余期限内停止，停止结束或超时后再在 GUI 线程中释放
+        :param component: 组件
+        :return: None
+        """
+        if not self.__started:
+            return
+        self.__report[component.componentName] = {"status": "stopping"}
+        with self.__lock:
+            late = self.__stopped
+            if not late:
+                self.__components.append(component)
+            thread = threading.Thread(target=self.__stopComponent, args=(component, self.__deadline, late),
+                                      name=f"Shutdown-{component.componentName}", daemon=True)
+            self.__threads.append(thread)
+            thread.start()  # 在锁内启动，等待线程不会把尚未启动的线程当作已经结束
+
+    def report(self) -> dict:
+        """
+        每个组件和任务运行时的关闭情况
+        :return: {名称: {status: stopped / overran / failed, stop: 停止耗时, release: 释放耗时}}
+        """
+        return {name: dict(entry) for name, entry in self.__report.items()}
+
+    def overran(self) -> list[str]:
+        """
+        超过期限仍未停止的组件
+        :return: 组件名列表
+        """
+        return [name for name, entry in self.__report.items() if entry["status"] == "overran"]
+
+    def __stopRuntime(self, deadline: float):
+        start = time.monotonic()
+        TimerWheel.instance().stop()  # 不再触发定时器
+        finished = self.runtime.shutdown(max(0.0, deadline - time.monotonic()))
+        self.__record(self.__report["runtime"], "stopped" if finished else "overran", start)
+
+    def __stopComponent(self, component: Component, deadline: float, late: bool = False):
+        start = time.monotonic()
+        try:
+            ok = component.componentStop(max(0.0, deadline - start)) is not False
+        except Exception as e:
+            logger.exception(f"stop component {component.componentName} failed, {e}")
+            ok = False
+        self.__record(self.__report[component.componentName], "stopped" if ok else "failed", start)
+        if late:  # 其他组件已经释放，单独回到 GUI 线程释放
+            self.signals.lateStopped.emit(component)
+
+    @staticmethod
+    def __record(entry: dict, status: str, start: float):
+        # 超过期限后才结束的仍然记为 overran，只更新耗时
+        if entry["status"] != "overran":
+            entry["status"] = status
+        entry["stop"] = time.monotonic() - start
+
+    def __wait(self, deadline: float):
+        while True:
+            with self.__lock:
+                alive = [thread for thread in self.__threads if thread.is_alive()]
+                if not alive or time.monotonic() >= deadline:
+                    self.__stopped = True
+                    break
+            alive[0].join(max(0.0, deadline - time.monotonic()))
+        self.__stopChatEngine(deadline)
+        for name, entry in self.__report.items():
+            if entry["status"] == "stopping":
+                entry.update(status="overran", stop=time.monotonic() - self.__startTime)
+                logger.warning(f"{name} overran the {self.timeout}s shutdown deadline")
+        self.signals.stopped.emit()
+
+    def __stopChatEngine(self, deadline: float):
+        start = time.monotonic()
+        stopped = ChatEngine.stopInstance(max(0.0, deadline - start))
+        if stopped is not None:
+            self.__report["chatEngine"] = {"status": "stopping"}
+            self.__record(self.__report["chatEngine"], "stopped" if stopped else "overran", start)
+
+    def __watchdog(self, deadline: float):
+        if self.__finished.wait(max(0.0, deadline - time.monotonic())):
+            return
+        alive = [thread.name for thread in threading.enumerate() if thread is not threading.current_thread() and not thread.daemon and thread is not threading.main_thread()]
+        logger.error(f"Shutdown exceeded {self.timeout + self.grace}s, forcing exit; overran: {', '.join(self.overran()) or 'none'}, "
+                     f"non-daemon threads: {', '.join(alive) or 'none'}")
+        os._exit(1)
+
+    def __onStopped(self):
+        for component in self.__components:
+            self.__release(component)
+        elapsed = time.monotonic() - self.__startTime
+        if self.__registry.enabled:
+            self.__registry.observe("shutdown.elapsed", elapsed)
+        overran = self.overran()
+        if overran:
+            logger.warning(f"Shutdown finished in {elapsed:.3f}s, overran: {', '.join(overran)}")
+        else:
+            logger.success(f"Shutdown finished in {elapsed:.3f}s")
+        try:
+            self.__onFinished()
+        finally:
+            self.__finished.set()
+
+    def __release(self, component: Component):
+        entry = self.__report[component.componentName]
+        start = time.monotonic()
+        try:
+            if not component.componentRelease():
+                logger.error(f"release component {component.componentName} failed")
+        except Exception as e:
+            logger.exception(f"release component {component.componentName} failed, {e}")
+        entry["release"] = time.monotonic() - start
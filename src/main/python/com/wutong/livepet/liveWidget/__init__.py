@@ -6,5 +6,8 @@ __description__ = "构建整体主窗口内容"
 import OpenGL.GL
 
 from .LiveWidget import LiveWidget
+from .ComponentLoader import ComponentLoader, ComponentState
+from .EventBus import EventBus, ComponentEvent
+from .ShutdownCoordinator import ShutdownCoordinator
 
 gl = OpenGL.GL
@@ -17,18 +17,45 @@ class Component:
         """
         self.componentName = componentName.split('.')[-1]
 
+    def componentDependencies(self) -> list["Component"]:
+        """
+        组件依赖的其他组件，加载时等依赖的组件全部就绪后才开始加载这个组件
+        :return: 依赖的组件列表 Default: [] （没有依赖）
+        """
+        return []
+
+    def componentPrepare(self, liveWidget: LiveWidget) -> bool:
+        """
+        组件准备函数
+        在工作线程中执行，先于 componentRunnable，用于不操作窗口的耗时准备，如打开音频设备、读取文件等
+        :param liveWidget: 提供组件所需的LiveWidget对象
+        :return: 是否准备成功 - True/False
+        """
+        return True
+
     def componentRunnable(self, liveWidget: LiveWidget) -> bool:
         """
         继承组件的类需要覆写这个函数，用于达到调用这个组件功能的目的
+        在 GUI 线程中执行（componentPrepare 成功之后）
         :param liveWidget: 提供组件所需的LiveWidget对象
         :return:  是否成功调用组件功能 - True/False
         """
         ...
 
+    def componentStop(self, timeout: float) -> bool:
+        """
+        组件停止函数
+        关闭时在单独的线程中执行（与其他组件同时），先于 componentRelease，用于可能阻塞的操作，如停止线程、关闭音频设备、卸载模型等，
+        需要在 timeout 内返回，超时的组件不再等待
+        :param timeout: 剩余的关闭时间（秒）
+        :return: 是否停止成功 - True/False
+        """
+        return True
+
     def componentRelease(self) -> bool:
         """
         组件释放函数
-        组件释放时需要执行的操作，如关闭线程、释放资源等
+        组件释放时需要执行的操作，如关闭窗口等；在 GUI 线程中执行（componentStop 结束或超时之后），不应阻塞
         :return:
         """
         ...
@@ -36,8 +63,8 @@ class Component:
     def componentMove(self, event: QMouseEvent) -> None:
         """
         组件移动函数
-        组件移动时需要执行的操作，如更新组件位置等
-        :param event: 鼠标事件
+        组件移动时需要执行的操作，如更新组件位置等；拖动时由窗口组在主窗口移动后每帧调用一次
+        :param event: 鼠标事件（由窗口组调用时为 None，位置从 LiveWidget 读取）
         :return:
         """
         ...
@@ -1,38 +1,36 @@
+import concurrent.futures
 import gc
+import math
 import time
-from enum import Enum
 from typing import TextIO
 
-import ollama
 from PySide6.QtGui import QPainter, QMouseEvent, Qt
 from PySide6.QtWidgets import QWidget, QPushButton, QStyleOption, QStyle, QHBoxLayout, QLineEdit
 
+from src.main.python.com.wutong.livepet.audio.VoiceInput import VoiceInput
+from src.main.python.com.wutong.livepet.chat.ChatEngine import ChatEngine, ModelState
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatRole, ChatMessage
+from src.main.python.com.wutong.livepet.chat.HistoryStore import HistoryStore
+from src.main.python.com.wutong.livepet.chat.MemoryStore import MemoryStore
+from src.main.python.com.wutong.livepet.chat.ModelRouter import ModelRouter
+from src.main.python.com.wutong.livepet.chat.ReplyParser import ReplyParser
+from src.main.python.com.wutong.livepet.chat.ResponseCache import ResponseCache
+from src.main.python.com.wutong.livepet.chat.ScreenCapture import ScreenCapture, Frame
 from src.main.python.com.wutong.livepet.liveWidget import LiveWidget
 from src.main.python.com.wutong.livepet.liveWidget.components import Component
 from src.main.python.com.wutong.livepet.liveWidget.components.PetContext import PetContext
-from src.main.python.com.wutong.livepet.widgets.Runnable import Runnable
-
-
-class ChatRole(Enum):
-    System = "system"
-    User = "user"
-    Assistant = "assistant"
-
-
-class ChatMessage:
-    def __init__(self, role: ChatRole | str, message: str, image: str = None):
-        self.message = message
-        self.role = role if isinstance(role, str) else role.value
-        self.image = image
-
-    def __dict__(self):
-        return {"content": self.message, "role": self.role, "image": self.image}
-
-    def __iter__(self):
-        return iter(self.__dict__().items())
+from src.main.python.com.wutong.livepet.runtime.TimerWheel import TimerWheel
 
 
 class PetChat(QWidget, Component):
+    stateTexts = {ModelState.Cold: ("发送", "模型未加载，发送后自动加载"),
+                  ModelState.Warming: ("加载中", "模型加载中，消息会在加载完成后发送"),
+                  ModelState.Ready: ("发送", ""),
+                  ModelState.Unavailable: ("离线", "无法连接模型，正在重试")}
+    """模型状态对应的按钮文本和输入框提示"""
+    screenCommand = "/screen"
+    """以该前缀开头的消息会附带宠物周围的屏幕截图"""
+
     def __init__(self,
                  width: int,
                  height: int,
@@ -45,9 +43,21 @@ class PetChat(QWidget, Component):
                  entryQss: str = "",
                  buttonQss: str = "",
                  tools: list[callable] = None,
+                 engine: ChatEngine = None,
+                 conversationId: str = None,
+                 tokenBudget: int = 1536,
+                 historyStore: HistoryStore = None,
+                 restoreMessages: int = 20,
+                 responseCache: ResponseCache = None,
+                 replayRate: float = 20.0,
+                 memoryStore: MemoryStore = None,
+                 router: ModelRouter = None,
+                 screenCapture: ScreenCapture = None,
+                 screenMargin: int = 400,
+                 voiceInput: VoiceInput = None,
+                 replyParser: ReplyParser = None,
                  **options):
         super().__init__(componentName="PetChat")
-        self.modelNames = [i.model for i in list(ollama.list())[0][1]]
 
         self.petContext = petContext
         self.modelName = modelName
@@ -55,6 +65,8 @@ class PetChat(QWidget, Component):
         self.liveWidget: LiveWidget | None = None
 
         self.system = (system or "") if isinstance(system, str) else system.read()
+        if replyParser and replyParser.instructions():
+            self.system = f"{self.system}\n{replyParser.instructions()}".strip()
         self.options = options
 
         self.width = width
@@ -91,9 +103,50 @@ class PetChat(QWidget, Component):
             border-radius: 3px; /* 可选: 添加圆角 */
         """
 
-        self.history: list[ChatMessage] = []
-        if self.system:
-            self.history.append(ChatMessage(ChatRole.System, self.system))
+        self.engine = engine or ChatEngine.instance()
+        """对话引擎"""
+        self.conversation = self.engine.conversation(conversationId or f"{self.componentName}-{id(self)}", self.system, tokenBudget, historyStore, restoreMessages, memoryStore, router)
+        """对话，历史记录由对话引擎维护"""
+        self.requestId = 0
+        """当前显示在气泡中的请求ID"""
+        self.responseCache = responseCache
+        """回复缓存 Default: None （不缓存）"""
+        self.replayRate = replayRate
+        """回放缓存回复的字符速率（字/秒），随实际生成速度滑动更新"""
+        self.__prompts: dict[int, str] = {}
+        """正在生成的请求对应的问题，完成后写入缓存"""
+        self.__startTime = 0.0
+        """当前请求开始生成的时间点"""
+        self.__lastTurn = -math.inf
+        """上一轮对话往来的时间点，对话进行中时回复可能依赖上文，不查缓存"""
+        self.screenCapture = screenCapture
+        """屏幕截图 Default: None （不支持屏幕对话）"""
+        self.screenMargin = screenMargin
+        """截取宠物周围区域时向外扩展的像素"""
+        self.__captures: dict[int, tuple[str, float]] = {}
+        """正在截图的请求: {截图ID: (消息, 提交时间点)}"""
+        self.voiceInput = voiceInput
+        """语音输入 Default: None （只能打字）"""
+        self.replyParser = replyParser
+        """流式回复解析，根据回复中的标记和关键词触发动作 Default: None （原样显示）"""
+        self.__voiceEndpoints: dict[int, float] = {}
+        """语音消息的请求对应的说完时间点，用于测量说完到第一个字的延迟"""
+        self.__clearBubble = TimerWheel.instance().debounce(petContext.showTime, self.__clearReply, "PetChat.clearBubble")
+        """回复结束后清空气泡，连续的回复只保留最后一次的计时"""
+        if voiceInput:
+            voiceInput.signals.partial.connect(self.onVoicePartial, Qt.ConnectionType.QueuedConnection)
+            voiceInput.signals.final.connect(self.onVoiceFinal, Qt.ConnectionType.QueuedConnection)
+        if screenCapture:
+            screenCapture.signals.captured.connect(self.onScreenCaptured, Qt.ConnectionType.QueuedConnection)
+            screenCapture.signals.failed.connect(self.onScreenFailed, Qt.ConnectionType.QueuedConnection)
+
+        signals = self.conversation.signals
+        signals.started.connect(self.onChatStarted, Qt.ConnectionType.QueuedConnection)
+        signals.chunk.connect(self.onChatChunk, Qt.ConnectionType.QueuedConnection)
+        signals.finished.connect(self.onChatFinished, Qt.ConnectionType.QueuedConnection)
+        signals.failed.connect(self.onChatFailed, Qt.ConnectionType.QueuedConnection)
+        signals.cancelled.connect(self.onChatCancelled, Qt.ConnectionType.QueuedConnection)
+        signals.stateChanged.connect(self.onModelStateChanged, Qt.ConnectionType.QueuedConnection)
 
         self.tools = tools or []
 
@@ -122,56 +175,216 @@ class PetChat(QWidget, Component):
         self.chatButton.setFixedWidth(int(self.width / 6))
         self.chatButton.setFixedHeight(self.height)
 
-        def run():
-            def send():
-                message = self.chatEntry.text()
-                if message:
-                    self.chat(message)
-                    self.chatEntry.clear()
-
-            self.liveWidget.threadPool.start(Runnable(send))
+        def send():
+            message = self.chatEntry.text()
+            if message and self.screenCapture and message.startswith(self.screenCommand):
+                self.chatAboutScreen(message[len(self.screenCommand):].strip())
+            elif message:
+                self.chat(message)
+            self.chatEntry.clear()
             self.hide()
 
-        self.chatButton.clicked.connect(run)
+        self.chatButton.clicked.connect(send)
         self.layout.addWidget(self.chatButton)
         self.setLayout(self.layout)
         self.setParent(self.liveWidget)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint | Qt.WindowType.WindowStaysOnTopHint | Qt.WindowType.Tool)
 
-    def chat(self, message: str | ChatMessage):
-        self.petContext.clearText()
-        self.history.append(message if isinstance(message, ChatMessage) else ChatMessage(ChatRole.User, message))
-        result = ""
-        resp = ollama.chat(self.modelName, self.history, options=self.options, stream=True, keep_alive=10, tools=self.tools)
-        for chunk in resp:
-            if chunk:
-                chunk = chunk['message']['content']
-                result += chunk
-                self.petContext.addText(chunk)
-        self.history.append(ChatMessage(ChatRole.Assistant, result))
-        if not self.petContext.isShowing:
-            def run():
-                tmpTime = self.petContext.showTime
-                while tmpTime > 0 and self.isRunnable:
-                    tmpTime -= 0.01
-                    time.sleep(0.01)
-                self.petContext.clearText()
+    @property
+    def history(self) -> list[ChatMessage]:
+        """
+        历史记录
+        :return: 历史记录
+        """
+        return self.conversation.history
+
+    def loadOlder(self, limit: int = 20) -> list[ChatMessage]:
+        """
+        向前翻页读取更早的历史记录
+        :param limit: 条数
+        :return: 消息列表，按时间从旧到新
+        """
+        return self.conversation.loadOlder(limit)
 
-            self.liveWidget.threadPool.start(Runnable(run))
+    def remember(self, fact: str):
+        """
+        记住一条用户相关的事实，之后相关的对话会参考它
+        :param fact: 事实
+        :return: None
+        """
+        self.engine.remember(self.conversation.conversationId, fact)
+
+    def chat(self, message: str | ChatMessage) -> int:
+        """
+        发送消息（立即返回），回复通过对话信号流式写入气泡
+        同一对话中正在生成的回复会被取消
+        :param message: 消息
+        :return: 请求ID
+        """
+        message = message if isinstance(message, ChatMessage) else ChatMessage(ChatRole.User, message)
+        idle = time.monotonic() - self.__lastTurn
+        self.__lastTurn = time.monotonic()
+        cacheable = self.responseCache is not None and not message.image and self.responseCache.cacheable(message.message, idle)
+        reply = self.responseCache.lookup(message.message, idle) if cacheable else None
+        if reply is not None:
+            # 命中缓存：不请求模型，按正常的打字速度回放，这一轮对话同样写入历史记录
+            self.requestId = self.engine.record(self.conversation.conversationId, [message, ChatMessage(ChatRole.Assistant, reply)])
+            self.liveWidget.logger.info(f"PetChat reply served from cache: {message.message}")
+            self.petContext.clearText()
+            self.petContext.addText(self.__react(reply, complete=True), self.replayRate)
+            self.onChatFinished(self.requestId, reply)
+            return self.requestId
+        self.requestId = self.engine.submit(self.conversation.conversationId, message, options=self.options, tools=self.tools)
+        if cacheable:
+            self.__prompts[self.requestId] = message.message
+        return self.requestId
+
+    def chatAboutScreen(self, message: str = "", aroundPet: bool = True) -> int:
+        """
+        截取屏幕后发送消息（立即返回），截图和编码在截图线程中完成
+        :param message: 消息 Default: "" （让模型描述屏幕内容）
+        :param aroundPet: 只截取宠物周围的区域，否则截取整个屏幕
+        :return: 截图ID
+        """
+        region = None
+        if aroundPet:
+            screenWidth, screenHeight = LiveWidget.getScreenSize()
+            width, height = self.liveWidget.scaledSize
+            left = max(0, self.liveWidget.positionX - self.screenMargin)
+            top = max(0, self.liveWidget.positionY - self.screenMargin)
+            right = min(screenWidth, self.liveWidget.positionX + width + self.screenMargin)
+            bottom = min(screenHeight, self.liveWidget.positionY + height + self.screenMargin)
+            region = (left, top, right - left, bottom - top)
+        captureId = self.screenCapture.capture(region)
+        self.__captures[captureId] = (message or "看看我的屏幕，说说上面有什么。", time.perf_counter())
+        return captureId
+
+    def onScreenCaptured(self, captureId: int, frame: Frame):
+        message, submitTime = self.__captures.pop(captureId, (None, 0.0))
+        if message is None or not self.isRunnable:
+            return
+        # 画面没有变化且上一张截图仍在上下文中时不再重复上传
+        if frame.cached and any(item.image is frame.data for item in self.conversation.history):
+            self.chat(ChatMessage(ChatRole.User, f"{message}（屏幕内容与上一张截图相同）"))
+        else:
+            self.chat(ChatMessage(ChatRole.User, message, image=frame.data))
+        if self.screenCapture.metrics.enabled:
+            self.screenCapture.metrics.observe("vision.roundTrip", time.perf_counter() - submitTime)
+
+    def onScreenFailed(self, captureId: int, error: str):
+        if self.__captures.pop(captureId, None) is not None:
+            self.liveWidget.logger.error(f"PetChat screen capture {captureId} failed: {error}")
+
+    def onVoicePartial(self, text: str):
+        self.chatEntry.setText(text)
+
+    def onVoiceFinal(self, text: str, endpointTime: float):
+        if not self.isRunnable:
+            return
+        self.chatEntry.clear()
+        requestId = self.chat(text)
+        if self.voiceInput.metrics.enabled:
+            self.__voiceEndpoints[requestId] = endpointTime
+
+    def __observeVoice(self, requestId: int):
+        endpointTime = self.__voiceEndpoints.pop(requestId, None)
+        if endpointTime is not None:
+            self.voiceInput.metrics.observe("voice.endpointToFirstToken", time.perf_counter() - endpointTime)
+
+    def __react(self, text: str, complete: bool = False, finished: bool = False) -> str:
+        """
+        解析回复文本，立即执行其中的动作，返回去掉标记后需要显示的文本
+        """
+        if not self.replyParser:
+            return text
+        if complete:
+            visible, actions = self.replyParser.parse(text)
+        elif finished:
+            visible, actions = self.replyParser.flush()
+        else:
+            visible, actions = self.replyParser.feed(text)
+        model = getattr(self.liveWidget, "model", None)
+        if model is not None:
+            for action in actions:
+                action.apply(model)
+        return visible
+
+    def onChatStarted(self, requestId: int):
+        if requestId == self.requestId:
+            self.__startTime = time.perf_counter()
+            self.petContext.clearText()
+            if self.replyParser:
+                self.replyParser.reset()
+
+    def onChatChunk(self, requestId: int, text: str):
+        self.engine.ack(requestId)
+        if self.__voiceEndpoints:
+            self.__observeVoice(requestId)
+        if requestId == self.requestId:
+            text = self.__react(text)
+            if text:
+                self.petContext.addText(text)
+
+    def onChatFinished(self, requestId: int, result: str):
+        self.__lastTurn = time.monotonic()
+        if self.__voiceEndpoints:
+            self.__observeVoice(requestId)  # 缓存命中时没有文本块
+        prompt = self.__prompts.pop(requestId, None)
+        if prompt is not None:
+            self.responseCache.put(prompt, result)
+            elapsed = time.perf_counter() - self.__startTime
+            if requestId == self.requestId and result and elapsed > 0:
+                self.replayRate = 0.7 * self.replayRate + 0.3 * len(result) / elapsed
+        if requestId != self.requestId:
+            return
+        if tail := self.__react("", finished=True):  # 回复结尾未闭合的 [ 原样显示
+            self.petContext.addText(tail)
+        if not self.petContext.isShowing:
+            self.__clearBubble.trigger(requestId)
+
+    def __clearReply(self, requestId: int):
+        if requestId == self.requestId and self.isRunnable:
+            self.petContext.clearText()
+
+    def onChatCancelled(self, requestId: int):
+        self.__prompts.pop(requestId, None)
+        self.__voiceEndpoints.pop(requestId, None)
+
+    def onChatFailed(self, requestId: int, error: str):
+        self.__prompts.pop(requestId, None)
+        self.__voiceEndpoints.pop(requestId, None)
+        self.liveWidget.logger.error(f"PetChat request {requestId} failed: {error}")
+
+    def onModelStateChanged(self, state: str, model: str):
+        state = ModelState(state)
+        if model:
+            self.modelName = model
+        buttonText, placeholder = self.stateTexts[state]
+        self.chatButton.setText(buttonText)
+        self.chatEntry.setPlaceholderText(placeholder)
+        if state is ModelState.Ready:
+            self.liveWidget.logger.success(f"PetChat model {self.modelName} ready.")
+
+    def showEvent(self, event):
+        self.engine.touch(self.conversation.conversationId)  # 打开聊天框时预热/续期模型
+        super().showEvent(event)
+
+    def componentDependencies(self) -> list[Component]:
+        return [self.petContext]  # 回复显示在说话气泡中
+
+    def componentPrepare(self, liveWidget: LiveWidget) -> bool:
+        self.liveWidget = liveWidget  # 模型状态和语音信号可能先于 componentRunnable 到达
+        # 在后台发现并预加载模型、打开麦克风，不阻塞窗口绘制
+        self.engine.prepare(self.conversation.conversationId, self.modelName, self.options)
+        if self.voiceInput:
+            self.voiceInput.start()
+        return True
 
     def componentRunnable(self, liveWidget: LiveWidget) -> bool:
         self.liveWidget = liveWidget
-        if self.modelName in self.modelNames:
-            self.modelName = self.modelName
-        else:
-            self.liveWidget.logger.warning(f"Model {self.modelName} not found, use {self.modelNames[0]} instead.")
-            self.modelName = self.modelNames[0]
         self.initUI()
-        # 预加载模型
-        self.liveWidget.logger.info(f"Preloading model {self.modelName}...")
-        ollama.chat(self.modelName, [], options=self.options)
-        self.liveWidget.logger.success(f"PetChat component initialized with model {self.modelName}.")
+        self.liveWidget.logger.success(f"PetChat component initialized, preparing model {self.modelName}.")
         return True
 
     def componentMove(self, event: QMouseEvent) -> None:
@@ -181,14 +394,36 @@ class PetChat(QWidget, Component):
         if self.isVisible():
             self.hide()
 
-    def componentRelease(self) -> bool:
+    def componentStop(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
         self.isRunnable = False
+        self.__clearBubble.cancel()
+        # 关闭对话并卸载其他对话不再使用的模型（包括路由使用的模型），在对话引擎的事件循环中进行，不等待完成就继续关闭其他资源；
+        # 对话引擎可能由多个桌宠共享，不在这里停止，全局共享的引擎由关闭协调器在全部组件停止后停止
+        closing = self.engine.run(self.engine.closeConversation(self.conversation.conversationId)) if self.engine.isRunning else None
+        if self.screenCapture:
+            self.screenCapture.shutdown()
+        if self.voiceInput:
+            self.voiceInput.stop(max(0.0, deadline - time.monotonic()))
+        if self.conversation.store:
+            self.conversation.store.close(max(0.0, deadline - time.monotonic()))
+        if self.responseCache:
+            self.responseCache.save()
+        if self.conversation.memory:
+            self.conversation.memory.close(max(0.0, deadline - time.monotonic()))
+        try:
+            unloads = closing.result(max(0.0, deadline - time.monotonic())) if closing else {}
+        except concurrent.futures.TimeoutError:
+            self.liveWidget.logger.warning(f"Closing conversation {self.conversation.conversationId} did not finish before shutdown")
+            return False
+        for model, error in unloads.items():
+            if error:
+                self.liveWidget.logger.warning(f"Unloading model {model} failed: {error}")
+        self.liveWidget.logger.success(f"PetChat component stopped with model {self.modelName}.")
+        return True
+
+    def componentRelease(self) -> bool:
         self.hide()
         self.close()
-        # 卸载模型
-        self.liveWidget.logger.info(f"Unloading model {self.modelName}...")
-        ollama.chat(self.modelName, [], keep_alive=0)
-        self.liveWidget.logger.success(f"PetChat component released with model {self.modelName}.")
-
         gc.collect()
         return True
@@ -1,16 +1,22 @@
-from threading import Timer
-
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QMouseEvent, QPainter
-from PySide6.QtWidgets import QWidget, QLabel, QStyleOption, QStyle
+from PySide6.QtWidgets import QWidget, QStyleOption, QStyle
 
 from src.main.python.com.wutong.livepet.liveWidget import LiveWidget
 from src.main.python.com.wutong.livepet.liveWidget.components import Component
 from src.main.python.com.wutong.livepet.liveWidget.components.SystemTray import SystemTray
+from src.main.python.com.wutong.livepet.runtime.TimerWheel import TimerWheel, Timer
 from src.main.python.com.wutong.livepet.widgets.PetWidget import PetWidget
+from src.main.python.com.wutong.livepet.widgets.StreamLabel import StreamLabel
+from src.main.python.com.wutong.livepet.widgets.TextSink import TextSink
 
 
 class PetContext(QWidget, Component):
+    showRequested = Signal(str)
+    """显示文本（任意线程 -> GUI 线程）"""
+    clearRequested = Signal()
+    """清空文本（任意线程 -> GUI 线程）"""
+
     def __init__(self,
                  systemTray: SystemTray,
                  width: int,
@@ -22,13 +28,15 @@ class PetContext(QWidget, Component):
                  textColor: tuple[int, int, int] | str = "white",
                  fontSize: int = 16,
                  fontFamily: str = "微软雅黑",
-                 borderRadius: int = 10):
+                 borderRadius: int = 10,
+                 typewriterRate: float = 0):
         """
         初始化
         :param width: 宽度
         :param height: 高度
         :param positionX: X坐标
         :param positionY: Y坐标
+        :param typewriterRate: 打字机效果的字符速率（字/秒） Default: 0 （关闭）
         """
         super().__init__(componentName=__name__)
         self.systemTray = systemTray
@@ -40,7 +48,10 @@ class PetContext(QWidget, Component):
 
         self.liveWidget: LiveWidget | PetWidget | None = None
 
-        self.label: QLabel | None = None
+        self.label: StreamLabel | None = None
+        self.sink: TextSink | None = None
+        """流式文本汇，每帧最多刷新一次气泡"""
+        self.typewriterRate = typewriterRate
 
         self.labelQss = f"color: {textColor};" \
                         f"font-size: {fontSize}px;" \
@@ -52,6 +63,11 @@ class PetContext(QWidget, Component):
         self.clickY = -1
 
         self.isShowing = False
+        self.__clearTimer: Timer | None = None
+        """显示后清空气泡的定时器"""
+
+        self.showRequested.connect(self.__showText)
+        self.clearRequested.connect(self.__clearText)
 
     def paintEvent(self, event):
         opt = QStyleOption()
@@ -61,8 +77,8 @@ class PetContext(QWidget, Component):
         super().paintEvent(event)
 
     def initUI(self):
-        self.label = QLabel(self)
-        self.label.setWordWrap(True)
+        self.label = StreamLabel(self)
+        self.sink = TextSink(self.label.appendText, fps=self.liveWidget.frameFps, typewriterRate=self.typewriterRate, parent=self)
         self.label.setGeometry(0, 0, self.width, self.height)
         self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.label.setStyleSheet(self.labelQss)
@@ -86,6 +102,9 @@ class PetContext(QWidget, Component):
     def addTray(self):
         self.systemTray.addTrayAction("关闭桌宠气泡", self.switchShowAndHide)
 
+    def componentDependencies(self) -> list[Component]:
+        return [self.systemTray]
+
     def componentRunnable(self, liveWidget: LiveWidget) -> bool:
         self.liveWidget = liveWidget
         self.initUI()
@@ -94,6 +113,8 @@ class PetContext(QWidget, Component):
         return True
 
     def componentRelease(self) -> bool:
+        if self.__clearTimer is not None:
+            self.__clearTimer.cancel()
         self.close()
         return True
 
@@ -110,18 +131,42 @@ class PetContext(QWidget, Component):
         self.move(self.positionX, self.positionY)
 
     def showText(self, text: str):
+        """
+        显示文本（线程安全）
+        :param text: 文本
+        :return: None
+        """
+        self.showRequested.emit(text)
+
+    def __showText(self, text: str):
         if not self.isShowing:
-            Timer(self.showTime, self.clearText).start()
+            self.__clearTimer = TimerWheel.instance().after(self.showTime, self.clearText, "PetContext.clearText")
         self.isShowing = True
         self.liveWidget.logger.info(f"PetContext showText: {text}")
+        self.sink.clear()
         self.label.setText(text)
 
-    def addText(self, text: str):
+    def addText(self, text: str, rate: float = None):
+        """
+        追加文本（线程安全），由文本汇合并后按帧刷新到气泡
+        :param text: 文本
+        :param rate: 打字机字符速率（字/秒） Default: None （使用 typewriterRate）
+        :return: None
+        """
         self.isShowing = True
-        self.label.setText(self.label.text() + text)
+        self.sink.append(text, rate)
         self.isShowing = False
 
     def clearText(self):
+        """
+        清空文本（线程安全）
+        :return: None
+        """
+        if self.sink:
+            self.sink.clear()
+        self.clearRequested.emit()
+
+    def __clearText(self):
         self.liveWidget.logger.info("PetContext clearText")
         self.label.setText("")
         self.isShowing = False
@@ -90,6 +90,9 @@ class SystemTray(QSystemTrayIcon, Component):
     def addTrayAction(self, actionName: str, actionFunc: callable):
         self.trayActions[actionName] = QAction(actionName, self)
         self.trayActions[actionName].triggered.connect(actionFunc)
+        if self.trayMenu is not None:  # 菜单已经创建（依赖托盘的组件在托盘之后加载），插入到退出之前
+            actions = self.trayMenu.actions()
+            self.trayMenu.insertAction(actions[-1] if actions else None, self.trayActions[actionName])
 
     def setTrayActionCall(self, actionName: str, newActionFunc: callable):
         if actionName in self.trayActions:
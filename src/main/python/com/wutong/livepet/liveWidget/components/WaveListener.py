@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 import wave
 from datetime import datetime
@@ -6,17 +7,21 @@ from datetime import datetime
 import librosa
 import numpy as np
 import pyaudio
-import sounddevice
-from PySide6.QtCore import Qt, QThreadPool
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QMouseEvent
 from PySide6.QtWidgets import QWidget, QVBoxLayout
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 from src import ROOT_PATH
+from src.main.python.com.wutong.livepet.audio import AudioSource
+from src.main.python.com.wutong.livepet.audio.ActivityGate import ActivityGate
+from src.main.python.com.wutong.livepet.audio.DeviceSource import PyAudioSource, getAllDrives
+from src.main.python.com.wutong.livepet.audio.WaveProcessor import WaveProcessor
 from src.main.python.com.wutong.livepet.liveWidget import LiveWidget
 from src.main.python.com.wutong.livepet.liveWidget.components import Component
-from src.main.python.com.wutong.livepet.widgets.Runnable import Runnable
+from src.main.python.com.wutong.livepet.runtime.TaskRuntime import TaskRuntime, TaskHandle
+from src.main.python.com.wutong.livepet.runtime.TimerWheel import TimerWheel, Timer
 
 
 class SystemRecorder:
@@ -29,7 +34,8 @@ class SystemRecorder:
                  chunk: int = 4096,
                  isSave: bool = False,
                  savePath: str = None,
-                 fileName: str = "output"):
+                 fileName: str = "output",
+                 source: AudioSource = None):
         """
         初始化录音类
         :param inputDrivesName: 输入设备名称
@@ -39,19 +45,21 @@ class SystemRecorder:
         :param chunk: 缓冲区大小
         :param savePath: 保存路径
         :param fileName: 保存文件名
+        :param source: 音频源 Default: None （使用 inputDrivesName 对应的 PyAudio 设备）
         """
         self.liveWidget = liveWidget
         self.inputDrivesName = inputDrivesName
-        self.drives = [i for i in SystemRecorder.getAllDrives() if inputDrivesName in i["name"]]
 
-        if not self.drives:
+        try:
+            self.source = source or PyAudioSource(inputDrivesName, channels, formats, rate, chunk)
+        except ValueError:
             self.liveWidget.logger.exception(f"Cannot find input device {inputDrivesName}")
-            raise ValueError(f"Cannot find input device {inputDrivesName}")
+            raise
 
-        self.channels = channels or self.drives[0]['max_input_channels']
+        self.channels = self.source.channels
         self.formats = formats
-        self.rate = rate or int(self.drives[0]['default_samplerate'])
-        self.chunk = chunk
+        self.rate = self.source.rate
+        self.chunk = self.source.chunk
         self.isSave = isSave
         self.savePath = savePath or os.path.join(ROOT_PATH, "outputWave")
 
@@ -59,64 +67,104 @@ class SystemRecorder:
             os.makedirs(self.savePath)
 
         self.fileName = datetime.now().strftime(f"%Y-%m-%d_%H-%M-%S_{fileName}.wav")
-        self.p = pyaudio.PyAudio()
 
-        self.stream = self.p.open(format=self.formats, channels=self.channels, rate=self.rate, input=True, frames_per_buffer=self.chunk, input_device_index=self.drives[0]['index'])
-        self.threadPool: QThreadPool = liveWidget.threadPool
+        self.source.open()
+        self.runtime: TaskRuntime = liveWidget.runtime
 
-        self.__isRecording = True
+        self.__recording: TaskHandle | None = None
+        self.__frame: Timer | None = None
+        self.__latest = None
+        """最新一块尚未交给回调的音频"""
+        self.__latestLock = threading.Lock()
 
         if self.isSave:
             self.outputWaveFile = wave.open(os.path.join(self.savePath, self.fileName), 'wb')
             self.outputWaveFile.setnchannels(self.channels)
-            self.outputWaveFile.setsampwidth(self.p.get_sample_size(self.formats))
+            self.outputWaveFile.setsampwidth(self.source.sampleWidth)
             self.outputWaveFile.setframerate(self.rate)
 
     def startRecording(self, fps: int = 30, callback=lambda data: None, endCallback=lambda: None):
 
-        def run():
+        # 录音循环只读数据（音频源自己按块的时长阻塞），每帧由时间轮把最新的一块交给回调，两帧之间到达的多块只处理最新的
+        def run(token):
             try:
-                while self.__isRecording:
-                    audio_data = np.frombuffer(self.stream.read(self.chunk), dtype=np.int32)
-                    callback(audio_data)
+                while not token.isCancelled:
+                    audio_data = self.source.read()
+                    if audio_data is None:  # 音频源结束
+                        break
+                    with self.__latestLock:
+                        self.__latest = audio_data
                     if self.isSave:
                         self.outputWaveFile.writeframes(audio_data.tobytes())
-                    time.sleep(1 / fps)
             except KeyboardInterrupt:
                 pass
             finally:
+                self.__frame.cancel()
                 endCallback()
 
-        self.threadPool.start(Runnable(run))
+        def deliver():
+            with self.__latestLock:
+                audio_data, self.__latest = self.__latest, None
+            if audio_data is not None:
+                callback(audio_data)
+
+        self.__frame = TimerWheel.instance().every(1 / fps, deliver, "SystemRecorder.frame", offload=True, align=True)
+        self.__recording = self.runtime.service("SystemRecorder", run)
 
-    def stopRecording(self):
-        self.__isRecording = False
-        self.stream.stop_stream()
-        self.stream.close()
-        self.p.terminate()
+    def stopRecording(self, timeout: float = 1.0) -> bool:
+        """
+        停止录音并关闭音频源
+        :param timeout: 等待录音循环退出的时间（秒）
+        :return: 录音循环是否按时退出
+        """
+        stopped = True
+        if self.__frame is not None:
+            self.__frame.cancel()
+        if self.__recording is not None:
+            self.__recording.cancel()
+            stopped = self.__recording.join(timeout)  # 等录音循环退出后再关闭音频源
+        self.source.close()
         self.liveWidget.logger.info("Recording stopped")
+        return stopped
 
-    def close(self):
+    def close(self, timeout: float = 1.0) -> bool:
+        stopped = self.stopRecording(timeout)
         if self.isSave:
             self.outputWaveFile.close()
-        self.stopRecording()
+        return stopped
 
     def __repr__(self):
         return "\n".join([f"{k}: {v}" for k, v in self.__dict__.items()])
 
     @staticmethod
     def getAllDrives():
-        return [i for i in sounddevice.query_devices()]
+        return getAllDrives()
 
 
 class WaveListener(QWidget, Component):
+    plotRequested = Signal()
+    """有新的一帧波形需要绘制（工作线程 -> GUI 线程）"""
+
     def __init__(self,
                  width: int,
                  height: int,
                  scale: float,
                  positionX: int,
                  positionY: int,
-                 waveColor: str | tuple[float, float, float, float] = "blue"):
+                 waveColor: str | tuple[float, float, float, float] = "blue",
+                 source: AudioSource = None,
+                 isGated: bool = True):
+        """
+        初始化音频波形组件
+        :param width: 宽度
+        :param height: 高度
+        :param scale: 缩放比例
+        :param positionX: X坐标
+        :param positionY: Y坐标
+        :param waveColor: 波形颜色
+        :param source: 音频源 Default: None （使用系统立体声混音设备）
+        :param isGated: 是否启用声音活动检测，静音时跳过降噪和绘制 Default: True
+        """
         super().__init__(componentName=__name__)
         self.width = int(width * scale)
         self.height = int(height * scale)
@@ -136,18 +184,30 @@ class WaveListener(QWidget, Component):
 
         self.isRunning = False
         self.recording: SystemRecorder | None = None
-        self.decoder = np.float64
-
-        self.noise_profile = None
-        self.noise_update_counter = 0
-        self.noise_update_interval = 30
-        self.alpha = 0.9  # 平滑因子
+        self.source = source
+        self.processor = WaveProcessor(decoder=np.float64, noiseUpdateInterval=30, alpha=0.9)
+        self.isGated = isGated
+        self.gate: ActivityGate | None = None
+        self.isPlotted = False
+        self.isMuted = False
+        self.__plotLock = threading.Lock()
+        self.__plot: np.ndarray | None = None
+        """最新一帧尚未绘制的降噪音频，None 表示清除波形"""
+        self.__plotScheduled = False
+        """是否已经请求了绘制，GUI 线程来不及绘制时只保留最新的一帧"""
+        self.plotRequested.connect(self.__draw, Qt.ConnectionType.QueuedConnection)
 
         self.clickX = -1
         self.clickY = -1
 
+    def componentPrepare(self, liveWidget: LiveWidget) -> bool:
+        # 打开录音设备可能需要较长时间，在工作线程中完成
+        self.recording = SystemRecorder(liveWidget, source=self.source)
+        if self.isGated:
+            self.gate = ActivityGate(channels=self.recording.channels, fullScale=ActivityGate.fullScaleOf(self.recording.source.dtype))
+        return True
+
     def componentRunnable(self, liveWidget: LiveWidget) -> bool:
-        self.recording = SystemRecorder(liveWidget)
         self.isRunning = True
         self.setGeometry(self.positionX, self.positionY, self.width, self.height)
         self.clickX = self.recording.liveWidget.clickX
@@ -156,9 +216,11 @@ class WaveListener(QWidget, Component):
         self.recording.startRecording(fps=liveWidget.frameFps, callback=self.updatePlot)
         return True
 
-    def componentRelease(self) -> True:
+    def componentStop(self, timeout: float) -> bool:
         self.isRunning = False
-        self.recording.close()
+        return self.recording.close(timeout)
+
+    def componentRelease(self) -> True:
         self.hide()
         self.close()
         return True
@@ -168,50 +230,90 @@ class WaveListener(QWidget, Component):
         self.positionY = self.recording.liveWidget.positionY + self.recording.liveWidget.scaledSize[1]
         self.move(self.positionX, self.positionY)
 
+    def toggleMute(self):
+        """
+        暂停或恢复波形绘制（录音不停止）
+        :return: None
+        """
+        self.isMuted = not self.isMuted
+        if self.isMuted and self.isPlotted:
+            self.figure.clear()
+            self.canvas.draw()
+            self.isPlotted = False
+
     def updatePlot(self, audio_data: np.ndarray):
-        if not self.isRunning:
+        """
+        处理一块音频（工作线程）：声音活动检测和降噪在工作线程中完成，绘制交给 GUI 线程
+        :param audio_data: 音频数据
+        :return: None
+        """
+        if not self.isRunning or self.isMuted:
             return
-        audio_data = audio_data.astype(self.decoder)
+        start = time.perf_counter()
         try:
-            if self.noise_profile is None:
-                self.noise_profile = np.abs(librosa.stft(audio_data)) ** 2
-
-            self.noise_update_counter += 1
-            if self.noise_update_counter >= self.noise_update_interval:
-                new_noise_profile = np.abs(librosa.stft(audio_data)) ** 2
-                self.noise_profile = self.alpha * self.noise_profile + (1 - self.alpha) * new_noise_profile  # 平滑更新
-                self.noise_update_counter = 0
-
-            stft_audio = librosa.stft(audio_data)
-            magnitude = np.abs(stft_audio) ** 2
-
-            mask = (magnitude - self.noise_profile) / magnitude  # 可能需要调整
-            mask = np.maximum(mask, 0.0)
-            masked_stft = stft_audio * np.sqrt(mask)
-            denoised_audio = librosa.istft(masked_stft).astype(self.decoder)
-
-            self.figure.clear()
-
-            try:
-                if denoised_audio.ndim == 1:  # 单声道
-                    ax = self.figure.add_subplot(111)
-                    ax.set_axis_off()
-                    librosa.display.waveshow(denoised_audio, sr=self.recording.rate, ax=ax, color=self.waveColor)
-                elif denoised_audio.ndim == 2:  # 多声道
-                    ax_left = self.figure.add_subplot(211)
-                    ax_right = self.figure.add_subplot(212)
-                    ax_left.set_axis_off()
-                    ax_right.set_axis_off()
-                    librosa.display.waveshow(denoised_audio[:, 0], sr=self.recording.rate, ax=ax_left, color=self.waveColor)
-                    librosa.display.waveshow(denoised_audio[:, 1], sr=self.recording.rate, ax=ax_right, color=self.waveColor)
-                else:
-                    self.recording.liveWidget.logger.error("Not supported audio format.")
-                self.canvas.draw()
-            except Exception as e:
-                self.recording.liveWidget.logger.error(f"Find Unknown Error: {e}")
+            if self.gate and not self.gate.update(audio_data):
+                # 静音：只刷新噪声谱，清掉残留的波形后不再绘制
+                self.processor.refreshNoiseProfile(audio_data)
+                if self.isPlotted:
+                    self.__requestPlot(None)
+                return
+            self.__requestPlot(self.processor.process(audio_data))
         except Exception as e:
             self.recording.liveWidget.logger.exception(f"Error: {e}")
             self.recording.stopRecording()
+        finally:
+            if self.gate:
+                self.gate.account(time.perf_counter() - start)
+
+    def __requestPlot(self, denoised_audio: np.ndarray | None):
+        with self.__plotLock:
+            self.__plot = denoised_audio
+            if self.__plotScheduled:
+                return
+            self.__plotScheduled = True
+        self.plotRequested.emit()
+
+    def __draw(self):
+        """
+        在 GUI 线程中绘制最新的一帧波形
+        """
+        with self.__plotLock:
+            denoised_audio, self.__plot = self.__plot, None
+            self.__plotScheduled = False
+        if not self.isRunning or self.isMuted:
+            return
+        self.figure.clear()
+        if denoised_audio is None:
+            if self.isPlotted:
+                self.canvas.draw()
+                self.isPlotted = False
+            return
+
+        try:
+            if denoised_audio.ndim == 1:  # 单声道
+                ax = self.figure.add_subplot(111)
+                ax.set_axis_off()
+                librosa.display.waveshow(denoised_audio, sr=self.recording.rate, ax=ax, color=self.waveColor)
+            elif denoised_audio.ndim == 2:  # 多声道
+                ax_left = self.figure.add_subplot(211)
+                ax_right = self.figure.add_subplot(212)
+                ax_left.set_axis_off()
+                ax_right.set_axis_off()
+                librosa.display.waveshow(denoised_audio[:, 0], sr=self.recording.rate, ax=ax_left, color=self.waveColor)
+                librosa.display.waveshow(denoised_audio[:, 1], sr=self.recording.rate, ax=ax_right, color=self.waveColor)
+            else:
+                self.recording.liveWidget.logger.error("Not supported audio format.")
+            self.canvas.draw()
+            self.isPlotted = True
+        except Exception as e:
+            self.recording.liveWidget.logger.error(f"Find Unknown Error: {e}")
+
+    def gateMetrics(self) -> dict:
+        """
+        声音活动检测的统计数据
+        :return: 判定次数、各状态持续时间和处理耗时，未启用时返回空字典
+        """
+        return self.gate.metrics() if self.gate else {}
 
     def componentHide(self):
         self.hide()
@@ -0,0 +1,119 @@
+import bisect
+import threading
+import time
+
+
+def exponentialBuckets(start: float, factor: float, count: int) -> list[float]:
+    """
+    生成指数增长的桶上界
+    :param start: 第一个桶的上界
+    :param factor: 相邻桶的倍数
+    :param count: 桶数量
+    :return: 桶上界列表
+    """
+    return [start * factor ** i for i in range(count)]
+
+
+class Histogram:
+    """
+    滚动直方图
+    固定桶上界，观测值只做一次二分查找和计数；时间窗口被切成若干片，过期的片整片丢弃，
+    快照合并窗口内的所有片，分位数由桶内线性插值估算
+    """
+
+    def __init__(self,
+                 name: str,
+                 unit: str = "",
+                 buckets: list[float] = None,
+                 window: float = 600.0,
+                 slices: int = 10):
+        """
+        初始化直方图
+        :param name: 指标名
+        :param unit: 单位
+        :param buckets: 桶上界（升序） Default: None （0.1ms ~ 约 100s 的指数桶）
+        :param window: 滚动窗口长度（秒）
+        :param slices: 窗口切片数
+        """
+        self.name = name
+        """指标名"""
+        self.unit = unit
+        """单位"""
+        self.buckets = buckets or exponentialBuckets(0.0001, 2, 21)
+        """桶上界"""
+        self.sliceDuration = window / slices
+        """每片的时长"""
+        self.slices = slices
+        """窗口切片数"""
+
+        self.__lock = threading.Lock()
+        self.__slices: list[list] = []
+        """[开始时间, 各桶计数, 数量, 总和, 最小值, 最大值]，按时间从旧到新"""
+
+    def observe(self, value: float):
+        """
+        记录一个观测值（线程安全）
+        :param value: 观测值
+        :return: None
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        now = time.monotonic()
+        with self.__lock:
+            if not self.__slices or now - self.__slices[-1][0] >= self.sliceDuration:
+                self.__slices.append([now, [0] * (len(self.buckets) + 1), 0, 0.0, value, value])
+                if len(self.__slices) > self.slices:
+                    del self.__slices[0]
+            current = self.__slices[-1]
+            current[1][index] += 1
+            current[2] += 1
+            current[3] += value
+            if value < current[4]:
+                current[4] = value
+            if value > current[5]:
+                current[5] = value
+
+    def reset(self):
+        """
+        清空所有观测值
+        :return: None
+        """
+        with self.__lock:
+            self.__slices.clear()
+
+    def __quantile(self, counts: list[int], total: int, low: float, high: float, q: float) -> float:
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else low
+                upper = self.buckets[index] if index < len(self.buckets) else high
+                lower, upper = max(lower, low), min(upper, high)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return high
+
+    def snapshot(self) -> dict:
+        """
+        合并窗口内的观测值
+        :return: {"count", "mean", "min", "max", "p50", "p90", "p99", "buckets"}
+        """
+        horizon = time.monotonic() - self.sliceDuration * self.slices
+        with self.__lock:
+            live = [item for item in self.__slices if item[0] >= horizon]
+            counts = [sum(column) for column in zip(*(item[1] for item in live))] if live else []
+            total = sum(item[2] for item in live)
+            summed = sum(item[3] for item in live)
+            low = min((item[4] for item in live), default=0.0)
+            high = max((item[5] for item in live), default=0.0)
+        if not total:
+            return {"unit": self.unit, "count": 0}
+        return {"unit": self.unit,
+                "count": total,
+                "mean": summed / total,
+                "min": low,
+                "max": high,
+                "p50": self.__quantile(counts, total, low, high, 0.5),
+                "p90": self.__quantile(counts, total, low, high, 0.9),
+                "p99": self.__quantile(counts, total, low, high, 0.99),
+                "buckets": {("+Inf" if index == len(self.buckets) else f"{self.buckets[index]:g}"): count
+                            for index, count in enumerate(counts) if count}}
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.metrics.Histogram import Histogram, exponentialBuckets
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    默认关闭，关闭时 observe 只做一次布尔判断；热路径上可以先判断 enabled 再计算观测值。
+    设置环境变量 FREEL2D_METRICS=1 或调用 enable() 开启
+    """
+
+    __instance: "MetricsRegistry | None" = None
+
+    COUNT_BUCKETS = exponentialBuckets(1, 2, 16)
+    """计数类指标（token 数等）的桶上界"""
+    RATE_BUCKETS = exponentialBuckets(0.5, 1.5, 20)
+    """速率类指标（每秒 token 数等）的桶上界"""
+
+    def __init__(self, enabled: bool = False):
+        """
+        初始化指标注册表
+        :param enabled: 是否开启
+        """
+        self.enabled = enabled
+        """是否开启"""
+        self.__histograms: dict[str, Histogram] = {}
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> "MetricsRegistry":
+        """
+        全局共享的指标注册表
+        :return: MetricsRegistry
+        """
+        if cls.__instance is None:
+            cls.__instance = MetricsRegistry(os.environ.get("FREEL2D_METRICS", "") not in ("", "0"))
+        return cls.__instance
+
+    def enable(self):
+        """
+        开启指标记录
+        :return: None
+        """
+        self.enabled = True
+        logger.info("Metrics enabled")
+
+    def disable(self):
+        """
+        关闭指标记录（已记录的数据保留）
+        :return: None
+        """
+        self.enabled = False
+
+    def histogram(self, name: str, unit: str = "s", buckets: list[float] = None) -> Histogram:
+        """
+        获取或创建直方图
+        :param name: 指标名
+        :param unit: 单位（仅在创建时使用）
+        :param buckets: 桶上界（仅在创建时使用）
+        :return: Histogram
+        """
+        histogram = self.__histograms.get(name)
+        if histogram is None:
+            with self.__lock:
+                histogram = self.__histograms.setdefault(name, Histogram(name, unit, buckets))
+        return histogram
+
+    def observe(self, name: str, value: float | None, unit: str = "s", buckets: list[float] = None):
+        """
+        记录一个观测值，关闭或值为 None 时忽略
+        :param name: 指标名
+        :param value: 观测值
+        :param unit: 单位（仅在创建时使用）
+        :param buckets: 桶上界（仅在创建时使用）
+        :return: None
+        """
+        if self.enabled and value is not None:
+            self.histogram(name, unit, buckets).observe(value)
+
+    def snapshot(self, prefix: str = "") -> dict:
+        """
+        查询所有直方图的当前快照
+        :param prefix: 只返回以此开头的指标
+        :return: {指标名: 快照}
+        """
+        return {name: histogram.snapshot() for name, histogram in sorted(self.__histograms.items()) if name.startswith(prefix)}
+
+    def reset(self):
+        """
+        清空所有观测值
+        :return: None
+        """
+        for histogram in list(self.__histograms.values()):
+            histogram.reset()
+
+    def export(self, path: str):
+        """
+        把当前快照导出为 JSON 文件
+        :param path: 文件路径
+        :return: None
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        logger.info(f"Metrics exported to {path}")
+
+    def prometheus(self) -> str:
+        """
+        导出为 Prometheus 文本格式（窗口内的分位数摘要）
+        :return: 文本
+        """
+        lines = []
+        for name, snapshot in self.snapshot().items():
+            metric = name.replace(".", "_")
+            lines.append(f"# TYPE {metric} summary")
+            for key, quantile in (("p50", "0.5"), ("p90", "0.9"), ("p99", "0.99")):
+                if key in snapshot:
+                    lines.append(f'{metric}{{quantile="{quantile}"}} {snapshot[key]:g}')
+            lines.append(f"{metric}_count {snapshot['count']}")
+            lines.append(f"{metric}_sum {snapshot.get('mean', 0) * snapshot['count']:g}")
+        return "\n".join(lines) + "\n"
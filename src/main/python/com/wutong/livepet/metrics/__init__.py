@@ -0,0 +1,7 @@
+__namespace__ = "com.wutong.livepet.metrics"
+__author__ = "Wutong"
+__version__ = "0.0.1"
+__description__ = "运行指标，滚动直方图与全局注册表，默认关闭"
+
+from .Histogram import Histogram
+from .MetricsRegistry import MetricsRegistry
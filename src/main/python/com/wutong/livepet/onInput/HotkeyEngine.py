@@ -0,0 +1,244 @@
+import time
+
+from PySide6.QtCore import QObject, Qt, Signal
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.exception import HotkeyConflictException
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+from src.main.python.com.wutong.livepet.onInput.InputHub import InputEventKind, InputHub
+from src.main.python.com.wutong.livepet.onInput.KeyInput import KeyInput
+
+MODIFIERS = {"ctrl": 1, "shift": 2, "alt": 4, "cmd": 8}
+"""修饰键对应的位"""
+MODIFIER_ALIASES = {"ctrl_l": "ctrl", "ctrl_r": "ctrl", "control": "ctrl",
+                    "shift_l": "shift", "shift_r": "shift",
+                    "alt_l": "alt", "alt_r": "alt", "alt_gr": "alt", "option": "alt",
+                    "cmd_l": "cmd", "cmd_r": "cmd", "win": "cmd", "super": "cmd", "meta": "cmd"}
+"""修饰键的别名，左右两侧视为同一个修饰键"""
+KEY_ALIASES = {"escape": "esc", "return": "enter", "del": "delete", "ins": "insert",
+               "pgup": "page_up", "pgdn": "page_down", "plus": "+", "comma": ",", "minus": "-"}
+"""普通键的别名，统一为 pynput 的按键名"""
+
+
+class HotkeySignals(QObject):
+    """
+    快捷键信号
+    在钩子线程中发出，连接到 GUI 线程的槽时由 Qt 排队投递
+    """
+    triggered = Signal(str, float)
+    """快捷键命中: triggered(name, eventTime)，eventTime 为按下最后一个键时的 time.perf_counter()"""
+
+
+class HotkeyNode:
+    """
+    前缀树节点，边为一个组合键 (修饰键位, 按键名)
+    """
+
+    def __init__(self):
+        self.children: dict[tuple[int, str], HotkeyNode] = {}
+        """子节点"""
+        self.name: str | None = None
+        """在此结束的快捷键名"""
+
+
+class HotkeyEngine:
+    """
+    全局快捷键
+    快捷键写作 "ctrl+alt+c"，按顺序按下的组合键序列用空格分隔，例如 "ctrl+k ctrl+c"；
+    所有快捷键编译为一棵前缀树，每次按键只在当前节点查一次字典，命中完整的快捷键时才向 GUI 线程发信号，
+    其余按键不排队、不唤醒 GUI 线程。修饰键按位记录，不区分左右；
+    注册时检查冲突：完全相同，或者一个快捷键是另一个的前缀（按到前缀时无法判断是否应该触发）
+    """
+
+    def __init__(self, hub: InputHub = None, sequenceTimeout: float = 1.0):
+        """
+        初始化全局快捷键（需要在 GUI 线程中创建，以保证信号对象属于 GUI 线程）
+        :param hub: 输入中心 Default: None （全局共享的输入中心）
+        :param sequenceTimeout: 组合键序列中相邻两个组合键的最大间隔（秒）
+        """
+        self.hub = hub or InputHub.instance()
+        """输入中心"""
+        self.sequenceTimeout = sequenceTimeout
+        """组合键序列的最大间隔"""
+
+        self.signals = HotkeySignals()
+        """快捷键信号"""
+        self.signals.triggered.connect(self.__onTriggered, Qt.ConnectionType.QueuedConnection)
+        self.__registry = MetricsRegistry.instance()
+
+        self.__hotkeys: dict[str, tuple[tuple[tuple[int, str], ...], callable]] = {}
+        """已注册的快捷键 {名称: (组合键序列, 动作)}"""
+        self.__root = HotkeyNode()
+        """前缀树的根，注册或注销时整棵重建后替换，钩子线程读到的总是完整的树"""
+        self.__node = self.__root
+        """当前匹配到的节点"""
+        self.__lastTime = 0.0
+        """上一次前进到非根节点的时间点"""
+        self.__mask = 0
+        """按下的修饰键"""
+        self.__down: set[str] = set()
+        """按下的普通键，用于忽略按住时的自动重复"""
+        self.__subscriptions: list[int] = []
+
+    @staticmethod
+    def parse(hotkey: str) -> tuple[tuple[int, str], ...]:
+        """
+        解析快捷键
+        :param hotkey: 快捷键，例如 "ctrl+shift+h" 或 "ctrl+k ctrl+c"
+        :return: 组合键序列 ((修饰键位, 按键名), ...)
+        """
+        sequence = []
+        for chord in hotkey.lower().split():
+            parts = chord.split("+")
+            if chord.endswith("++"):  # "ctrl++"：按键本身是加号
+                parts = parts[:-2] + ["+"]
+            *modifiers, key = parts
+            mask = 0
+            for modifier in modifiers:
+                modifier = MODIFIER_ALIASES.get(modifier, modifier)
+                if modifier not in MODIFIERS:
+                    raise ValueError(f"Unknown modifier {modifier!r} in hotkey {hotkey!r}")
+                mask |= MODIFIERS[modifier]
+            key = KEY_ALIASES.get(key, key)
+            if not key or MODIFIER_ALIASES.get(key, key) in MODIFIERS:
+                raise ValueError(f"Hotkey {hotkey!r} needs a non-modifier key in every chord")
+            sequence.append((mask, key))
+        if not sequence:
+            raise ValueError("Empty hotkey")
+        return tuple(sequence)
+
+    @staticmethod
+    def normalize(key) -> str:
+        """
+        按键名：与 KeyInput.keyName 相同，另外把按住 ctrl 时产生的控制字符还原为字母
+        :param key: pynput 按键或按键名
+        :return: 按键名
+        """
+        name = KeyInput.keyName(key)
+        if len(name) == 1 and ord(name) < 32:
+            return chr(ord(name) + 96)
+        return name
+
+    def register(self, name: str, hotkey: str, action: callable):
+        """
+        注册快捷键
+        :param name: 名称
+        :param hotkey: 快捷键
+        :param action: 动作，在 GUI 线程中无参数调用
+        :return: None
+        :raise HotkeyConflictException: 与已注册的快捷键冲突
+        """
+        sequence = self.parse(hotkey)
+        for otherName, (other, _) in self.__hotkeys.items():
+            if otherName == name:
+                continue
+            shorter = min(len(sequence), len(other))
+            if sequence[:shorter] == other[:shorter]:
+                raise HotkeyConflictException(f"Hotkey {name} ({hotkey}) conflicts with {otherName} ({self.format(other)})")
+        self.__hotkeys[name] = (sequence, action)
+        self.__rebuild()
+        logger.info(f"Register hotkey {name}: {self.format(sequence)}")
+
+    def unregister(self, name: str):
+        """
+        注销快捷键
+        :param name: 名称
+        :return: None
+        """
+        if self.__hotkeys.pop(name, None) is not None:
+            self.__rebuild()
+
+    @staticmethod
+    def format(sequence: tuple[tuple[int, str], ...]) -> str:
+        """
+        组合键序列的规范写法
+        :param sequence: 组合键序列
+        :return: 例如 "ctrl+alt+c"
+        """
+        return " ".join("+".join([modifier for modifier, bit in MODIFIERS.items() if mask & bit] + [key]) for mask, key in sequence)
+
+    def start(self):
+        """
+        开始监听（在输入中心的钩子线程中直接匹配）
+        :return: None
+        """
+        if self.__subscriptions:
+            return
+        self.__subscriptions = [self.hub.subscribe(InputEventKind.Press, self.press, direct=True),
+                                self.hub.subscribe(InputEventKind.Release, self.release, direct=True)]
+        logger.success(f"Hotkeys started: {', '.join(self.__hotkeys)}")
+
+    def close(self):
+        """
+        停止监听
+        :return: None
+        """
+        for subscriptionId in self.__subscriptions:
+            self.hub.unsubscribe(subscriptionId)
+        self.__subscriptions = []
+        self.__mask, self.__down = 0, set()
+
+    def press(self, key) -> str | None:
+        """
+        处理按下事件（钩子线程），常数时间
+        :param key: pynput 按键或按键名
+        :return: 命中的快捷键名
+        """
+        name = self.normalize(key)
+        modifier = MODIFIERS.get(MODIFIER_ALIASES.get(name, name))
+        if modifier is not None:
+            self.__mask |= modifier
+            return None
+        if name in self.__down:
+            return None
+        self.__down.add(name)
+        now = time.perf_counter()
+        root, node = self.__root, self.__node
+        if node is not root and now - self.__lastTime > self.sequenceTimeout:
+            node = root
+        chord = (self.__mask, name)
+        child = node.children.get(chord)
+        if child is None and node is not root:  # 序列中断，这个键可能是另一个快捷键的开头
+            child = root.children.get(chord)
+        if child is None:
+            self.__node = root
+            return None
+        if child.name is None:
+            self.__node, self.__lastTime = child, now
+            return None
+        self.__node = root
+        self.signals.triggered.emit(child.name, now)
+        return child.name
+
+    def release(self, key):
+        """
+        处理松开事件（钩子线程）
+        :param key: pynput 按键或按键名
+        :return: None
+        """
+        name = self.normalize(key)
+        modifier = MODIFIERS.get(MODIFIER_ALIASES.get(name, name))
+        if modifier is not None:
+            self.__mask &= ~modifier
+        else:
+            self.__down.discard(name)
+
+    def __rebuild(self):
+        root = HotkeyNode()
+        for name, (sequence, _) in self.__hotkeys.items():
+            node = root
+            for chord in sequence:
+                node = node.children.setdefault(chord, HotkeyNode())
+            node.name = name
+        self.__root = self.__node = root
+
+    def __onTriggered(self, name: str, eventTime: float):
+        hotkey = self.__hotkeys.get(name)
+        if hotkey is None:
+            return
+        if self.__registry.enabled:
+            self.__registry.observe("hotkey.dispatchLatency", time.perf_counter() - eventTime)
+        try:
+            hotkey[1]()
+        except Exception as e:
+            logger.exception(f"Hotkey {name} failed: {e}")
@@ -0,0 +1,260 @@
+import collections
+import itertools
+import threading
+import time
+from enum import Enum
+
+from PySide6.QtCore import QObject, Qt, QTimer, Signal
+from loguru import logger
+from pynput import keyboard, mouse
+
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+
+class InputEventKind(Enum):
+    Click = "click"
+    Move = "move"
+    Scroll = "scroll"
+    Press = "press"
+    Release = "release"
+
+
+KEYBOARD_KINDS = (InputEventKind.Press, InputEventKind.Release)
+"""键盘事件"""
+
+
+class InputSignals(QObject):
+    """
+    输入中心信号
+    在钩子线程中发出，由 Qt 排队投递到 GUI 线程
+    """
+    wake = Signal(bool)
+    """有待投递的事件: wake(urgent)，urgent 为 True 时有点击或按键事件，不等待下一帧"""
+
+
+class InputHub:
+    """
+    全局输入中心
+    整个进程只安装一个鼠标钩子和一个键盘钩子（各一个线程），所有绑定通过分发表订阅；
+    钩子线程只记录事件，回调统一在 GUI 线程中执行：点击和按键事件按顺序排队，立即投递；
+    移动和滚轮事件合并为最新的一个（滚轮累加位移），每帧最多投递一次。
+    直接订阅（direct）的回调在钩子线程中同步执行，不经过排队，用于需要看到每个事件但很少需要投递的订阅者（例如全局快捷键），
+    回调必须足够快，否则会拖慢整个系统的输入。
+    钩子在第一个订阅出现时安装，最后一个订阅取消时卸载
+    """
+
+    __instance: "InputHub | None" = None
+
+    def __init__(self, frameInterval: float = 1 / 60, maxQueued: int = 256):
+        """
+        初始化输入中心（需要在 GUI 线程中创建，以保证信号对象属于 GUI 线程）
+        :param frameInterval: 合并事件的最短投递间隔（秒）
+        :param maxQueued: 点击和按键事件的最大排队数，超过时丢弃最早的事件
+        """
+        self.frameInterval = frameInterval
+        """合并事件的最短投递间隔"""
+        self.maxQueued = maxQueued
+        """点击和按键事件的最大排队数"""
+
+        self.signals = InputSignals()
+        """输入中心信号"""
+        self.signals.wake.connect(self.__onWake, Qt.ConnectionType.QueuedConnection)
+        self.__registry = MetricsRegistry.instance()
+
+        self.__subscribers: dict[InputEventKind, dict[int, callable]] = {kind: {} for kind in InputEventKind}
+        """分发表 {事件类型: {订阅编号: 回调}}"""
+        self.__direct: dict[InputEventKind, dict[int, callable]] = {kind: {} for kind in InputEventKind}
+        """直接订阅的分发表 {事件类型: {订阅编号: 回调}}"""
+        self.__ids = itertools.count(1)
+        self.__queue: collections.deque[tuple[InputEventKind, tuple, float]] = collections.deque()
+        """排队的点击和按键事件 (类型, 参数, 发生时间)"""
+        self.__latest: dict[InputEventKind, tuple[tuple, float]] = {}
+        """合并后的移动和滚轮事件 {类型: (参数, 最早一次未投递事件的发生时间)}"""
+        self.__scheduled = False
+        """是否已经请求过投递"""
+        self.__lastFlush = 0.0
+        """上一次投递的时间点"""
+        self.__lock = threading.Lock()
+        self.__mouse: mouse.Listener | None = None
+        """鼠标钩子"""
+        self.__keyboard: keyboard.Listener | None = None
+        """键盘钩子"""
+        self.__counters = {"received": 0, "delivered": 0, "coalesced": 0, "dropped": 0}
+
+    @classmethod
+    def instance(cls) -> "InputHub":
+        """
+        全局共享的输入中心
+        :return: InputHub
+        """
+        if cls.__instance is None:
+            cls.__instance = InputHub()
+        return cls.__instance
+
+    def subscribe(self, kind: InputEventKind, callback: callable, direct: bool = False) -> int:
+        """
+        订阅输入事件，回调在 GUI 线程中执行，参数与 pynput 相同：
+        Click(x, y, button, pressed)、Move(x, y)、Scroll(x, y, dx, dy)、Press(key)、Release(key)
+        :param kind: 事件类型
+        :param callback: 回调
+        :param direct: 是否在钩子线程中直接执行回调（不排队、不合并）
+        :return: 订阅编号
+        """
+        subscriptionId = next(self.__ids)
+        with self.__lock:
+            table = self.__direct if direct else self.__subscribers
+            table[kind] = {**table[kind], subscriptionId: callback}
+        self.__updateHooks()
+        return subscriptionId
+
+    def unsubscribe(self, subscriptionId: int):
+        """
+        取消订阅
+        :param subscriptionId: 订阅编号
+        :return: None
+        """
+        with self.__lock:
+            for table in (self.__subscribers, self.__direct):
+                for kind, callbacks in table.items():
+                    if subscriptionId in callbacks:
+                        table[kind] = {key: value for key, value in callbacks.items() if key != subscriptionId}
+        self.__updateHooks()
+
+    def metrics(self) -> dict:
+        """
+        输入中心的计数：收到、投递、合并（被同一帧内更新的事件覆盖）和丢弃（排队溢出）的事件数
+        :return: 计数
+        """
+        with self.__lock:
+            return {**self.__counters,
+                    "subscribers": {kind.value: len(self.__subscribers[kind]) + len(self.__direct[kind]) for kind in InputEventKind},
+                    "queued": len(self.__queue)}
+
+    def stop(self):
+        """
+        卸载钩子并清空订阅
+        :return: None
+        """
+        with self.__lock:
+            self.__subscribers = {kind: {} for kind in InputEventKind}
+            self.__direct = {kind: {} for kind in InputEventKind}
+        self.__updateHooks()
+
+    def __updateHooks(self):
+        with self.__lock:
+            needMouse = any(self.__subscribers[kind] or self.__direct[kind] for kind in InputEventKind if kind not in KEYBOARD_KINDS)
+            needKeyboard = any(self.__subscribers[kind] or self.__direct[kind] for kind in KEYBOARD_KINDS)
+            startMouse = needMouse and self.__mouse is None
+            startKeyboard = needKeyboard and self.__keyboard is None
+            stopMouse, stopKeyboard = None, None
+            if startMouse:
+                self.__mouse = mouse.Listener(on_click=self.__onClick, on_move=self.__onMove, on_scroll=self.__onScroll)
+            elif not needMouse:
+                stopMouse, self.__mouse = self.__mouse, None
+            if startKeyboard:
+                self.__keyboard = keyboard.Listener(on_press=self.__onPress, on_release=self.__onRelease)
+            elif not needKeyboard:
+                stopKeyboard, self.__keyboard = self.__keyboard, None
+        if startMouse:
+            self.__mouse.start()
+            logger.info("Global mouse hook installed")
+        if startKeyboard:
+            self.__keyboard.start()
+            logger.info("Global keyboard hook installed")
+        for listener, name in ((stopMouse, "mouse"), (stopKeyboard, "keyboard")):
+            if listener is not None:
+                listener.stop()
+                logger.info(f"Global {name} hook removed")
+
+    # 以下在钩子线程中执行，只记录事件，不调用订阅者
+
+    def __onClick(self, x, y, button, pressed):
+        self.__enqueue(InputEventKind.Click, (x, y, button, pressed))
+
+    def __onPress(self, key):
+        self.__enqueue(InputEventKind.Press, (key,))
+
+    def __onRelease(self, key):
+        self.__enqueue(InputEventKind.Release, (key,))
+
+    def __onMove(self, x, y):
+        self.__coalesce(InputEventKind.Move, (x, y))
+
+    def __onScroll(self, x, y, dx, dy):
+        self.__coalesce(InputEventKind.Scroll, (x, y, dx, dy))
+
+    def __enqueue(self, kind: InputEventKind, args: tuple):
+        self.__callDirect(kind, args)
+        now = time.perf_counter()
+        with self.__lock:
+            self.__counters["received"] += 1
+            if not self.__subscribers[kind]:
+                return
+            if len(self.__queue) >= self.maxQueued:
+                self.__queue.popleft()
+                self.__counters["dropped"] += 1
+            self.__queue.append((kind, args, now))
+        self.signals.wake.emit(True)
+
+    def __coalesce(self, kind: InputEventKind, args: tuple):
+        self.__callDirect(kind, args)
+        now = time.perf_counter()
+        with self.__lock:
+            self.__counters["received"] += 1
+            if not self.__subscribers[kind]:
+                return
+            previous = self.__latest.get(kind)
+            if previous is not None:
+                self.__counters["coalesced"] += 1
+                if kind is InputEventKind.Scroll:  # 滚轮累加位移，不丢失滚动量
+                    args = (*args[:2], previous[0][2] + args[2], previous[0][3] + args[3])
+            self.__latest[kind] = (args, previous[1] if previous is not None else now)
+            if self.__scheduled:
+                return
+            self.__scheduled = True
+        self.signals.wake.emit(False)
+
+    def __callDirect(self, kind: InputEventKind, args: tuple):
+        for callback in self.__direct[kind].values():  # 分发表写时复制，不需要加锁
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.exception(f"Direct input callback {getattr(callback, '__name__', callback)} failed: {e}")
+
+    # 以下在 GUI 线程中执行
+
+    def __onWake(self, urgent: bool):
+        if urgent:
+            self.__flush()
+            return
+        remaining = self.__lastFlush + self.frameInterval - time.perf_counter()
+        if remaining > 0:
+            QTimer.singleShot(max(1, round(remaining * 1000)), self.__flush)
+        else:
+            self.__flush()
+
+    def __flush(self):
+        with self.__lock:
+            queued, self.__queue = self.__queue, collections.deque()
+            latest, self.__latest = self.__latest, {}
+            self.__scheduled = False
+            subscribers = self.__subscribers
+        if not queued and not latest:
+            return
+        if latest:
+            self.__lastFlush = time.perf_counter()
+        for kind, args, eventTime in queued:
+            self.__dispatch(subscribers[kind], args, eventTime)
+        for kind, (args, eventTime) in latest.items():
+            self.__dispatch(subscribers[kind], args, eventTime)
+
+    def __dispatch(self, callbacks: dict[int, callable], args: tuple, eventTime: float):
+        for callback in callbacks.values():
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.exception(f"Input callback {getattr(callback, '__name__', callback)} failed: {e}")
+        with self.__lock:
+            self.__counters["delivered"] += len(callbacks)
+        if self.__registry.enabled:
+            self.__registry.observe("input.dispatchLatency", time.perf_counter() - eventTime)
@@ -1,3 +1,100 @@
+from loguru import logger
+from pynput.keyboard import Key, KeyCode
+
+from src.main.python.com.wutong.livepet.onInput.InputHub import InputEventKind, InputHub
+
+
 class KeyInput:
-    def __init__(self):
-        pass
+    """
+    键盘绑定
+    共用 InputHub 的全局键盘钩子，只订阅一次按下和松开事件，按键名在分发表中查找绑定；回调在 GUI 线程中执行
+    """
+
+    def __init__(self, log: logger, hub: InputHub = None):
+        """
+        初始化键盘绑定
+        :param log: 日志对象
+        :param hub: 输入中心 Default: None （全局共享的输入中心）
+        """
+        self.log = log
+        self.hub = hub or InputHub.instance()
+        """输入中心"""
+        self.bindings: dict[str, tuple[str, callable, callable]] = {}
+        """绑定 {绑定名: (按键名, 按下回调, 松开回调)}"""
+        self.__table: dict[str, dict[str, tuple[callable, callable]]] = {}
+        """分发表 {按键名: {绑定名: (按下回调, 松开回调)}}，只包含已启动的绑定"""
+        self.__subscriptions: list[int] = []
+
+    @staticmethod
+    def keyName(key: Key | KeyCode | str) -> str:
+        """
+        按键名：特殊键为 pynput 的名称（space、ctrl_l、f1 ...），字符键为小写字符，其余为 <虚拟键码>
+        :param key: pynput 按键或按键名
+        :return: 按键名
+        """
+        if isinstance(key, str):
+            return key.lower()
+        if isinstance(key, Key):
+            return key.name
+        if getattr(key, "char", None):
+            return key.char.lower()
+        return f"<{getattr(key, 'vk', None)}>"
+
+    def bindKey(self, bindName: str, key: Key | KeyCode | str, onPress: callable = None, onRelease: callable = None):
+        """
+        绑定按键，同名绑定会被替换
+        :param bindName: 绑定名
+        :param key: 按键或按键名
+        :param onPress: 按下时的回调 onPress(key)
+        :param onRelease: 松开时的回调 onRelease(key)
+        :return: None
+        """
+        self.log.info(f"Bind key {bindName} to {self.keyName(key)}")
+        started = self.__isStarted(bindName)
+        self.stop(bindName)
+        self.bindings[bindName] = (self.keyName(key), onPress, onRelease)
+        if started:
+            self.start(bindName)
+
+    def start(self, bindName: str):
+        name, onPress, onRelease = self.bindings[bindName]
+        self.__table.setdefault(name, {})[bindName] = (onPress, onRelease)
+        if not self.__subscriptions:
+            self.__subscriptions = [self.hub.subscribe(InputEventKind.Press, self.__onPress),
+                                    self.hub.subscribe(InputEventKind.Release, self.__onRelease)]
+        self.log.success(f"Key input started for {bindName} successfully")
+
+    def startAll(self):
+        for bindName in self.bindings.keys():
+            self.start(bindName)
+
+    def stop(self, bindName: str):
+        for name, handlers in list(self.__table.items()):
+            handlers.pop(bindName, None)
+            if not handlers:
+                del self.__table[name]
+        if not self.__table:
+            self.__unsubscribe()
+
+    def close(self):
+        self.__table.clear()
+        self.__unsubscribe()
+        self.log.info("Key input stopped")
+
+    def __isStarted(self, bindName: str) -> bool:
+        return any(bindName in handlers for handlers in self.__table.values())
+
+    def __unsubscribe(self):
+        for subscriptionId in self.__subscriptions:
+            self.hub.unsubscribe(subscriptionId)
+        self.__subscriptions = []
+
+    def __onPress(self, key):
+        for onPress, _ in list(self.__table.get(self.keyName(key), {}).values()):
+            if onPress is not None:
+                onPress(key)
+
+    def __onRelease(self, key):
+        for _, onRelease in list(self.__table.get(self.keyName(key), {}).values()):
+            if onRelease is not None:
+                onRelease(key)
@@ -1,10 +1,8 @@
 from enum import Enum
 
-from PySide6.QtCore import QThreadPool
 from loguru import logger
-from pynput.mouse import Listener
 
-from src.main.python.com.wutong.livepet.widgets.Runnable import Runnable
+from src.main.python.com.wutong.livepet.onInput.InputHub import InputEventKind, InputHub
 
 
 class MouseOperationTypes(Enum):
@@ -14,31 +12,61 @@ class MouseOperationTypes(Enum):
 
 
 class MouseInput:
-    def __init__(self, log: logger, threadPool: QThreadPool = None):
-        self.threadPool = threadPool or QThreadPool().globalInstance()
+    """
+    鼠标绑定
+    所有绑定共用 InputHub 的一个全局鼠标钩子，回调在 GUI 线程中执行，移动和滚轮事件每帧最多一次
+    """
+
+    KINDS = {MouseOperationTypes.Click: InputEventKind.Click,
+             MouseOperationTypes.Move: InputEventKind.Move,
+             MouseOperationTypes.Scroll: InputEventKind.Scroll}
+    """鼠标操作对应的输入事件类型"""
+
+    def __init__(self, log: logger, hub: InputHub = None):
+        """
+        初始化鼠标绑定
+        :param log: 日志对象
+        :param hub: 输入中心 Default: None （全局共享的输入中心）
+        """
         self.log = log
-        self.threadMouseDict: dict[str, Listener] = {}
+        self.hub = hub or InputHub.instance()
+        """输入中心"""
+        self.bindings: dict[str, dict[MouseOperationTypes, callable]] = {}
+        """绑定 {绑定名: {鼠标操作: 回调}}"""
+        self.__subscriptions: dict[str, list[int]] = {}
+        """已启动的绑定的订阅编号"""
 
     def start(self, bindName: str):
-        self.threadPool.start(Runnable(self.threadMouseDict[bindName].start))
+        if bindName in self.__subscriptions:
+            return
+        self.__subscriptions[bindName] = [self.hub.subscribe(self.KINDS[key], func) for key, func in self.bindings[bindName].items()]
         self.log.success(f"Mouse input started for button {bindName} successfully")
 
     def startAll(self):
-        for bindName in self.threadMouseDict.keys():
+        for bindName in self.bindings.keys():
             self.start(bindName)
         self.log.success("Mouse input started for all buttons successfully")
 
+    def stop(self, bindName: str):
+        for subscriptionId in self.__subscriptions.pop(bindName, []):
+            self.hub.unsubscribe(subscriptionId)
+
     def bindMouse(self, bindName: str, key: MouseOperationTypes, func: callable):
         self.log.info(f"Bind mouse button {bindName} to {key} with function {func.__name__}")
-        self.threadMouseDict[bindName] = Listener(**{key.value: func})
+        self.__rebind(bindName, {key: func})
 
     def bindMoreMouse(self, bindName: str, keyToFunc: dict[MouseOperationTypes, callable]):
-        addDict = {k.value: v for k, v in keyToFunc.items()}
-        self.log.info(f"Bind more mouse button {bindName} to {addDict}")
-        self.threadMouseDict[bindName] = Listener(**addDict)
+        self.log.info(f"Bind more mouse button {bindName} to {({k.value: v for k, v in keyToFunc.items()})}")
+        self.__rebind(bindName, dict(keyToFunc))
 
     def close(self):
-        for listener in self.threadMouseDict.values():
-            listener.stop()
+        for bindName in list(self.__subscriptions.keys()):
+            self.stop(bindName)
         self.log.info("Mouse input stopped")
-        self.threadPool.releaseThread()
+
+    def __rebind(self, bindName: str, keyToFunc: dict[MouseOperationTypes, callable]):
+        started = bindName in self.__subscriptions
+        self.stop(bindName)
+        self.bindings[bindName] = keyToFunc
+        if started:
+            self.start(bindName)
@@ -1,3 +1,6 @@
 __namespace__ = "com.wutong.livepet.onInput"
 __author__ = "Wutong"
 __version__ = "0.0.1"
+__description__ = "全局输入，鼠标和键盘绑定共用一个钩子"
+
+from .InputHub import InputHub, InputEventKind
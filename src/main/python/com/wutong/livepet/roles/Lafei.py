@@ -1,5 +1,13 @@
+import os
+
 from PySide6.QtCore import Qt
 
+from src import ROOT_PATH
+from src.main.python.com.wutong.livepet.chat.HistoryStore import HistoryStore
+from src.main.python.com.wutong.livepet.chat.MemoryStore import MemoryStore
+from src.main.python.com.wutong.livepet.chat.ReplyParser import ReplyParser, ReplyAction
+from src.main.python.com.wutong.livepet.chat.ResponseCache import ResponseCache
+from src.main.python.com.wutong.livepet.liveWidget.ComponentLoader import ComponentState
 from src.main.python.com.wutong.livepet.liveWidget.components.PetChat import PetChat
 from src.main.python.com.wutong.livepet.liveWidget.components.PetContext import PetContext
 from src.main.python.com.wutong.livepet.liveWidget.components.SystemTray import SystemTray
@@ -35,7 +43,33 @@ class Lafei(PetWidget):
             positionY=self.positionY + self.scaledSize[1],
             petContext=self.petContext,
             modelName="llama3.2:latest",
-            system="你的名字叫做拉菲")
+            system="你的名字叫做拉菲",
+            conversationId="lafei_4",
+            historyStore=HistoryStore(),
+            responseCache=ResponseCache(os.path.join(ROOT_PATH, "chatHistory", "lafei_4.cache.json")),
+            memoryStore=MemoryStore(os.path.join(ROOT_PATH, "chatHistory", "lafei_4.memory")),
+            replyParser=ReplyParser(markers={"happy": ReplyAction.motion("Complete", "complete"),
+                                             "shy": ReplyAction.motion("Touch", "touch_head"),
+                                             "surprised": ReplyAction.motion("Touch", "touch_special"),
+                                             "working": ReplyAction.motion("Mission", "mission")}))
+
+        self.hotkeys.register("toggleChat", "ctrl+alt+c", self.toggleChat)
+        self.hotkeys.register("togglePet", "ctrl+alt+h", self.togglePet)
+        self.hotkeys.register("muteWave", "ctrl+alt+m", self.waveListener.toggleMute)
+
+    def toggleChat(self):
+        if self.componentLoader.state(self.petChat) is not ComponentState.Ready:  # 聊天框还在加载
+            return
+        if self.petChat.isVisible():
+            self.petChat.hide()
+        else:
+            self.petChat.show()
+
+    def togglePet(self):
+        if self.isVisible():
+            self.hide()
+        else:
+            self.show()
 
     def initUI(self):
         self.addComponent(self.petContext)  # 添加桌宠说话气泡
@@ -56,10 +90,7 @@ class Lafei(PetWidget):
         if self.isInL2DArea(self.clickX, self.clickY) and event.button() == Qt.MouseButton.LeftButton:
             # self.petContext.clearText()
             # self.petContext.showText("我是备受期待的本森级驱逐舰拉菲，在三次所罗门海战有着极为活跃的表现，战舰？那是什么？")
-            if self.petChat.isVisible():
-                self.petChat.hide()
-            else:
-                self.petChat.show()
+            self.toggleChat()
             self.model.startContinuousMotions({"Mission": ["mission", 1], "MissionComplete": ["mission_complete", 2], "Main": ["main_2", 3]}, allPriority=2)
 
     def mouseReleaseEvent(self, event):
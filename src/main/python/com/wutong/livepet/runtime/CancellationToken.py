@@ -0,0 +1,54 @@
+import threading
+
+
+class CancellationToken:
+    """
+    取消令牌
+    任务循环用 wait 代替 time.sleep：取消时立即返回，不需要轮询标志位
+    """
+
+    def __init__(self):
+        self.__event = threading.Event()
+        self.__callbacks: list[callable] = []
+        self.__lock = threading.Lock()
+
+    @property
+    def isCancelled(self) -> bool:
+        """
+        是否已取消
+        :return: True or False
+        """
+        return self.__event.is_set()
+
+    def cancel(self):
+        """
+        取消（线程安全，可以重复调用）
+        :return: None
+        """
+        with self.__lock:
+            if self.__event.is_set():
+                return
+            self.__event.set()
+            callbacks, self.__callbacks = self.__callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        等待取消或超时
+        :param timeout: 最长等待时间（秒） Default: None （一直等待）
+        :return: 是否已取消
+        """
+        return self.__event.wait(timeout)
+
+    def onCancel(self, callback: callable):
+        """
+        注册取消时的回调（在调用 cancel 的线程中执行），已取消时立即执行
+        :param callback: 回调: callback()
+        :return: None
+        """
+        with self.__lock:
+            if not self.__event.is_set():
+                self.__callbacks.append(callback)
+                return
+        callback()
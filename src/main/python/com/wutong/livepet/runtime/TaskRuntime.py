@@ -0,0 +1,265 @@
+import collections
+import threading
+import time
+from concurrent.futures import Future
+from enum import Enum
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+from src.main.python.com.wutong.livepet.runtime.CancellationToken import CancellationToken
+
+
+class TaskKind(Enum):
+    Service = "service"
+    Short = "short"
+
+
+class TaskHandle:
+    """
+    任务句柄：名称、取消令牌和结果
+    """
+
+    def __init__(self, name: str, kind: TaskKind, func: callable, args: tuple, kwargs: dict):
+        self.name = name
+        """任务名"""
+        self.kind = kind
+        """任务类型"""
+        self.token = CancellationToken()
+        """取消令牌"""
+        self.future: Future = Future()
+        """任务结果"""
+        self.submitTime = time.perf_counter()
+        """提交的时间点"""
+        self.startTime: float | None = None
+        """开始执行的时间点"""
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+    @property
+    def isDone(self) -> bool:
+        """
+        是否已结束（完成、失败或在开始前被取消）
+        :return: True or False
+        """
+        return self.future.done()
+
+    def cancel(self):
+        """
+        取消任务：尚未开始的短任务不再执行，正在执行的任务通过令牌得知取消
+        :return: None
+        """
+        self.token.cancel()
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        等待任务结束
+        :param timeout: 最长等待时间（秒） Default: None （一直等待）
+        :return: 是否已结束
+        """
+        try:
+            self.future.exception(timeout)
+        except TimeoutError:
+            return False
+        except Exception:  # 开始前被取消
+            pass
+        return True
+
+    def __repr__(self):
+        return f"{self.kind.value}:{self.name}"
+
+
+class TaskRuntime:
+    """
+    任务运行时
+    长期服务（录音循环、待机动作等会一直运行的任务）各自占用一个具名线程，不占用短任务的工作线程；
+    短任务在有上限的工作线程中按提交顺序执行，工作线程按需创建。
+    服务函数的第一个参数是取消令牌，循环中用 token.wait(interval) 代替 time.sleep；
+    shutdown 取消全部任务并在超时内等待它们结束。
+    每个任务记录排队等待和运行耗时（runtime.queueWait / runtime.runTime），metrics() 返回各类任务的活动数和排队数
+    """
+
+    __instance: "TaskRuntime | None" = None
+
+    def __init__(self, maxWorkers: int = 4):
+        """
+        初始化任务运行时
+        :param maxWorkers: 短任务的最大工作线程数
+        """
+        self.maxWorkers = maxWorkers
+        """短任务的最大工作线程数"""
+
+        self.__registry = MetricsRegistry.instance()
+        self.__condition = threading.Condition()
+        self.__queue: collections.deque[TaskHandle] = collections.deque()
+        """排队的短任务"""
+        self.__workers: list[threading.Thread] = []
+        """短任务的工作线程"""
+        self.__idle = 0
+        """空闲的工作线程数"""
+        self.__services: dict[TaskHandle, threading.Thread] = {}
+        """正在运行的服务"""
+        self.__running: set[TaskHandle] = set()
+        """正在执行的短任务"""
+        self.__closed = False
+        self.__counters = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    @classmethod
+    def instance(cls) -> "TaskRuntime":
+        """
+        全局共享的任务运行时
+        :return: TaskRuntime
+        """
+        if cls.__instance is None:
+            cls.__instance = TaskRuntime()
+        return cls.__instance
+
+    def setMaxWorkers(self, count: int):
+        """
+        设置短任务的最大工作线程数，多出的线程在执行完当前任务后退出
+        :param count: 线程数
+        :return: None
+        """
+        with self.__condition:
+            self.maxWorkers = max(1, count)
+            self.__condition.notify_all()
+
+    def submit(self, name: str, func: callable, *args, **kwargs) -> TaskHandle:
+        """
+        提交短任务: func(*args, **kwargs)
+        :param name: 任务名
+        :param func: 函数
+        :return: 任务句柄
+        """
+        handle = TaskHandle(name, TaskKind.Short, func, args, kwargs)
+        with self.__condition:
+            if self.__closed:
+                return self.__reject(handle)
+            self.__counters["submitted"] += 1
+            self.__queue.append(handle)
+            if self.__idle:
+                self.__condition.notify()
+            # 被唤醒的线程在拿到锁之前仍计为空闲，按排队数而不是是否有空闲线程判断是否需要新线程
+            if self.__idle < len(self.__queue) and len(self.__workers) < self.maxWorkers:
+                worker = threading.Thread(target=self.__work, name=f"TaskRuntime-{len(self.__workers)}", daemon=True)
+                self.__workers.append(worker)
+                worker.start()
+        return handle
+
+    def service(self, name: str, func: callable, *args, **kwargs) -> TaskHandle:
+        """
+        启动长期服务: func(token, *args, **kwargs)，在名为 name 的独立线程中运行
+        :param name: 服务名
+        :param func: 函数，第一个参数为取消令牌
+        :return: 任务句柄
+        """
+        handle = TaskHandle(name, TaskKind.Service, func, args, kwargs)
+        with self.__condition:
+            if self.__closed:
+                return self.__reject(handle)
+            self.__counters["submitted"] += 1
+            thread = threading.Thread(target=self.__runService, args=(handle,), name=name, daemon=True)
+            self.__services[handle] = thread
+        thread.start()
+        return handle
+
+    def metrics(self) -> dict:
+        """
+        运行时的状态：服务数、短任务的工作线程数、执行中和排队的任务数，以及累计的提交、完成、失败和取消数
+        :return: 状态
+        """
+        with self.__condition:
+            return {**self.__counters,
+                    "services": sorted(handle.name for handle in self.__services),
+                    "workers": len(self.__workers),
+                    "maxWorkers": self.maxWorkers,
+                    "active": len(self.__running),
+                    "queued": len(self.__queue),
+                    "oldestWait": time.perf_counter() - self.__queue[0].submitTime if self.__queue else 0.0}
+
+    def shutdown(self, timeout: float = 3.0) -> bool:
+        """
+        取消全部任务并等待结束，之后提交的任务直接取消
+        :param timeout: 最长等待时间（秒）
+        :return: 是否全部按时结束
+        """
+        with self.__condition:
+            self.__closed = True
+            queued, self.__queue = list(self.__queue), collections.deque()
+            running = list(self.__running) + list(self.__services)
+            threads = list(self.__services.values()) + list(self.__workers)
+            self.__condition.notify_all()
+        for handle in queued:
+            handle.token.cancel()
+            handle.future.cancel()
+        with self.__condition:
+            self.__counters["cancelled"] += len(queued)
+        for handle in running:
+            handle.token.cancel()
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        alive = [thread.name for thread in threads if thread.is_alive()]
+        if alive:
+            logger.warning(f"TaskRuntime shutdown timed out, still running: {', '.join(alive)}")
+            return False
+        logger.success("TaskRuntime shut down")
+        return True
+
+    def __reject(self, handle: TaskHandle) -> TaskHandle:
+        logger.warning(f"TaskRuntime is shut down, task {handle} rejected")
+        handle.token.cancel()
+        handle.future.cancel()
+        return handle
+
+    def __work(self):
+        while True:
+            with self.__condition:
+                while not self.__queue and not self.__closed and len(self.__workers) <= self.maxWorkers:
+                    self.__idle += 1
+                    self.__condition.wait()
+                    self.__idle -= 1
+                if self.__closed or len(self.__workers) > self.maxWorkers:
+                    self.__workers.remove(threading.current_thread())
+                    return
+                handle = self.__queue.popleft()
+                self.__running.add(handle)
+            try:
+                self.__execute(handle, handle.args)
+            finally:
+                with self.__condition:
+                    self.__running.discard(handle)
+
+    def __runService(self, handle: TaskHandle):
+        try:
+            self.__execute(handle, (handle.token,) + handle.args)
+        finally:
+            with self.__condition:
+                self.__services.pop(handle, None)
+
+    def __execute(self, handle: TaskHandle, args: tuple):
+        if handle.token.isCancelled:
+            handle.future.cancel()
+        if not handle.future.set_running_or_notify_cancel():
+            with self.__condition:
+                self.__counters["cancelled"] += 1
+            return
+        handle.startTime = time.perf_counter()
+        try:
+            result = handle.func(*args, **handle.kwargs)
+        except Exception as e:
+            logger.exception(f"Task {handle} failed: {e}")
+            handle.future.set_exception(e)
+            outcome = "failed"
+        else:
+            handle.future.set_result(result)
+            outcome = "completed"
+        with self.__condition:
+            self.__counters[outcome] += 1
+        if self.__registry.enabled:
+            end = time.perf_counter()
+            if handle.kind is TaskKind.Short:
+                self.__registry.observe("runtime.queueWait", handle.startTime - handle.submitTime)
+            self.__registry.observe("runtime.runTime", end - handle.startTime)
+            self.__registry.observe(f"runtime.{handle.name}", end - handle.startTime)
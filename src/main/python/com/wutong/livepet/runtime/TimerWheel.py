@@ -0,0 +1,379 @@
+import math
+import threading
+import time
+
+from loguru import logger
+
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+from src.main.python.com.wutong.livepet.runtime.TaskRuntime import TaskRuntime, TaskHandle
+
+
+class Timer:
+    """
+    定时器句柄
+    """
+
+    def __init__(self, wheel: "TimerWheel", name: str, callback: callable, expires: int, interval: int | None, offload: bool):
+        self.wheel = wheel
+        """所属的时间轮"""
+        self.name = name
+        """定时器名"""
+        self.callback = callback
+        """回调"""
+        self.expires = expires
+        """到期的刻度"""
+        self.interval = interval
+        """周期（刻度数），None 表示只触发一次"""
+        self.offload = offload
+        """是否在任务运行时的短任务中执行回调"""
+        self.cancelled = False
+        """是否已取消"""
+        self.slot: list | None = None
+        """所在的槽"""
+        self.level = 0
+        """所在的层"""
+        self.task: TaskHandle | None = None
+        """上一次提交的短任务"""
+
+    @property
+    def isActive(self) -> bool:
+        """
+        是否还会触发
+        :return: True or False
+        """
+        return not self.cancelled and self.slot is not None
+
+    def cancel(self):
+        """
+        取消定时器（线程安全，可以重复调用）
+        :return: None
+        """
+        self.wheel.cancel(self)
+
+    def __repr__(self):
+        return f"Timer({self.name})"
+
+
+class Debouncer:
+    """
+    防抖：每次 trigger 把触发时间推迟到 delay 秒之后，只有最后一次 trigger 的参数会被回调
+    推迟时不重新插入定时器，到期时发现被推迟才按剩余时间重新排期
+    """
+
+    def __init__(self, wheel: "TimerWheel", name: str, delay: float, callback: callable, offload: bool):
+        self.wheel = wheel
+        """所属的时间轮"""
+        self.name = name
+        """名称"""
+        self.delay = delay
+        """延迟（秒）"""
+        self.callback = callback
+        """回调: callback(*args)"""
+        self.offload = offload
+        """是否在任务运行时的短任务中执行回调"""
+
+        self.__lock = threading.Lock()
+        self.__deadline = 0.0
+        """最后一次 trigger 要求的触发时间点"""
+        self.__args: tuple = ()
+        self.__timer: Timer | None = None
+
+    def trigger(self, *args):
+        """
+        触发（线程安全）
+        :param args: 回调参数
+        :return: None
+        """
+        with self.__lock:
+            self.__deadline = time.monotonic() + self.delay
+            self.__args = args
+            if self.__timer is not None:
+                return
+            self.__timer = self.wheel.after(self.delay, self.__fire, self.name)
+
+    def cancel(self):
+        """
+        取消尚未触发的回调
+        :return: None
+        """
+        with self.__lock:
+            timer, self.__timer = self.__timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def __fire(self):
+        with self.__lock:
+            remaining = self.__deadline - time.monotonic()
+            if remaining > self.wheel.resolution:
+                self.__timer = self.wheel.after(remaining, self.__fire, self.name)
+                return
+            self.__timer = None
+            args = self.__args
+        if self.offload:
+            self.wheel.runtime.submit(self.name, self.callback, *args)
+        else:
+            self.callback(*args)
+
+
+class TimerWheel:
+    """
+    分层时间轮
+    所有延迟和周期任务共用一个线程：到期时间按 resolution 取整为刻度，同一刻度内的定时器在一次唤醒中一起触发；
+    第 0 层每个槽对应一个刻度，第 n 层每个槽对应 slots^n 个刻度，高层的定时器在低层转完一圈时下放到低层。
+    线程只在下一个非空的槽或者需要下放的时间点醒来，没有定时器时一直休眠。
+    回调默认在时间轮线程中执行，必须很快；耗时的回调使用 offload=True 交给任务运行时的短任务，
+    周期定时器上一次的短任务还没结束时跳过本次
+    """
+
+    __instance: "TimerWheel | None" = None
+
+    def __init__(self, resolution: float = 0.01, slots: int = 64, levels: int = 4, runtime: TaskRuntime = None):
+        """
+        初始化时间轮
+        :param resolution: 刻度（秒），相差不到一个刻度的到期时间合并为一次唤醒
+        :param slots: 每层的槽数
+        :param levels: 层数，能直接容纳的最长延迟为 resolution * slots^levels，更长的延迟在最高层循环等待
+        :param runtime: 执行 offload 回调的任务运行时 Default: None （全局共享的任务运行时）
+        """
+        self.resolution = resolution
+        """刻度"""
+        self.slots = slots
+        """每层的槽数"""
+        self.runtime = runtime or TaskRuntime.instance()
+        """任务运行时"""
+
+        self.__wheels: list[list[list[Timer]]] = [[[] for _ in range(slots)] for _ in range(levels)]
+        """各层的槽"""
+        self.__sizes = [0] * levels
+        """各层的定时器数"""
+        self.__start = time.monotonic()
+        """第 0 个刻度的时间点"""
+        self.__tick = 0
+        """已处理到的刻度"""
+        self.__condition = threading.Condition()
+        self.__thread: threading.Thread | None = None
+        self.__running = False
+        self.__registry = MetricsRegistry.instance()
+        self.__counters = {"scheduled": 0, "fired": 0, "cancelled": 0, "skipped": 0, "wakeups": 0}
+
+    @classmethod
+    def instance(cls) -> "TimerWheel":
+        """
+        全局共享的时间轮
+        :return: TimerWheel
+        """
+        if cls.__instance is None:
+            cls.__instance = TimerWheel()
+        return cls.__instance
+
+    def after(self, delay: float, callback: callable, name: str = None, offload: bool = False) -> Timer:
+        """
+        delay 秒后触发一次: callback()
+        :param delay: 延迟（秒）
+        :param callback: 回调
+        :param name: 定时器名 Default: None （回调的函数名）
+        :param offload: 是否在任务运行时的短任务中执行回调
+        :return: 定时器
+        """
+        with self.__condition:
+            self.__sync()
+            timer = Timer(self, name or getattr(callback, "__qualname__", "timer"), callback,
+                          self.__now() + self.__ticks(delay), None, offload)
+            self.__schedule(timer)
+        return timer
+
+    def every(self, interval: float, callback: callable, name: str = None, offload: bool = False, align: bool = False) -> Timer:
+        """
+        每隔 interval 秒触发一次: callback()，错过的周期不补触发
+        :param interval: 周期（秒）
+        :param callback: 回调
+        :param name: 定时器名 Default: None （回调的函数名）
+        :param offload: 是否在任务运行时的短任务中执行回调
+        :param align: 是否把到期时间对齐到周期的整数倍，相同周期的定时器在同一次唤醒中触发
+        :return: 定时器
+        """
+        period = self.__ticks(interval)
+        with self.__condition:
+            self.__sync()
+            now = self.__now()
+            expires = (now // period + 1) * period if align else now + period
+            timer = Timer(self, name or getattr(callback, "__qualname__", "timer"), callback, expires, period, offload)
+            self.__schedule(timer)
+        return timer
+
+    def debounce(self, delay: float, callback: callable, name: str = None, offload: bool = False) -> Debouncer:
+        """
+        防抖：最后一次 trigger(*args) 之后 delay 秒回调 callback(*args)
+        :param delay: 延迟（秒）
+        :param callback: 回调
+        :param name: 名称 Default: None （回调的函数名）
+        :param offload: 是否在任务运行时的短任务中执行回调
+        :return: Debouncer
+        """
+        return Debouncer(self, name or getattr(callback, "__qualname__", "debounce"), delay, callback, offload)
+
+    def cancel(self, timer: Timer):
+        """
+        取消定时器
+        :param timer: 定时器
+        :return: None
+        """
+        with self.__condition:
+            if timer.cancelled:
+                return
+            timer.cancelled = True
+            if timer.slot is not None:
+                self.__remove(timer)
+                self.__counters["cancelled"] += 1
+
+    def metrics(self) -> dict:
+        """
+        时间轮的计数：排期、触发、取消、跳过（上一次的短任务未结束）的次数，线程唤醒次数和每秒唤醒次数，以及等待中的定时器数
+        :return: 计数
+        """
+        with self.__condition:
+            elapsed = time.monotonic() - self.__start
+            return {**self.__counters,
+                    "active": sum(self.__sizes),
+                    "wakeupsPerSecond": self.__counters["wakeups"] / elapsed if elapsed > 0 else 0.0}
+
+    def stop(self, timeout: float = 1.0):
+        """
+        停止时间轮线程，等待中的定时器不再触发
+        :param timeout: 等待线程退出的时间（秒）
+        :return: None
+        """
+        with self.__condition:
+            self.__running = False
+            self.__condition.notify_all()
+            thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def __now(self) -> int:
+        return int((time.monotonic() - self.__start) / self.resolution + 1e-6)
+
+    def __sync(self):
+        if not any(self.__sizes):  # 空闲时直接跳到当前刻度，不逐刻度追赶
+            self.__tick = max(self.__tick, self.__now())
+
+    def __ticks(self, seconds: float) -> int:
+        return max(1, math.ceil(seconds / self.resolution))
+
+    def __schedule(self, timer: Timer):
+        self.__place(timer)
+        self.__counters["scheduled"] += 1
+        if self.__thread is None:
+            self.__running = True
+            self.__thread = threading.Thread(target=self.__loop, name="TimerWheel", daemon=True)
+            self.__thread.start()
+        else:
+            self.__condition.notify()
+
+    def __place(self, timer: Timer):
+        slots = self.slots
+        top = len(self.__wheels) - 1
+        for level in range(top + 1):
+            span = slots ** level
+            distance = timer.expires // span - self.__tick // span
+            if distance < slots:
+                index = (timer.expires // span) % slots
+                break
+        else:  # 超出最高层：放进最后一个下放的槽，下放时重新排期
+            level = top
+            index = (self.__tick // slots ** top - 1) % slots
+        timer.slot = self.__wheels[level][index]
+        timer.slot.append(timer)
+        self.__sizes[level] += 1
+        timer.level = level
+
+    def __remove(self, timer: Timer):
+        timer.slot.remove(timer)
+        timer.slot = None
+        self.__sizes[timer.level] -= 1
+
+    def __advance(self, target: int) -> list[tuple[Timer, int]]:
+        """
+        处理到刻度 target，返回到期的定时器和到期刻度（持有锁时调用）
+        """
+        slots = self.slots
+        due = []
+        self.__sync()
+        while self.__tick < target:
+            self.__tick += 1
+            tick = self.__tick
+            if tick % slots == 0:
+                # 从高层到低层下放，高层下放的定时器可能落进本轮刚要下放的低层槽
+                level = 1
+                while level + 1 < len(self.__wheels) and tick % slots ** (level + 1) == 0:
+                    level += 1
+                for cascade in range(level, 0, -1):
+                    bucket = self.__wheels[cascade][(tick // slots ** cascade) % slots]
+                    timers = list(bucket)
+                    for timer in timers:
+                        self.__remove(timer)
+                    for timer in timers:
+                        self.__place(timer)
+            bucket = self.__wheels[0][tick % slots]
+            if bucket:
+                for timer in list(bucket):
+                    if timer.expires <= tick:
+                        self.__remove(timer)
+                        due.append((timer, timer.expires))
+                        if timer.interval:
+                            timer.expires = max(timer.expires + timer.interval, tick + 1)
+                            self.__place(timer)
+        return due
+
+    def __nextWait(self) -> float | None:
+        """
+        距离下一次需要醒来的时间（持有锁时调用），没有定时器时为 None
+        """
+        slots = self.slots
+        wake = None
+        for level, size in enumerate(self.__sizes):
+            if not size:
+                continue
+            span = slots ** level
+            base = self.__tick // span
+            for offset in range(1, slots):  # 第 0 层找下一个非空的刻度，高层找下一个需要下放的非空槽
+                if self.__wheels[level][(base + offset) % slots]:
+                    tick = (base + offset) * span
+                    wake = tick if wake is None else min(wake, tick)
+                    break
+        if wake is None:
+            return None
+        return max(0.0, self.__start + wake * self.resolution - time.monotonic())
+
+    def __loop(self):
+        due: list[tuple[Timer, int]] = []
+        while True:
+            for timer, expires in due:
+                self.__fire(timer, expires)
+            with self.__condition:
+                if not self.__running:
+                    return
+                due = self.__advance(self.__now())
+                if due:
+                    continue
+                self.__condition.wait(self.__nextWait())
+                self.__counters["wakeups"] += 1
+
+    def __fire(self, timer: Timer, expires: int):
+        if timer.cancelled:
+            return
+        if self.__registry.enabled:
+            self.__registry.observe("timer.lateness", max(0.0, time.monotonic() - self.__start - expires * self.resolution))
+        with self.__condition:
+            self.__counters["fired"] += 1
+        if timer.offload:
+            if timer.task is not None and not timer.task.isDone:
+                with self.__condition:
+                    self.__counters["skipped"] += 1
+                return
+            timer.task = self.runtime.submit(timer.name, timer.callback)
+            return
+        try:
+            timer.callback()
+        except Exception as e:
+            logger.exception(f"Timer {timer.name} failed: {e}")
@@ -0,0 +1,8 @@
+__namespace__ = "com.wutong.livepet.runtime"
+__author__ = "Wutong"
+__version__ = "0.0.1"
+__description__ = "任务运行时与时间轮，长期服务与短任务分开执行，延迟和周期任务共用一个线程"
+
+from .CancellationToken import CancellationToken
+from .TaskRuntime import TaskRuntime, TaskKind, TaskHandle
+from .TimerWheel import TimerWheel, Timer, Debouncer
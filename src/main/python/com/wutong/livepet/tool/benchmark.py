@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import json
+import random
+import string
+import threading
+import time
+
+import numpy as np
+
+from src.main.python.com.wutong.livepet.audio import AudioSource
+from src.main.python.com.wutong.livepet.audio.ActivityGate import ActivityGate
+from src.main.python.com.wutong.livepet.audio.FileSource import FileSource
+from src.main.python.com.wutong.livepet.audio.SyntheticSource import SyntheticSource, SyntheticSignal
+from src.main.python.com.wutong.livepet.audio.WaveProcessor import WaveProcessor
+from src.main.python.com.wutong.livepet.chat.ChatMessage import ChatMessage, ChatRole
+from src.main.python.com.wutong.livepet.chat.backends.ChatBackend import ChatBackend
+from src.main.python.com.wutong.livepet.chat.backends.MockServer import MockServer
+from src.main.python.com.wutong.livepet.chat.backends.OllamaBackend import OllamaBackend
+from src.main.python.com.wutong.livepet.chat.backends.OpenAIBackend import OpenAIBackend
+from src.main.python.com.wutong.livepet.runtime.TimerWheel import TimerWheel
+
+"""
+离线基准测试
+不依赖 Qt 和音频设备，可以在无头环境下运行，例如：
+python -m src.main.python.com.wutong.livepet.tool.benchmark --signal speech --chunks 500
+python -m src.main.python.com.wutong.livepet.tool.benchmark --chat --requests 50 --concurrency 4
+python -m src.main.python.com.wutong.livepet.tool.benchmark --hotkeys --events 200000
+python -m src.main.python.com.wutong.livepet.tool.benchmark --timers 8 --duration 5
+python -m src.main.python.com.wutong.livepet.tool.benchmark --components 4,16,64 --events 100000
+"""
+
+
+def summarize(samples: list[float]) -> dict:
+    """
+    统计耗时样本
+    :param samples: 耗时样本（秒）
+    :return: 统计结果（毫秒）
+    """
+    if not samples:
+        return {"count": 0}
+    data = np.asarray(samples) * 1000
+    return {"count": len(samples),
+            "meanMs": float(data.mean()),
+            "p50Ms": float(np.percentile(data, 50)),
+            "p95Ms": float(np.percentile(data, 95)),
+            "maxMs": float(data.max())}
+
+
+def benchmarkWavePipeline(source: AudioSource = None, chunks: int = 200, processor: WaveProcessor = None, gate: ActivityGate = None) -> dict:
+    """
+    WaveListener 音频处理流水线基准测试
+    :param source: 音频源 Default: None （尽可能快输出的类语音合成信号）
+    :param chunks: 处理的块数
+    :param processor: 音频处理对象 Default: None （与 WaveListener 相同的配置）
+    :param gate: 声音活动检测 Default: None （不做静音跳过）
+    :return: 每块处理耗时统计和实时倍率（音频时长 / 处理时长）
+    """
+    source = source or SyntheticSource(SyntheticSignal.Speech, realtime=False)
+    processor = processor or WaveProcessor()
+    samples = []
+    with source:
+        for _ in range(chunks):
+            data = source.read()
+            if data is None:
+                break
+            start = time.perf_counter()
+            if gate and not gate.update(data):
+                processor.refreshNoiseProfile(data)
+            else:
+                processor.process(data)
+            elapsed = time.perf_counter() - start
+            if gate:
+                gate.account(elapsed)
+            samples.append(elapsed)
+    result = summarize(samples)
+    if samples:
+        result["realtimeFactor"] = len(samples) * source.chunkDuration / sum(samples)
+    if gate:
+        result["gate"] = gate.metrics()
+    return result
+
+
+async def benchmarkChat(backend: ChatBackend, model: str, requests: int = 20, concurrency: int = 1, prompt: str = "你好") -> dict:
+    """
+    对话后端流式吞吐基准测试
+    :param backend: 对话后端
+    :param model: 模型名
+    :param requests: 请求数
+    :param concurrency: 并发数
+    :param prompt: 用户消息
+    :return: 首字延迟、文本块间隔和总耗时统计，以及每秒 token 数
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    firstTokens, gaps, durations, tokens = [], [], [], []
+
+    async def one():
+        async with semaphore:
+            start = last = time.perf_counter()
+            count = 0
+            async for chunk in backend.stream(model, [ChatMessage(ChatRole.User, prompt)]):
+                now = time.perf_counter()
+                if chunk.text:
+                    (gaps if count else firstTokens).append(now - last)
+                    count += 1
+                    last = now
+                if chunk.done and chunk.completionTokens is not None:
+                    count = chunk.completionTokens
+            durations.append(time.perf_counter() - start)
+            tokens.append(count)
+
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(one() for _ in range(requests)))
+    finally:
+        await backend.close()
+    elapsed = time.perf_counter() - start
+    return {"requests": requests,
+            "concurrency": concurrency,
+            "timeToFirstToken": summarize(firstTokens),
+            "interTokenLatency": summarize(gaps),
+            "duration": summarize(durations),
+            "tokensPerSecond": sum(tokens) / elapsed}
+
+
+def benchmarkHotkeys(events: int = 100000, hotkeys: int = 64, hotkeyRate: float = 0.01, seed: int = 0) -> dict:
+    """
+    全局快捷键匹配基准测试：模拟高速打字的按键流（夹杂 shift 和已注册的快捷键），测量钩子线程中每个按键事件的处理耗时
+    :param events: 按键事件数（按下和松开各算一个）
+    :param hotkeys: 注册的快捷键数（一半为组合键序列）
+    :param hotkeyRate: 按下快捷键的概率（每次按键）
+    :param seed: 随机种子
+    :return: 每个事件的处理耗时统计、与空回调相比的额外耗时、每秒可处理的事件数和命中数
+    """
+    # pynput 在没有显示环境时无法导入，只在运行这个基准时导入
+    from src.main.python.com.wutong.livepet.onInput.HotkeyEngine import HotkeyEngine
+
+    rng = random.Random(seed)
+    engine = HotkeyEngine()
+    modifiers = ["ctrl+alt", "ctrl+shift", "alt+shift", "ctrl+alt+shift"]
+    keys = string.ascii_lowercase + string.digits
+    registered = []
+    for index in range(hotkeys):
+        chord = f"{modifiers[index % len(modifiers)]}+{keys[index % len(keys)]}"
+        hotkey = chord if index % 2 == 0 else f"ctrl+k {chord}"
+        try:
+            engine.register(f"hotkey{index}", hotkey, lambda: None)
+        except Exception:
+            continue
+        registered.append(engine.parse(hotkey))
+    modifierNames = {"ctrl": "ctrl_l", "alt": "alt_l", "shift": "shift_l", "cmd": "cmd"}
+
+    stream: list[tuple[bool, str]] = []
+    expected = 0
+    while len(stream) < events:
+        if rng.random() < hotkeyRate and registered:
+            expected += 1
+            for mask, key in rng.choice(registered):
+                held = [modifierNames[name] for name, bit in (("ctrl", 1), ("shift", 2), ("alt", 4), ("cmd", 8)) if mask & bit]
+                stream += [(True, name) for name in held] + [(True, key), (False, key)] + [(False, name) for name in reversed(held)]
+        else:
+            key = rng.choice(string.ascii_lowercase + "  ,.")
+            key = "space" if key == " " else key
+            shifted = rng.random() < 0.05
+            stream += ([(True, "shift_l")] if shifted else []) + [(True, key), (False, key)] + ([(False, "shift_l")] if shifted else [])
+
+    def run(press, release) -> list[float]:
+        samples = []
+        clock = time.perf_counter
+        for pressed, key in stream:
+            start = clock()
+            if pressed:
+                press(key)
+            else:
+                release(key)
+            samples.append(clock() - start)
+        return samples
+
+    baseline = run(lambda key: None, lambda key: None)
+    matched = []
+    samples = run(lambda key: matched.append(engine.press(key)), engine.release)
+    matched = [name for name in matched if name]
+    engine.close()
+    result = summarize(samples)
+    result["baseline"] = summarize(baseline)
+    result["overheadUs"] = (sum(samples) - sum(baseline)) / len(samples) * 1e6
+    result["eventsPerSecond"] = len(samples) / sum(samples)
+    result["hotkeys"] = len(registered)
+    result["expected"] = expected
+    result["matched"] = len(matched)
+    return result
+
+
+def benchmarkTimers(timers: int = 8, duration: float = 5.0, fps: int = 30, interval: float = 60.0) -> dict:
+    """
+    延迟任务基准测试：对比每个延迟占用一个线程、每 10ms 轮询一次的旧写法（待机动作、气泡清空）和每帧 sleep 的录音循环，
+    与全部交给时间轮的写法，统计线程数和每秒唤醒次数
+    :param timers: 长延迟任务数（待机动作、气泡清空等）
+    :param duration: 每种写法的测量时长（秒）
+    :param fps: 帧任务的频率
+    :param interval: 长延迟任务的周期（秒）
+    :return: 两种写法的线程数和每秒唤醒次数
+    """
+    wakeups = [0]
+    stop = threading.Event()
+
+    def poll():
+        remaining = interval
+        while not stop.is_set() and (remaining := remaining - 0.01) >= 0:
+            time.sleep(0.01)
+            wakeups[0] += 1
+
+    def frame():
+        while not stop.is_set():
+            time.sleep(1 / fps)
+            wakeups[0] += 1
+
+    baseThreads = threading.active_count()
+    threads = [threading.Thread(target=poll, daemon=True) for _ in range(timers)] + [threading.Thread(target=frame, daemon=True)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    legacyThreads = threading.active_count() - baseThreads
+    stop.set()
+    for thread in threads:
+        thread.join()
+    legacy = {"threads": legacyThreads, "wakeupsPerSecond": wakeups[0] / duration}
+
+    wheel = TimerWheel()
+    ticks = [0]
+    handles = [wheel.every(interval, lambda: None) for _ in range(timers)]
+    handles.append(wheel.every(1 / fps, lambda: ticks.__setitem__(0, ticks[0] + 1), align=True))
+    start = wheel.metrics()["wakeups"]
+    time.sleep(duration)
+    wheelThreads = threading.active_count() - baseThreads
+    result = wheel.metrics()
+    for handle in handles:
+        handle.cancel()
+    wheel.stop()
+    return {"legacy": legacy,
+            "timerWheel": {"threads": wheelThreads,
+                           "wakeupsPerSecond": (result["wakeups"] - start) / duration,
+                           "frameCallbacksPerSecond": ticks[0] / duration}}
+
+
+def benchmarkEvents(components: list[int], events: int = 100000) -> dict:
+    """
+    组件事件分发基准测试：每组只有一个组件处理移动事件，其余组件不覆写钩子，
+    对比逐个调用全部组件钩子的广播和事件总线的订阅分发，测量每个移动事件的平均耗时
+    :param components: 组件数列表
+    :param events: 每组的移动事件数
+    :return: {组件数: {broadcastUs, busUs}}
+    """
+    # 组件模块会导入 OpenGL 和 Qt 图形界面，只在运行这个基准时导入
+    from src.main.python.com.wutong.livepet.liveWidget.EventBus import EventBus, ComponentEvent
+    from src.main.python.com.wutong.livepet.liveWidget.components.Component import Component
+
+    class Idle(Component):
+        pass
+
+    class Mover(Component):
+        def componentMove(self, event):
+            pass
+
+    clock = time.perf_counter
+    result = {}
+    for count in components:
+        members = [Mover("mover")] + [Idle(f"idle{index}") for index in range(count - 1)]
+        start = clock()
+        for _ in range(events):
+            for member in members:
+                member.componentMove(None)
+        broadcast = clock() - start
+        bus = EventBus()
+        for member in members:
+            bus.register(member)
+        start = clock()
+        for _ in range(events):
+            bus.publish(ComponentEvent.Move, None)
+        result[count] = {"broadcastUs": broadcast / events * 1e6, "busUs": (clock() - start) / events * 1e6}
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="freel2d offline benchmarks")
+    parser.add_argument("--file", help="WAV/FLAC file to replay instead of a synthetic signal")
+    parser.add_argument("--signal", default=SyntheticSignal.Speech.value, choices=[i.value for i in SyntheticSignal])
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--gated", action="store_true", help="skip denoising on silent chunks like WaveListener does")
+    parser.add_argument("--chat", action="store_true", help="benchmark chat streaming instead of the audio pipeline")
+    parser.add_argument("--backend", default="ollama", choices=["ollama", "openai"])
+    parser.add_argument("--url", help="chat server url, a bundled mock server is started when omitted")
+    parser.add_argument("--model", default="mock:latest")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.3, help="mock server time to first token in seconds")
+    parser.add_argument("--tps", type=float, default=30.0, help="mock server tokens per second")
+    parser.add_argument("--hotkeys", action="store_true", help="benchmark global hotkey matching on a synthetic key stream")
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--timers", type=int, help="benchmark the timer wheel against per-delay sleeping threads with this many long delays")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--components", help="benchmark component event dispatch for these comma separated component counts")
+    args = parser.parse_args()
+
+    if args.components:
+        print(json.dumps(benchmarkEvents([int(count) for count in args.components.split(",")], args.events), indent=2))
+        raise SystemExit
+
+    if args.timers is not None:
+        print(json.dumps(benchmarkTimers(args.timers, args.duration), indent=2))
+        raise SystemExit
+
+    if args.hotkeys:
+        print(json.dumps(benchmarkHotkeys(args.events), indent=2))
+        raise SystemExit
+
+    if args.chat:
+        mockServer = None if args.url else MockServer(firstTokenLatency=args.latency, tokensPerSecond=args.tps, models=[args.model]).start()
+        url = args.url or mockServer.url
+        chatBackend = OllamaBackend(url) if args.backend == "ollama" else OpenAIBackend(url if args.url else f"{url}/v1")
+        try:
+            print(json.dumps(asyncio.run(benchmarkChat(chatBackend, args.model, args.requests, args.concurrency)), indent=2))
+        finally:
+            if mockServer:
+                mockServer.stop()
+        raise SystemExit
+
+    benchSource = FileSource(args.file, chunk=args.chunk, realtime=False, loop=True) if args.file else SyntheticSource(args.signal, chunk=args.chunk, realtime=False)
+    benchGate = ActivityGate(channels=benchSource.channels) if args.gated else None
+    print(json.dumps(benchmarkWavePipeline(benchSource, args.chunks, gate=benchGate), indent=2))
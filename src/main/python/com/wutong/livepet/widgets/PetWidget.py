@@ -5,6 +5,7 @@ from PySide6.QtWidgets import QApplication
 
 from src.main.python.com.wutong.livepet.live2d.Live2D import Live2D
 from src.main.python.com.wutong.livepet.liveWidget import gl, LiveWidget
+from src.main.python.com.wutong.livepet.liveWidget.EventBus import ComponentEvent
 from src.main.python.com.wutong.livepet.onInput.MouseInput import MouseOperationTypes
 
 
@@ -58,8 +59,12 @@ class PetWidget(LiveWidget):
         self.isRunning = False
         """是否正在运行"""
 
-        self.model = Live2D(self.modelName, self.threadPool, True, True)
+        self.model = Live2D(self.modelName, self.runtime, True, True)
         """Live2D模型对象"""
+        self.model.motionListener = self.__onMotion  # 动作开始和结束发布到组件事件总线
+
+    def __onMotion(self, started: bool, group: str, index: int):
+        self.eventBus.post(ComponentEvent.MotionStart if started else ComponentEvent.MotionEnd, group, index)
 
     def isInL2DArea(self, click_x, click_y):
         """
@@ -149,8 +154,10 @@ class PetWidget(LiveWidget):
         """
         if self.isInLA:
             self.clickInLA = False
+            self.windowGroup.flush()  # 松开时立即移动到最终位置
         else:
             self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents, False)
+        super().mouseReleaseEvent(event)
 
     def mouseMoveEvent(self, event):
         """
@@ -160,8 +167,7 @@ class PetWidget(LiveWidget):
         """
         x, y = event.scenePosition().x(), event.scenePosition().y()
         if self.clickInLA:
-            self.positionX, self.positionY = int(self.x() + x - self.clickX), int(self.y() + y - self.clickY)  # 更新桌宠位置
-            self.move(self.positionX, self.positionY)  # 移动桌宠位置
+            self.positionX, self.positionY = int(self.x() + x - self.clickX), int(self.y() + y - self.clickY)  # 更新桌宠位置，由窗口组在下一帧移动
         super().mouseMoveEvent(event)
 
     def keyPressEvent(self, event):
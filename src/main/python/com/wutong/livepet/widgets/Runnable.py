@@ -1,12 +0,0 @@
-from PySide6.QtCore import QRunnable
-
-
-class Runnable(QRunnable):
-    def __init__(self, func, *args, **kwargs):
-        super().__init__()
-        self.func = func
-        self.args = args
-        self.kwargs = kwargs
-
-    def run(self):
-        self.func(*self.args, **self.kwargs)
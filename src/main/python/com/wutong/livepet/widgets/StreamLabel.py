@@ -0,0 +1,162 @@
+from PySide6.QtCore import Qt, QPointF, QEvent
+from PySide6.QtGui import QPainter, QTextLayout, QFontMetricsF, QPalette
+from PySide6.QtWidgets import QWidget, QStyleOption, QStyle
+
+
+class StreamLabel(QWidget):
+    """
+    流式文本标签
+    只支持追加的增量排版：已经换行完成的行连同行宽一起缓存，追加文本时只重新排版最后一行，
+    代价与回复总长度无关；绘制时只绘制可见的行，内容超出高度时显示最后几行
+    接口与 QLabel 的 setText/text/clear 兼容，样式表中的 color/font 同样生效
+    """
+
+    def __init__(self, parent: QWidget = None, padding: int = 6):
+        """
+        初始化流式文本标签
+        :param parent: 父控件
+        :param padding: 内边距
+        """
+        super().__init__(parent)
+        self.padding = padding
+        """内边距"""
+        self.alignment = Qt.AlignmentFlag.AlignCenter
+        """对齐方式（水平 + 垂直）"""
+
+        self.__text = ""
+        """全部文本"""
+        self.__lines: list[tuple[str, float]] = []
+        """已完成排版的行: (行文本, 行宽)"""
+        self.__tail = ""
+        """当前段落中尚未完成排版的文本（最后一行）"""
+        self.__tailLines: list[tuple[str, float]] = []
+        """最后一行的排版结果"""
+        self.__metrics = QFontMetricsF(self.font())
+        """字体度量缓存"""
+
+    @property
+    def lineWidth(self) -> float:
+        """
+        可用于排版的行宽
+        :return: 行宽
+        """
+        return max(1.0, self.width() - 2 * self.padding)
+
+    @property
+    def lineCount(self) -> int:
+        """
+        行数
+        :return: 行数
+        """
+        return len(self.__lines) + len(self.__tailLines)
+
+    def text(self) -> str:
+        return self.__text
+
+    def setText(self, text: str):
+        self.__text = ""
+        self.__lines.clear()
+        self.__tail = ""
+        self.__tailLines.clear()
+        self.__append(text)
+        self.update()
+
+    def clear(self):
+        self.setText("")
+
+    def setAlignment(self, alignment: Qt.AlignmentFlag):
+        self.alignment = alignment
+        self.update()
+
+    def setWordWrap(self, on: bool):
+        """
+        始终自动换行，保留该函数以兼容 QLabel
+        """
+        ...
+
+    def appendText(self, text: str):
+        """
+        追加文本
+        :param text: 文本
+        :return: None
+        """
+        if text:
+            self.__append(text)
+            self.update()
+
+    def __append(self, text: str):
+        self.__text += text
+        paragraphs = text.split("\n")
+        for paragraph in paragraphs[:-1]:  # 换行符结束当前段落，所有行都不会再变化
+            self.__tail += paragraph
+            self.__layoutTail()
+            self.__lines.extend(self.__tailLines or [("", 0.0)])
+            self.__tail = ""
+            self.__tailLines = []
+        self.__tail += paragraphs[-1]
+        self.__layoutTail()
+
+    def __layoutTail(self):
+        """
+        重新排版最后一行，除最后一行以外的排版结果提交到缓存
+        """
+        if not self.__tail:
+            self.__tailLines = []
+            return
+        layout = QTextLayout(self.__tail, self.font())
+        layout.beginLayout()
+        lines = []
+        while (line := layout.createLine()).isValid():
+            line.setLineWidth(self.lineWidth)
+            lines.append((line.textStart(), line.textLength(), line.naturalTextWidth()))
+        layout.endLayout()
+
+        for start, length, width in lines[:-1]:
+            self.__lines.append((self.__tail[start:start + length], width))
+        start, length, width = lines[-1]
+        self.__tail = self.__tail[start:]
+        self.__tailLines = [(self.__tail, width)]
+
+    def changeEvent(self, event):
+        if event.type() in (QEvent.Type.FontChange, QEvent.Type.StyleChange):
+            self.__metrics = QFontMetricsF(self.font())
+            self.setText(self.__text)
+        super().changeEvent(event)
+
+    def resizeEvent(self, event):
+        self.setText(self.__text)
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        opt = QStyleOption()
+        opt.initFrom(self)
+        p = QPainter(self)
+        self.style().drawPrimitive(QStyle.PrimitiveElement.PE_Widget, opt, p, self)
+
+        lineHeight = self.__metrics.height()
+        visible = max(1, int((self.height() - 2 * self.padding) // lineHeight))
+        total = self.lineCount
+        first = max(0, total - visible)
+        blockHeight = (total - first) * lineHeight
+
+        if self.alignment & Qt.AlignmentFlag.AlignTop or total > visible:
+            y = self.padding
+        elif self.alignment & Qt.AlignmentFlag.AlignBottom:
+            y = self.height() - self.padding - blockHeight
+        else:
+            y = (self.height() - blockHeight) / 2
+
+        p.setFont(self.font())
+        p.setPen(self.palette().color(QPalette.ColorRole.WindowText))
+        ascent = self.__metrics.ascent()
+        for index in range(first, total):
+            text, width = self.__lines[index] if index < len(self.__lines) else self.__tailLines[index - len(self.__lines)]
+            if self.alignment & Qt.AlignmentFlag.AlignLeft:
+                x = self.padding
+            elif self.alignment & Qt.AlignmentFlag.AlignRight:
+                x = self.width() - self.padding - width
+            else:
+                x = (self.width() - width) / 2
+            p.drawText(QPointF(x, y + ascent), text.rstrip())
+            y += lineHeight
+        p.end()
@@ -0,0 +1,141 @@
+import threading
+import time
+
+from PySide6.QtCore import QObject, Signal, QTimer, Qt
+
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+
+class TextSink(QObject):
+    """
+    文本汇
+    任意线程都可以调用 append 追加文本块，文本块先在缓冲区中合并，再通过排队信号回到 GUI 线程，
+    每帧最多向 target 刷新一次；开启打字机效果时按固定字符速率逐帧输出
+    """
+
+    flushRequested = Signal()
+    """请求刷新（工作线程 -> GUI 线程）"""
+
+    def __init__(self,
+                 target: callable,
+                 fps: int = 60,
+                 typewriterRate: float = 0,
+                 parent: QObject = None):
+        """
+        初始化文本汇，需要在 GUI 线程中创建
+        :param target: 接收合并后文本的函数（在 GUI 线程中调用）: target(text)
+        :param fps: 每秒最多刷新次数
+        :param typewriterRate: 打字机效果的字符速率（字/秒） Default: 0 （关闭，收到多少显示多少）
+        :param parent: 父对象
+        """
+        super().__init__(parent)
+        self.target = target
+        """接收文本的函数"""
+        self.frameInterval = 1 / fps
+        """刷新间隔（秒）"""
+        self.typewriterRate = typewriterRate
+        """打字机效果的字符速率"""
+
+        self.__lock = threading.Lock()
+        self.__buffer: list[str] = []
+        """尚未刷新的文本块"""
+        self.__backlog = ""
+        """打字机效果中尚未显示的文本"""
+        self.__scheduled = False
+        """是否已经安排了刷新"""
+        self.__lastFlush = 0.0
+        """上次刷新的时间点"""
+        self.__credit = 0.0
+        """打字机效果累计的可显示字符数（小数部分）"""
+        self.__rate: float | None = None
+        """当前待显示文本的字符速率，覆盖 typewriterRate"""
+        self.__metrics = MetricsRegistry.instance()
+        self.__pendingSince: float | None = None
+        """最早一块尚未显示的文本到达的时间点（仅在开启指标时记录）"""
+
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.__timer.timeout.connect(self.flush)
+        self.flushRequested.connect(self.__schedule, Qt.ConnectionType.QueuedConnection)
+
+    @property
+    def isIdle(self) -> bool:
+        """
+        是否没有待显示的文本
+        :return: True or False
+        """
+        with self.__lock:
+            return not self.__buffer and not self.__backlog
+
+    def append(self, text: str, rate: float = None):
+        """
+        追加文本（线程安全）
+        :param text: 文本
+        :param rate: 这段文本的打字机字符速率（字/秒），直到待显示的文本全部显示 Default: None （使用 typewriterRate）
+        :return: None
+        """
+        if not text:
+            return
+        with self.__lock:
+            self.__buffer.append(text)
+            if rate is not None:
+                self.__rate = rate
+            if self.__pendingSince is None and self.__metrics.enabled:
+                self.__pendingSince = time.perf_counter()
+            if self.__scheduled:
+                return
+            self.__scheduled = True
+        self.flushRequested.emit()
+
+    def clear(self):
+        """
+        丢弃所有待显示的文本（线程安全）
+        :return: None
+        """
+        with self.__lock:
+            self.__buffer.clear()
+            self.__backlog = ""
+            self.__credit = 0.0
+            self.__rate = None
+            self.__pendingSince = None
+
+    def __schedule(self):
+        if self.__timer.isActive():
+            return
+        delay = self.__lastFlush + self.frameInterval - time.perf_counter()
+        self.__timer.start(max(0, int(delay * 1000)))
+
+    def flush(self):
+        """
+        向 target 刷新一次（GUI 线程）
+        :return: None
+        """
+        now = time.perf_counter()
+        with self.__lock:
+            self.__backlog += "".join(self.__buffer)
+            self.__buffer.clear()
+            rate = self.typewriterRate if self.__rate is None else self.__rate
+            if rate > 0:
+                # 最多累计两帧的额度，避免长时间空闲后一次性吐出大量文字
+                self.__credit += rate * min(now - self.__lastFlush, self.frameInterval * 2)
+                count = int(self.__credit)
+                self.__credit -= count
+                text, self.__backlog = self.__backlog[:count], self.__backlog[count:]
+            else:
+                text, self.__backlog = self.__backlog, ""
+            self.__scheduled = bool(self.__backlog)
+            if not self.__scheduled:
+                self.__credit = 0.0
+                self.__rate = None
+            pendingSince = self.__pendingSince if text else None
+            if pendingSince is not None:
+                self.__pendingSince = None
+        self.__lastFlush = now
+        if text:
+            self.target(text)
+        if pendingSince is not None:
+            # 从文本到达到显示（含排版）的延迟
+            self.__metrics.observe("ui.flushLag", time.perf_counter() - pendingSince)
+        if self.__scheduled:
+            self.__timer.start(max(1, int(self.frameInterval * 1000)))
@@ -0,0 +1,106 @@
+import time
+
+from PySide6.QtCore import QObject, QTimer, Qt
+from PySide6.QtWidgets import QWidget
+
+from src.main.python.com.wutong.livepet.liveWidget.EventBus import EventBus, ComponentEvent
+from src.main.python.com.wutong.livepet.metrics.MetricsRegistry import MetricsRegistry
+
+
+class WindowGroup(QObject):
+    """
+    窗口组
+    桌宠和跟随它的组件窗口（说话气泡、聊天框、波形）作为一个整体移动：
+    拖动时每个鼠标移动事件只记录目标位置，每帧最多移动一次，移动时在同一步中移动主窗口并向订阅了移动事件的组件发布一次 Move，
+    位置没有变化时不发布；主窗口移动后下一次画面交换（frameSwapped）时记录移动到显示的延迟
+    """
+
+    def __init__(self, leader: QWidget, eventBus: EventBus, fps: int = 60):
+        """
+        初始化窗口组，需要在 GUI 线程中创建
+        :param leader: 主窗口
+        :param eventBus: 组件事件总线，移动后发布 Move，组件的 componentMove 收到 None
+        :param fps: 每秒最多移动次数
+        """
+        super().__init__(leader)
+        self.leader = leader
+        """主窗口"""
+        self.eventBus = eventBus
+        """组件事件总线"""
+        self.frameInterval = 1 / fps
+        """移动间隔（秒）"""
+
+        self.__target: tuple[int, int] | None = None
+        """尚未执行的目标位置"""
+        self.__position: tuple[int, int] | None = None
+        """上一次移动到的位置"""
+        self.__lastFlush = 0.0
+        """上一次移动的时间点"""
+        self.__pendingSince: float | None = None
+        """最早一个尚未执行的移动请求的时间点"""
+        self.__presentSince: float | None = None
+        """已经移动、等待显示的请求时间点"""
+        self.__metrics = MetricsRegistry.instance()
+        self.__counters = {"requested": 0, "coalesced": 0, "batches": 0}
+
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.__timer.timeout.connect(self.flush)
+        if hasattr(leader, "frameSwapped"):  # QOpenGLWidget
+            leader.frameSwapped.connect(self.__onPresented)
+
+    def moveTo(self, x: int, y: int):
+        """
+        请求把主窗口移动到 (x, y)，组件随之移动（GUI 线程）
+        :param x: 主窗口左上角 X
+        :param y: 主窗口左上角 Y
+        :return: None
+        """
+        self.__counters["requested"] += 1
+        if self.__target is not None:
+            self.__counters["coalesced"] += 1
+        elif self.__metrics.enabled:
+            self.__pendingSince = time.perf_counter()
+        self.__target = (int(x), int(y))
+        if self.__timer.isActive():
+            return
+        delay = self.__lastFlush + self.frameInterval - time.perf_counter()
+        self.__timer.start(max(0, int(delay * 1000)))
+
+    def flush(self):
+        """
+        立即执行尚未执行的移动（GUI 线程）
+        :return: None
+        """
+        self.__timer.stop()
+        target, self.__target = self.__target, None
+        pendingSince, self.__pendingSince = self.__pendingSince, None
+        if target is None:
+            return
+        self.__lastFlush = time.perf_counter()
+        if target == self.__position:
+            return
+        self.__position = target
+        start = time.perf_counter()
+        if (self.leader.x(), self.leader.y()) != target:
+            self.leader.move(*target)
+        self.eventBus.publish(ComponentEvent.Move, None)
+        self.__counters["batches"] += 1
+        if self.__metrics.enabled:
+            self.__metrics.observe("window.moveBatch", time.perf_counter() - start)
+            if pendingSince is not None:
+                self.__presentSince = pendingSince
+
+    def metrics(self) -> dict:
+        """
+        窗口组的计数：移动请求数、被同一帧内更新的请求覆盖的次数和实际移动次数
+        :return: 计数
+        """
+        return dict(self.__counters)
+
+    def __onPresented(self):
+        if self.__presentSince is not None:
+            # 从鼠标移动事件到主窗口在新位置显示的延迟
+            self.__metrics.observe("window.moveToPresent", time.perf_counter() - self.__presentSince)
+            self.__presentSince = None